@@ -11,6 +11,8 @@ export interface AnalysisFrame { timestamp: number; emotions: Record<string, num
 
 export interface InterviewQuestionItem { id: number; question_text: string; sequence: number; answer_text: string; ai_feedback?: { feedback?: string }; analysis_data?: AnalysisFrame[]; }
 export interface InterviewSessionItem { id: string; user: UserInfo; job_position: string; status: string; question_count: number; questions: InterviewQuestionItem[]; started_at: string; }
+// 面试记录列表的精简条目：不含各题详情与报告，得分/题数/用时来自报告生成时写入的冗余字段
+export interface InterviewSessionListItem { id: string; job_position: string; difficulty: string; question_count: number; status: string; resume: number | null; started_at: string | null; finished_at: string | null; created_at: string; report_status: string; overall_score: number | null; answered_count: number; duration: number | null; }
 export interface StartInterviewData { job_position: string; resume_id?: number; question_count?: number; }
 export interface SubmitAnswerData { question_id: number; answer_text: string; analysis_data?: AnalysisFrame[]; }
 export interface SubmitAnswerResponse { feedback: string; next_question?: InterviewQuestionItem; interview_finished?: boolean; }
@@ -40,15 +42,19 @@ export const startInterviewApi = (data: StartInterviewData, force: boolean = fal
 export const getInterviewReportApi = getReportApi;
 
 // --- 流式 API ---
+// 断线后通过 answer-stream 接口续传的最大次数
+const STREAM_MAX_RECONNECTS = 3;
+
 export const submitAnswerStreamApi = async (
   sessionId: string,
   data: SubmitAnswerData,
   onDelta: (chunk: string) => void
-): Promise<{ feedback: string; isFinished: boolean; }> => {
+): Promise<{ feedback: string; isFinished: boolean; nextQuestion?: Pick<InterviewQuestionItem, 'id' | 'sequence' | 'question_text'>; }> => {
   const authStore = useAuthStore();
   
   const baseUrl = import.meta.env.VITE_API_BASE_URL.replace(/\/api\/v1\/?$/, '');
   const finalUrl = `${baseUrl}/api/v1/interviews/${sessionId}/submit-answer-stream/`;
+  const resumeUrl = `${baseUrl}/api/v1/interviews/${sessionId}/answer-stream/?question_id=${data.question_id}`;
   
   const response = await fetch(finalUrl, {
     method: 'POST',
@@ -67,20 +73,78 @@ export const submitAnswerStreamApi = async (
     }
   }
 
-  if (!response.body) {
-    throw new Error('响应体为空');
-  }
+  // 服务端以 SSE 格式返回类型化事件：token / feedback / question_saved / done / error。
+  // 每个事件都带有 id，连接中断时携带 Last-Event-ID 重连即可从断点继续，服务端不会重新生成。
+  let feedback = '';
+  let nextQuestion: Pick<InterviewQuestionItem, 'id' | 'sequence' | 'question_text'> | undefined;
+  let lastEventId: string | null = null;
+  let finished = false;
+  let serverError: string | null = null;
 
-  const feedback = response.headers.get('X-Feedback') || '';
-  const reader = response.body.getReader();
-  const decoder = new TextDecoder();
-  
-  while (true) {
-    const { done, value } = await reader.read();
-    if (done) break;
-    const chunk = decoder.decode(value, { stream: true });
-    onDelta(chunk);
+  const handleEvent = (rawEvent: string) => {
+    let eventName = 'message';
+    let eventId: string | null = null;
+    const dataLines: string[] = [];
+    for (const line of rawEvent.split('\n')) {
+      if (line.startsWith('id:')) eventId = line.slice(3).trim();
+      else if (line.startsWith('event:')) eventName = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    }
+    if (!dataLines.length) return;
+    if (eventId !== null) lastEventId = eventId;
+    const payload = JSON.parse(dataLines.join('\n'));
+    if (eventName === 'token') onDelta(payload.content || '');
+    else if (eventName === 'feedback') feedback = payload.feedback || '';
+    else if (eventName === 'question_saved') {
+      nextQuestion = { id: payload.question_id, sequence: payload.sequence, question_text: payload.question_text };
+    } else if (eventName === 'done') finished = true;
+    else if (eventName === 'error') {
+      serverError = payload.message || '生成下一题失败';
+      finished = true;
+    }
+  };
+
+  const consume = async (res: Response) => {
+    if (!res.body) {
+      throw new Error('响应体为空');
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (!finished) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        handleEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+    if (!finished && buffer.trim()) handleEvent(buffer);
+  };
+
+  let current: Response = response;
+  for (let attempt = 0; ; attempt++) {
+    try {
+      await consume(current);
+    } catch (error) {
+      // 网络中断，进入下面的续传逻辑
+      console.warn('答题事件流中断，尝试续传:', error);
+    }
+    if (serverError) throw new Error(serverError);
+    if (finished) break;
+    if (attempt >= STREAM_MAX_RECONNECTS) {
+      throw new Error('连接中断，请稍后重试');
+    }
+    const headers: Record<string, string> = { 'Authorization': `Bearer ${authStore.token}` };
+    if (lastEventId !== null) headers['Last-Event-ID'] = lastEventId;
+    current = await fetch(resumeUrl, { headers });
+    if (!current.ok) {
+      throw new Error('服务器响应错误');
+    }
   }
 
-  return { feedback, isFinished: false };
-};
\ No newline at end of file
+  return { feedback, isFinished: false, nextQuestion };
+};
@@ -1,6 +1,6 @@
 import request from '@/api/request';
 import type { AnalysisReport } from './resumeEditor'; // 导入类型
-import type { InterviewSessionItem, AnalysisFrame } from './interview'; // 【新增】导入 AnalysisFrame
+import type { InterviewSessionListItem, AnalysisFrame } from './interview'; // 【新增】导入 AnalysisFrame
 // 【核心修改】导入通用分页类型
 import type { PaginatedResponse } from '@/types/api';
 // --- 类型定义 ---
@@ -48,16 +48,59 @@ export interface InterviewReport {
   improvement_suggestions: string[];
   keyword_analysis: KeywordAnalysis; // 新增
   star_analysis: StarAnalysisItem[]; // 新增
+  // AI 输出被截断时为 true，报告只包含已生成的部分
+  is_partial?: boolean;
 }
 
 // --- API 函数 (保持不变) ---
 // 【核心修复】为函数添加 params 参数
-export const getInterviewHistoryApi = (params?: any): Promise<PaginatedResponse<InterviewSessionItem>> => {
+export const getInterviewHistoryApi = (params?: any): Promise<PaginatedResponse<InterviewSessionListItem>> => {
   return request({ url: '/interviews/', method: 'get', params });
 };
 
-export const getInterviewReportApi = (sessionId: string): Promise<InterviewReport> => {
-  return request({ url: `/interviews/${sessionId}/finish/`, method: 'post' });
+// 报告由后端异步生成：finish 接口返回 202 及进度，之后轮询 report-status 直到生成完成
+export interface ReportStatusResponse {
+  report_status: 'none' | 'pending' | 'running' | 'ready' | 'failed';
+  report_progress: number;
+  report_error: string;
+  report?: InterviewReport;
+  // 生成中 (或失败时) 已完整输出的部分报告
+  report_draft?: Partial<InterviewReport>;
+}
+
+const REPORT_POLL_INTERVAL = 2000;
+const REPORT_POLL_TIMEOUT = 180000;
+
+export const getReportStatusApi = (sessionId: string): Promise<ReportStatusResponse> => {
+  return request({ url: `/interviews/${sessionId}/report-status/`, method: 'get' });
+};
+
+export const getInterviewReportApi = async (
+  sessionId: string,
+  onProgress?: (progress: number) => void,
+  onDraft?: (draft: Partial<InterviewReport>) => void
+): Promise<InterviewReport> => {
+  let result: InterviewReport | ReportStatusResponse = await request({ url: `/interviews/${sessionId}/finish/`, method: 'post' });
+  const deadline = Date.now() + REPORT_POLL_TIMEOUT;
+  while ('report_status' in result) {
+    if (result.report && result.report_status === 'ready') {
+      onProgress?.(100);
+      return result.report;
+    }
+    if (result.report_draft) {
+      onDraft?.(result.report_draft);
+    }
+    if (result.report_status === 'failed') {
+      throw new Error(result.report_error || '报告生成失败');
+    }
+    if (Date.now() > deadline) {
+      throw new Error('报告生成时间较长，请稍后在历史记录中查看。');
+    }
+    onProgress?.(result.report_progress);
+    await new Promise(resolve => setTimeout(resolve, REPORT_POLL_INTERVAL));
+    result = await getReportStatusApi(sessionId);
+  }
+  return result;
 };
 
 // 定义完整的报告模型类型
@@ -68,6 +111,8 @@ export interface ResumeAnalysisReportItem {
     jd_text: string;
     report_data: AnalysisReport;
     overall_score: number;
+    status: 'pending' | 'running' | 'completed' | 'failed';
+    error_message: string;
     created_at: string;
 }
 
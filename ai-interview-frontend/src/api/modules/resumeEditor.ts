@@ -1,7 +1,7 @@
 // src/api/modules/resumeEditor.ts
 import request from '@/api/request';
 // 【核心修改】从 report.ts 导入更完整的类型
-import type { ResumeAnalysisReportItem } from './report';
+import { getAnalysisReportDetailApi, type ResumeAnalysisReportItem } from './report';
 import type { ResumeLayout } from '@/store/modules/resumeEditor';
 // 【核心修改】从 resume.ts 导入类型
 import type { StructuredResume, EducationItem, WorkExperienceItem, ProjectExperienceItem, SkillItem } from './resume';
@@ -64,9 +64,12 @@ export interface AnalysisReport {
   }[];
 }
 
-// 【核心修改】更新 analyzeResumeApi 的返回类型
-export const analyzeResumeApi = (resume_id: number, jd_text: string): Promise<ResumeAnalysisReportItem> => {
-  return request({
+// 【核心修改】分析在后端异步执行：提交后轮询报告详情，直到状态变为 completed
+const ANALYSIS_POLL_INTERVAL = 2000;
+const ANALYSIS_POLL_TIMEOUT = 180000;
+
+export const analyzeResumeApi = async (resume_id: number, jd_text: string): Promise<ResumeAnalysisReportItem> => {
+  let report: ResumeAnalysisReportItem = await request({
     url: '/analyze-resume/',
     method: 'post',
     data: {
@@ -74,6 +77,18 @@ export const analyzeResumeApi = (resume_id: number, jd_text: string): Promise<Re
       jd_text,
     },
   });
+  const deadline = Date.now() + ANALYSIS_POLL_TIMEOUT;
+  while (report.status !== 'completed') {
+    if (report.status === 'failed') {
+      throw new Error(report.error_message || '简历分析失败');
+    }
+    if (Date.now() > deadline) {
+      throw new Error('分析时间较长，请稍后在分析历史中查看。');
+    }
+    await new Promise(resolve => setTimeout(resolve, ANALYSIS_POLL_INTERVAL));
+    report = await getAnalysisReportDetailApi(report.id);
+  }
+  return report;
 };
 
 export const generateResumeApi = (name: string, position: string, experience_years: string, keywords: string): Promise<ResumeLayout> => {
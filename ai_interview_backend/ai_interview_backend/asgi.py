@@ -7,6 +7,7 @@ django_asgi_app = get_asgi_application()
 from channels.routing import ProtocolTypeRouter, URLRouter
 from chat.middleware import JwtAuthMiddleware
 import chat.routing
+import interviews.routing
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
@@ -15,6 +16,8 @@ application = ProtocolTypeRouter({
             # 这里直接使用 chat.routing 定义的列表
             # 这样 ws/chat/1/ 就能被正确匹配
             chat.routing.websocket_urlpatterns
+            # 面试过程中的情绪帧上报: ws/interviews/<session_id>/emotions/
+            + interviews.routing.websocket_urlpatterns
         )
     ),
 })
\ No newline at end of file
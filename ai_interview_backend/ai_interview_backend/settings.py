@@ -277,6 +277,92 @@ CACHES = {
     }
 }
 
+# --- LLM CLIENT POOL SETTINGS ---
+# 每个 worker 进程内按 (base_url, api_key) 复用的 OpenAI 客户端数量上限 (LRU 淘汰)
+LLM_CLIENT_POOL_SIZE = int(os.getenv('LLM_CLIENT_POOL_SIZE', 16))
+# 单个客户端底层 httpx 连接池的大小与 keep-alive 配置
+LLM_CLIENT_MAX_CONNECTIONS = int(os.getenv('LLM_CLIENT_MAX_CONNECTIONS', 20))
+LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS', 10))
+LLM_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv('LLM_CLIENT_KEEPALIVE_EXPIRY', 60))
+
+# --- AI CONFIG CACHE SETTINGS ---
+# 用户 AI 配置 (模型 + Key) 解析结果在 Redis / 进程内的缓存时间 (秒)
+AI_CONFIG_CACHE_TIMEOUT = int(os.getenv('AI_CONFIG_CACHE_TIMEOUT', 600))
+AI_CONFIG_LOCAL_CACHE_TIMEOUT = int(os.getenv('AI_CONFIG_LOCAL_CACHE_TIMEOUT', 30))
+
+# --- LLM RESPONSE CACHE SETTINGS ---
+# 相同提示词的 AI 结果直接复用；按函数配置缓存时间，见 interviews/llm_cache.py 中的 DEFAULT_POLICIES
+LLM_RESPONSE_CACHE_ENABLED = os.getenv('LLM_RESPONSE_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+LLM_RESPONSE_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv('LLM_RESPONSE_CACHE_LOCAL_MAX_ENTRIES', 512))
+
+# --- RESUME PARSING SETTINGS ---
+# 单个简历文件最多解析的页数与耗时 (秒)
+RESUME_PARSE_MAX_PAGES = int(os.getenv('RESUME_PARSE_MAX_PAGES', 30))
+RESUME_PARSE_TIME_LIMIT = int(os.getenv('RESUME_PARSE_TIME_LIMIT', 20))
+# 批量导入时的解析进程数 (不设置则为 CPU 核数) 与单个文件的超时时间 (秒)
+RESUME_BULK_PARSE_WORKERS = int(os.getenv('RESUME_BULK_PARSE_WORKERS', 0)) or None
+RESUME_BULK_PARSE_FILE_TIMEOUT = int(os.getenv('RESUME_BULK_PARSE_FILE_TIMEOUT', 30))
+
+# --- INTERVIEW EMOTION DATA SETTINGS ---
+# 回答期间的情绪帧入库前按时间桶 (毫秒) 降采样，聚合方式为 mean 或 max，并限制每道题保存的帧数
+INTERVIEW_EMOTION_BUCKET_MS = int(os.getenv('INTERVIEW_EMOTION_BUCKET_MS', 250))
+INTERVIEW_EMOTION_AGGREGATION = os.getenv('INTERVIEW_EMOTION_AGGREGATION', 'mean')
+INTERVIEW_EMOTION_MAX_FRAMES = int(os.getenv('INTERVIEW_EMOTION_MAX_FRAMES', 2400))
+INTERVIEW_EMOTION_MAX_RAW_FRAMES = int(os.getenv('INTERVIEW_EMOTION_MAX_RAW_FRAMES', 20000))
+
+# --- INTERVIEW HISTORY SETTINGS ---
+# 生成下一问时保留原文的最近轮数，以及整段面试历史 (含较早轮次摘要) 的 token 预算
+INTERVIEW_HISTORY_RECENT_TURNS = int(os.getenv('INTERVIEW_HISTORY_RECENT_TURNS', 2))
+INTERVIEW_HISTORY_TOKEN_BUDGET = int(os.getenv('INTERVIEW_HISTORY_TOKEN_BUDGET', 2000))
+
+# --- PROMPT TEMPLATE SETTINGS ---
+# 后台维护的提示词模板在各进程内的缓存时间 (秒)
+PROMPT_TEMPLATE_LOCAL_CACHE_TIMEOUT = int(os.getenv('PROMPT_TEMPLATE_LOCAL_CACHE_TIMEOUT', 60))
+
+# --- METRICS SETTINGS ---
+# /metrics 接口的访问控制：Prometheus 通过 Bearer Token 抓取，或来自允许的 IP
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+# 流式调用时要求模型服务返回 usage，用于统计 token 数；模型服务不支持 stream_options 时关闭
+LLM_STREAM_INCLUDE_USAGE = os.getenv('LLM_STREAM_INCLUDE_USAGE', 'True').lower() in ('true', '1', 't')
+
+# --- LLM GATEWAY SETTINGS ---
+# 每次 LLM 调用的总时限 (秒)；各调用方函数的默认时限见 interviews/llm_gateway.py 中的 DEFAULT_DEADLINES，可在 LLM_DEADLINES 中按函数名覆盖
+LLM_DEFAULT_DEADLINE = int(os.getenv('LLM_DEFAULT_DEADLINE', 60))
+LLM_DEADLINES = {}
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5))
+# 流式输出中两个数据块之间的最长等待时间 (秒)
+LLM_STREAM_IDLE_TIMEOUT = float(os.getenv('LLM_STREAM_IDLE_TIMEOUT', 30))
+# 429 / 5xx / 连接错误的最大重试次数 (带抖动的指数退避)
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+# 超过近期 p95 耗时仍未返回时发出对冲请求的调用方函数
+LLM_HEDGE_ENDPOINTS = os.getenv('LLM_HEDGE_ENDPOINTS', 'generate_first_question,analyze_answer').split(',')
+# 模型连续失败多少次后熔断，以及熔断的冷却时间 (秒)
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 5))
+LLM_BREAKER_COOLDOWN = int(os.getenv('LLM_BREAKER_COOLDOWN', 30))
+
+# --- POST SIMILARITY SETTINGS ---
+# 基于正文 TF-IDF 的相似文章索引：每篇文章保留的相似文章数、分块计算的块大小、词表大小、
+# 增量更新时每篇文章保留的词数，以及计入相似列表的最低相似度
+POST_SIMILARITY_TOP_K = int(os.getenv('POST_SIMILARITY_TOP_K', 20))
+POST_SIMILARITY_CHUNK_SIZE = int(os.getenv('POST_SIMILARITY_CHUNK_SIZE', 256))
+POST_SIMILARITY_MAX_FEATURES = int(os.getenv('POST_SIMILARITY_MAX_FEATURES', 50000))
+POST_SIMILARITY_VECTOR_TERMS = int(os.getenv('POST_SIMILARITY_VECTOR_TERMS', 128))
+POST_SIMILARITY_MIN_SCORE = float(os.getenv('POST_SIMILARITY_MIN_SCORE', 0.05))
+
+# --- RECOMMENDATION REFRESH SETTINGS ---
+# 文章变更后推荐的批量刷新：执行间隔 (秒)、每次最多处理的变更文章数、每篇变更文章连带刷新的共享标签文章数
+RECOMMENDATION_REFRESH_INTERVAL = int(os.getenv('RECOMMENDATION_REFRESH_INTERVAL', 60))
+RECOMMENDATION_REFRESH_BATCH_SIZE = int(os.getenv('RECOMMENDATION_REFRESH_BATCH_SIZE', 200))
+RECOMMENDATION_TAG_NEIGHBOR_LIMIT = int(os.getenv('RECOMMENDATION_TAG_NEIGHBOR_LIMIT', 50))
+
+# --- POST VIEW COUNTER SETTINGS ---
+# 文章浏览量先计入 Redis，每隔 POST_VIEW_FLUSH_INTERVAL 秒批量写回数据库；
+# POST_VIEW_UNIQUE_VIEWERS 开启后同一访客 (登录用户或 IP) 同一天重复打开只计一次
+POST_VIEW_FLUSH_INTERVAL = int(os.getenv('POST_VIEW_FLUSH_INTERVAL', 30))
+POST_VIEW_FLUSH_BATCH_SIZE = int(os.getenv('POST_VIEW_FLUSH_BATCH_SIZE', 500))
+POST_VIEW_UNIQUE_VIEWERS = os.getenv('POST_VIEW_UNIQUE_VIEWERS', 'False').lower() in ('true', '1', 't')
+
 # --- EMAIL SETTINGS ---
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST')
@@ -353,6 +439,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'blog.tasks.record_daily_stats',
         'schedule': crontab(hour=23, minute=50),  # 每天晚上 23:50 执行
     },
+    'refresh-dirty-recommendations': {
+        'task': 'blog.tasks.refresh_recommendations',
+        'schedule': RECOMMENDATION_REFRESH_INTERVAL,  # 批量处理文章变更后需要刷新的推荐
+    },
+    'rebuild-post-similarity-index-nightly': {
+        'task': 'blog.tasks.rebuild_post_similarity_index',
+        'schedule': crontab(hour=3, minute=30),  # 每天凌晨 3:30 全量重建相似文章索引
+    },
+    'flush-post-view-counts': {
+        'task': 'blog.tasks.flush_post_views',
+        'schedule': POST_VIEW_FLUSH_INTERVAL,  # 把 Redis 中缓冲的浏览量批量写回数据库
+    },
 }
 #celery -A ai_interview_backend worker -l info -P gevent
 # celery -A ai_interview_backend beat -l info
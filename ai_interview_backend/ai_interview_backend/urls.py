@@ -11,6 +11,7 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, Sp
 
 from interviews.views import GenerateResumeView
 from resumes.views_upload import FileUploadView
+from core.views import metrics_view
 
 admin.site.site_header = "IFaceOff 管理后台"
 admin.site.site_title = "IFaceOff Admin Portal"
@@ -18,6 +19,8 @@ admin.site.index_title = "欢迎来到 IFaceOff 管理后台"
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Prometheus 指标
+    path('metrics/', metrics_view, name='metrics'),
 
     # 【核心修正】将所有业务 API 都放在 'api/v1/' 命名空间下
     path('api/v1/', include([
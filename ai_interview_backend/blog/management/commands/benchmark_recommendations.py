@@ -0,0 +1,122 @@
+# ai_interview_backend/blog/management/commands/benchmark_recommendations.py
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.models import Post, Tag, Category
+from blog.recommendations import calculate_recommendations, TAG_MATCH_SCORE, CATEGORY_MATCH_SCORE
+from users.models import User
+
+BULK_BATCH_SIZE = 2000
+
+
+def _legacy_scores(post: Post) -> dict:
+    """改造前逐篇候选文章查询标签和分类的实现，只用于对比耗时与校验得分。"""
+    source_tags = post.tags.values_list('id', flat=True)
+    candidate_posts = Post.objects.filter(
+        Q(tags__in=source_tags) | Q(category=post.category),
+        status='published'
+    ).exclude(id=post.id).distinct()
+    scores = {}
+    for candidate in candidate_posts:
+        score = candidate.tags.filter(id__in=source_tags).count() * TAG_MATCH_SCORE
+        if post.category and candidate.category == post.category:
+            score += CATEGORY_MATCH_SCORE
+        if score > 0:
+            scores[candidate.id] = score
+    return scores
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "在临时生成的文章数据上测量推荐计算的耗时 (数据在事务中生成，结束后回滚)。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, nargs='+', default=[10000, 100000], help="依次测量的文章总数")
+        parser.add_argument('--tags', type=int, default=500, help="标签数量")
+        parser.add_argument('--categories', type=int, default=20, help="分类数量")
+        parser.add_argument('--tags-per-post', type=int, default=4, help="每篇文章的标签数")
+        parser.add_argument('--samples', type=int, default=20, help="每个规模下计算推荐的源文章数")
+        parser.add_argument('--legacy-max-posts', type=int, default=10000,
+                            help="文章数不超过该值时同时测量改造前的实现并校验得分")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write("临时数据已回滚。")
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        author = User.objects.create(username=f"benchmark_{int(time.time())}")
+        categories = Category.objects.bulk_create(
+            [Category(name=f"bench-category-{i}", slug=f"bench-category-{i}") for i in range(options['categories'])]
+        )
+        tags = Tag.objects.bulk_create(
+            [Tag(name=f"bench-tag-{i}", slug=f"bench-tag-{i}") for i in range(options['tags'])]
+        )
+
+        created = 0
+        for total in sorted(options['posts']):
+            self._create_posts(rng, author, categories, tags, total - created, options['tags_per_post'])
+            created = total
+            self._measure(rng, total, options)
+
+    def _create_posts(self, rng, author, categories, tags, count, tags_per_post):
+        # bulk_create 不触发 post_save / m2m_changed，不会投递推荐生成任务
+        now = timezone.now()
+        through = Post.tags.through
+        for start in range(0, count, BULK_BATCH_SIZE):
+            posts = Post.objects.bulk_create([
+                Post(title=f"bench-{start + i}", content='', author=author, status='published',
+                     category=rng.choice(categories), published_at=now)
+                for i in range(min(BULK_BATCH_SIZE, count - start))
+            ])
+            through.objects.bulk_create([
+                through(post_id=post.id, tag_id=tag.id)
+                for post in posts for tag in rng.sample(tags, tags_per_post)
+            ])
+
+    def _measure(self, rng, total, options):
+        post_ids = list(Post.objects.filter(title__startswith='bench-').values_list('id', flat=True))
+        sources = list(Post.objects.filter(id__in=rng.sample(post_ids, min(options['samples'], len(post_ids)))))
+
+        timings = []
+        for post in sources:
+            started = time.perf_counter()
+            calculate_recommendations(post)
+            timings.append(time.perf_counter() - started)
+        self._report(f"{total} 篇文章 / 聚合查询", timings)
+
+        if total > options['legacy_max_posts']:
+            return
+        legacy_timings = []
+        for post in sources:
+            started = time.perf_counter()
+            scores = _legacy_scores(post)
+            legacy_timings.append(time.perf_counter() - started)
+            # 得分相同的文章顺序可能不同，只校验得分序列一致
+            expected = sorted(scores.values(), reverse=True)[:5]
+            actual = [scores.get(post_id) for post_id in calculate_recommendations(post)]
+            if actual != expected:
+                self.stderr.write(self.style.ERROR(f"文章 {post.id} 的推荐得分不一致: {actual} != {expected}"))
+        self._report(f"{total} 篇文章 / 改造前", legacy_timings)
+
+    def _report(self, label: str, timings: list):
+        timings = sorted(timings)
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: 平均 {statistics.mean(timings) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+        ))
@@ -0,0 +1,19 @@
+# ai_interview_backend/blog/management/commands/build_post_similarity.py
+
+from django.core.management.base import BaseCommand
+
+from blog.similarity import build_similarity_index, TOP_K, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "全量构建 (或重建) 基于正文 TF-IDF 的相似文章索引，首次部署时执行，之后由 Celery Beat 每晚重建。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="每篇文章保留的相似文章数")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="分块计算相似度时每块的文章数")
+
+    def handle(self, *args, **options):
+        stats = build_similarity_index(k=options['top_k'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"共索引 {stats['posts']} 篇文章，{stats['changed']} 篇的相似文章发生变化，耗时 {stats['seconds']} 秒。"
+        ))
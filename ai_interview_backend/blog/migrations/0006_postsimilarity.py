@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_backfill_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSimilarity',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='blog.post', verbose_name='文章')),
+                ('vector', models.BinaryField(blank=True, null=True, verbose_name='TF-IDF 向量')),
+                ('neighbors', models.JSONField(blank=True, default=list, verbose_name='相似文章')),
+                ('index_version', models.PositiveIntegerField(default=0, verbose_name='索引版本')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '文章相似度索引',
+                'verbose_name_plural': '文章相似度索引',
+            },
+        ),
+    ]
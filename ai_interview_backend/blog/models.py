@@ -133,4 +133,21 @@ class DailyPostStats(models.Model):
     class Meta:
         verbose_name = "文章每日统计"
         verbose_name_plural = verbose_name
-        unique_together = ('post', 'date')  # 确保每篇文章每天只有一条记录
\ No newline at end of file
+        unique_together = ('post', 'date')  # 确保每篇文章每天只有一条记录
+
+
+# 【核心新增】基于正文内容的相似文章索引 (见 blog/similarity.py)
+class PostSimilarity(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='similarity',
+                                verbose_name="文章")
+    # 截断后的 TF-IDF 稀疏向量 (int32 词项下标 + float32 权重)，用于发布新文章时增量计算相似度
+    vector = models.BinaryField(null=True, blank=True, verbose_name="TF-IDF 向量")
+    # 最相似的文章，按相似度降序: [[post_id, score], ...]
+    neighbors = models.JSONField(default=list, blank=True, verbose_name="相似文章")
+    # 生成向量时使用的分词/词表版本，与当前词表不一致的向量不参与增量计算
+    index_version = models.PositiveIntegerField(default=0, verbose_name="索引版本")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "文章相似度索引"
+        verbose_name_plural = verbose_name
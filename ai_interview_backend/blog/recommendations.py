@@ -1,51 +1,137 @@
 # ai-interview-backend/blog/recommendations.py (新建文件)
 
-from django.db.models import Q, Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count, Case, When, Value, F, ExpressionWrapper, FloatField
+from django_redis import get_redis_connection
 from .models import Post
+from .similarity import get_similar_posts, update_posts_similarity
 
 # 定义权重
 TAG_MATCH_SCORE = 5
 CATEGORY_MATCH_SCORE = 2
+# 正文相似度 (0-1 之间的余弦相似度) 的权重，相似度 0.5 相当于一个共同标签
+CONTENT_SIMILARITY_SCORE = 10
+# 得分相同时的排序 (与文章列表的默认排序一致，最后按 id 保证结果稳定)
+TIEBREAK_ORDERING = ('-published_at', '-created_at', '-id')
+
+# 待刷新推荐的文章 id 集合 (Redis Set)，由定时任务批量处理
+DIRTY_SET_KEY = 'recommendations:dirty'
+RECOMMENDATION_CACHE_TIMEOUT = 86400
+# 每次刷新最多处理的变更文章数，以及每篇变更文章连带刷新的共享标签最多的文章数
+REFRESH_BATCH_SIZE = getattr(settings, 'RECOMMENDATION_REFRESH_BATCH_SIZE', 200)
+TAG_NEIGHBOR_LIMIT = getattr(settings, 'RECOMMENDATION_TAG_NEIGHBOR_LIMIT', 50)
+
+
+def recommendation_cache_key(post_id: int) -> str:
+    return f"recommendations:{post_id}"
 
 
 def calculate_recommendations(post: Post, top_n: int = 5) -> list[int]:
     """
     为给定的文章计算推荐文章列表。
 
+    【性能优化】共同标签数、分类是否相同与正文相似度 (blog/similarity.py 预先计算的相似文章)
+    都在一条聚合查询中计算并排序，不再逐篇候选文章查询标签和分类 (N+1)。
+
     :param post: 源文章实例
     :param top_n: 需要推荐的文章数量
     :return: 推荐文章的 ID 列表
     """
-    if not post.tags.exists():
-        # 如果文章没有标签，则返回近期热门文章作为备选
+    # 获取源文章的所有标签 ID，以及正文最相似的文章
+    source_tags = list(post.tags.values_list('id', flat=True))
+    similar_posts = get_similar_posts(post.id)
+    if not source_tags and not similar_posts:
+        # 如果文章没有标签，也还没有相似度索引，则返回近期热门文章作为备选
         # 这里可以根据 view_count, like_count 等排序
         popular_posts = Post.objects.filter(status='published').exclude(id=post.id).order_by('-view_count')[:top_n]
         return [p.id for p in popular_posts]
 
-    # 获取源文章的所有标签 ID
-    source_tags = post.tags.values_list('id', flat=True)
-
-    # 查找至少有一个相同标签或相同分类的文章
-    candidate_posts = Post.objects.filter(
-        Q(tags__in=source_tags) | Q(category=post.category),
-        status='published'
-    ).exclude(id=post.id).distinct()
-
-    # 计算每篇文章的得分
-    scores = {}
-    for candidate in candidate_posts:
-        score = 0
-        # 计算标签匹配得分
-        shared_tags_count = candidate.tags.filter(id__in=source_tags).count()
-        score += shared_tags_count * TAG_MATCH_SCORE
-        # 计算分类匹配得分
-        if post.category and candidate.category == post.category:
-            score += CATEGORY_MATCH_SCORE
-
-        if score > 0:
-            scores[candidate.id] = score
-
-    # 按得分排序，并选出 top_n
-    sorted_post_ids = sorted(scores, key=scores.get, reverse=True)
-
-    return sorted_post_ids[:top_n]
\ No newline at end of file
+    # 查找至少有一个相同标签、相同分类或正文相似的文章；标签通过中间表子查询匹配，避免连接产生重复行
+    # (tags__in=[] 会让整条查询直接返回空结果，因此没有标签时不加入标签相关的条件)
+    candidate_filter = Q()
+    tag_score = Value(0)
+    if source_tags:
+        tagged_post_ids = Post.tags.through.objects.filter(tag_id__in=source_tags).values('post_id')
+        candidate_filter = Q(id__in=tagged_post_ids)
+        tag_score = Count('tags', filter=Q(tags__in=source_tags)) * TAG_MATCH_SCORE
+    category_bonus = Value(0)
+    if post.category_id:
+        candidate_filter |= Q(category_id=post.category_id)
+        category_bonus = Case(
+            When(category_id=post.category_id, then=Value(CATEGORY_MATCH_SCORE)),
+            default=Value(0),
+        )
+    content_bonus = Value(0.0)
+    if similar_posts:
+        candidate_filter |= Q(id__in=[post_id for post_id, _ in similar_posts])
+        content_bonus = Case(
+            *[When(id=post_id, then=Value(score * CONTENT_SIMILARITY_SCORE)) for post_id, score in similar_posts],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    # 计算每篇文章的得分，按得分排序，并选出 top_n
+    ranked = (
+        Post.objects.filter(candidate_filter, status='published')
+        .exclude(id=post.id)
+        .annotate(tag_score=tag_score)
+        .annotate(score=ExpressionWrapper(
+            F('tag_score') + category_bonus + content_bonus, output_field=FloatField()
+        ))
+        .filter(score__gt=0)
+        .order_by('-score', *TIEBREAK_ORDERING)
+        .values_list('id', flat=True)
+    )
+    return list(ranked[:top_n])
+
+
+def mark_recommendations_dirty(post_ids):
+    """标记推荐需要刷新的文章，重复标记只会刷新一次。"""
+    if post_ids:
+        get_redis_connection('default').sadd(DIRTY_SET_KEY, *post_ids)
+
+
+def tag_neighbors(post_ids: list) -> set:
+    """与各篇变更文章共享标签最多的文章，它们的推荐结果可能需要加入 (或移除) 变更的文章。"""
+    through = Post.tags.through
+    neighbors = set()
+    for post_id in post_ids:
+        source_tags = through.objects.filter(post_id=post_id).values('tag_id')
+        neighbors.update(
+            through.objects.filter(tag_id__in=source_tags).exclude(post_id=post_id)
+            .values('post_id').annotate(shared=Count('tag_id'))
+            .order_by('-shared', '-post_id').values_list('post_id', flat=True)[:TAG_NEIGHBOR_LIMIT]
+        )
+    return neighbors
+
+
+def refresh_dirty_recommendations(batch_size: int = REFRESH_BATCH_SIZE) -> dict:
+    """
+    【性能优化】批量刷新推荐：从 Redis 集合中取出一批变更的文章，
+    重新计算它们自身、共享标签最多的文章以及正文相似列表发生变化的文章的推荐，
+    所有缓存键一次写入 (django_redis 的 set_many 使用 pipeline)。
+    处理失败时把取出的 id 放回集合，下次重试。
+    """
+    redis = get_redis_connection('default')
+    dirty_ids = [int(post_id) for post_id in redis.spop(DIRTY_SET_KEY, batch_size) or []]
+    if not dirty_ids:
+        return {'dirty': 0, 'refreshed': 0}
+    try:
+        dirty_posts = list(Post.objects.filter(id__in=dirty_ids).only('id', 'title', 'content', 'status'))
+        affected = set(update_posts_similarity(dirty_posts))
+        affected.update(tag_neighbors([post.id for post in dirty_posts]))
+        affected.update(dirty_ids)
+
+        posts = Post.objects.filter(id__in=affected, status='published').only('id', 'category_id')
+        refreshed = {post.id: calculate_recommendations(post) for post in posts}
+        cache.set_many(
+            {recommendation_cache_key(post_id): ids for post_id, ids in refreshed.items()},
+            timeout=RECOMMENDATION_CACHE_TIMEOUT,
+        )
+        # 已下线或已删除的文章不再需要推荐缓存
+        cache.delete_many([recommendation_cache_key(post_id) for post_id in affected - refreshed.keys()])
+    except Exception:
+        redis.sadd(DIRTY_SET_KEY, *dirty_ids)
+        raise
+    return {'dirty': len(dirty_ids), 'refreshed': len(refreshed), 'remaining': redis.scard(DIRTY_SET_KEY)}
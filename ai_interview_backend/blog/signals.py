@@ -1,17 +1,48 @@
 # ai-interview-backend/blog/signals.py (新建文件)
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, m2m_changed, pre_delete
 from django.dispatch import receiver
 from .models import Post
-from .tasks import generate_recommendations_for_post
+from .recommendations import mark_recommendations_dirty, tag_neighbors
+from .similarity import get_similar_posts
+
+# 只更新这些计数字段的保存不影响推荐结果
+COUNTER_FIELDS = frozenset({'view_count', 'like_count', 'comment_count', 'bookmark_count'})
+
 
 @receiver(post_save, sender=Post)
-def trigger_recommendation_generation(sender, instance, created, **kwargs):
+def trigger_recommendation_generation(sender, instance, created, update_fields=None, **kwargs):
+    """
+    当文章被创建或更新时，标记它的推荐需要刷新，由定时任务 refresh_dirty_recommendations 批量处理。
+    """
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    # 新建的草稿不影响任何推荐；已有文章下线时仍需刷新，把它从其他文章的推荐中移除
+    if created and instance.status != 'published':
+        return
+    transaction.on_commit(lambda: mark_recommendations_dirty([instance.id]))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def mark_recommendations_dirty_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """文章的标签在保存之后才写入 (序列化器先保存文章再设置多对多字段)，标签变化时同样需要刷新。"""
+    if reverse and action == 'pre_clear':
+        # 从标签一侧清空 (tag.posts.clear()) 时 post_clear 不提供被移除的文章，在清空前查出来
+        post_ids = list(sender.objects.filter(tag_id=instance.id).values_list('post_id', flat=True))
+    elif action in ('post_add', 'post_remove') or (action == 'post_clear' and not reverse):
+        post_ids = list(pk_set or []) if reverse else [instance.id]
+    else:
+        return
+    transaction.on_commit(lambda: mark_recommendations_dirty(post_ids))
+
+
+@receiver(pre_delete, sender=Post)
+def mark_recommendations_dirty_on_delete(sender, instance, **kwargs):
     """
-    当文章被创建或更新时，异步触发推荐生成任务。
+    删除的文章仍在其他文章的推荐缓存中。删除前 (标签关联和相似度索引还在) 找出共享标签最多的文章和正文相似的文章，
+    提交后连同它自身一起标记刷新 (它自身的推荐缓存会在刷新时删除)。
     """
-    # 只为已发布的文章生成推荐
-    if instance.status == 'published':
-        print(f"Post '{instance.title}' saved, triggering recommendation task.")
-        # 使用 .delay() 来异步执行任务
-        generate_recommendations_for_post.delay(instance.id)
\ No newline at end of file
+    post_ids = {instance.id} | tag_neighbors([instance.id])
+    post_ids.update(post_id for post_id, _ in get_similar_posts(instance.id))
+    transaction.on_commit(lambda: mark_recommendations_dirty(sorted(post_ids)))
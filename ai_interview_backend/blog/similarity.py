@@ -0,0 +1,314 @@
+# ai-interview-backend/blog/similarity.py
+"""
+基于正文内容的相似文章索引。
+
+- 全量构建 (build_similarity_index，由 Celery 定时任务调用)：用 jieba 对标题和 Markdown 正文分词，
+  构建 TF-IDF 稀疏矩阵，分块计算余弦相似度并取每篇文章的 top-k 相似文章，写入 PostSimilarity 表；
+- 增量更新 (update_posts_similarity，刷新推荐时对一批变更的文章调用)：用全量构建时保存的词表为新文章计算向量，
+  与已有文章的向量比较，写入它的相似文章，并把它插入到相似度足够高的文章的相似列表中。
+  增量计算使用每篇文章截断后的向量 (VECTOR_TERMS 个权重最高的词)，结果是近似的，下一次全量构建时修正。
+"""
+
+import re
+import time
+
+import jieba
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from core.db import bulk_upsert
+
+from .models import Post, PostSimilarity
+
+TOP_K = getattr(settings, 'POST_SIMILARITY_TOP_K', 20)
+# 每次参与矩阵乘法的文章数，决定分块计算时稠密结果 (CHUNK_SIZE x 文章数) 的内存占用
+CHUNK_SIZE = getattr(settings, 'POST_SIMILARITY_CHUNK_SIZE', 256)
+MAX_FEATURES = getattr(settings, 'POST_SIMILARITY_MAX_FEATURES', 50000)
+VECTOR_TERMS = getattr(settings, 'POST_SIMILARITY_VECTOR_TERMS', 128)
+# 低于该相似度的文章不计入相似列表
+MIN_SCORE = getattr(settings, 'POST_SIMILARITY_MIN_SCORE', 0.05)
+# 标题的词重复计入的次数，提高标题的权重
+TITLE_WEIGHT = 3
+# 文章数达到该值时才过滤在一半以上文章中出现的词 (样本太少时会把所有词都过滤掉)
+MAX_DF_MIN_DOCS = 20
+BATCH_SIZE = 1000
+
+VECTORIZER_CACHE_KEY = 'post_similarity:vectorizer'
+
+# 进程内缓存的已有文章向量 {索引版本: (文章 id, 向量矩阵, 已读取的最新 updated_at)}
+_stored_vectors = {}
+
+_MARKDOWN_NOISE = re.compile(
+    r'!\[[^\]]*\]\([^)]*\)'      # 图片
+    r'|\]\([^)]*\)'              # 链接地址 (保留链接文字)
+    r'|<[^>]+>'                  # HTML 标签
+    r'|```[\w+-]*'               # 代码块标记 (保留代码内容)
+    r'|[#>*_`~|\[\]]+'           # Markdown 符号
+)
+_TOKEN = re.compile(r'[\w一-鿿]')
+
+
+def _tokenize(text: str) -> list:
+    tokens = []
+    for token in jieba.lcut(_MARKDOWN_NOISE.sub(' ', text or '')):
+        token = token.strip().lower()
+        # 丢弃标点、纯数字和单字母
+        if not token or not _TOKEN.search(token) or token.isdigit() or (len(token) == 1 and token.isascii()):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def post_tokens(post: Post) -> list:
+    return _tokenize(post.title) * TITLE_WEIGHT + _tokenize(post.content)
+
+
+def _analyzer(tokens: list) -> list:
+    # 文档在传入前已分好词；定义为模块级函数，向量化器才能被序列化保存到缓存
+    return tokens
+
+
+def _encode_vector(indices: np.ndarray, values: np.ndarray) -> bytes:
+    return indices.astype('<i4').tobytes() + values.astype('<f4').tobytes()
+
+
+def _decode_vector(blob: bytes) -> tuple:
+    blob = bytes(blob)  # 部分数据库驱动返回 memoryview
+    n_terms = len(blob) // 8
+    return np.frombuffer(blob, '<i4', n_terms), np.frombuffer(blob, '<f4', n_terms, offset=n_terms * 4)
+
+
+def _truncate_row(matrix: sparse.csr_matrix, row: int) -> bytes:
+    """只保留一行中权重最高的 VECTOR_TERMS 个词，重新归一化后编码。"""
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    indices, values = matrix.indices[start:end], matrix.data[start:end]
+    if len(values) > VECTOR_TERMS:
+        keep = np.argpartition(-values, VECTOR_TERMS - 1)[:VECTOR_TERMS]
+        indices, values = indices[keep], values[keep]
+    norm = np.linalg.norm(values)
+    if norm:
+        values = values / norm
+    return _encode_vector(indices, values)
+
+
+def _top_k(scores: np.ndarray, candidate_ids: np.ndarray, k: int) -> list:
+    """从一行相似度中取 top-k，得分相同时按文章 id 排序以保证结果稳定。"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return []
+    # 第 k 大的得分；与它相同的文章都作为候选，否则 argpartition 会在并列的文章中任意取舍
+    kth_score = -np.partition(-scores, k - 1)[k - 1]
+    top = np.flatnonzero(scores >= max(kth_score, MIN_SCORE))
+    order = np.lexsort((candidate_ids[top], -scores[top]))[:k]
+    return [[int(candidate_ids[i]), round(float(scores[i]), 4)] for i in top[order]]
+
+
+def compute_neighbors(matrix: sparse.csr_matrix, post_ids: np.ndarray, k: int = TOP_K,
+                      chunk_size: int = CHUNK_SIZE):
+    """分块计算所有文章两两之间的余弦相似度 (行向量已归一化)，依次产生 (文章 id, 相似文章列表)。"""
+    matrix_t = matrix.T.tocsc()
+    for start in range(0, matrix.shape[0], chunk_size):
+        block = (matrix[start:start + chunk_size] @ matrix_t).toarray()
+        rows = np.arange(block.shape[0])
+        block[rows, rows + start] = -1.0  # 排除自身
+        for row in rows:
+            yield int(post_ids[start + row]), _top_k(block[row], post_ids, k)
+
+
+def _invalidate_recommendations(post_ids):
+    cache.delete_many([f"recommendations:{post_id}" for post_id in post_ids])
+
+
+def build_similarity_index(k: int = TOP_K, chunk_size: int = CHUNK_SIZE) -> dict:
+    """全量重建相似文章索引，返回统计信息。"""
+    started = time.perf_counter()
+    post_ids, documents = [], []
+    queryset = Post.objects.filter(status='published').only('id', 'title', 'content').order_by('id')
+    for post in queryset.iterator(chunk_size=BATCH_SIZE):
+        post_ids.append(post.id)
+        documents.append(post_tokens(post))
+    if len(post_ids) < 2:
+        return {'posts': len(post_ids), 'changed': 0, 'seconds': 0.0}
+
+    vectorizer = TfidfVectorizer(
+        analyzer=_analyzer, sublinear_tf=True, max_features=MAX_FEATURES, dtype=np.float32,
+        max_df=0.5 if len(post_ids) >= MAX_DF_MIN_DOCS else 1.0,
+    )
+    matrix = vectorizer.fit_transform(documents).tocsr()  # 行向量已做 L2 归一化
+    post_ids = np.asarray(post_ids)
+    version = (PostSimilarity.objects.aggregate(version=Max('index_version'))['version'] or 0) + 1
+
+    old_neighbors = dict(PostSimilarity.objects.values_list('post_id', 'neighbors').iterator(chunk_size=BATCH_SIZE))
+    changed, batch = [], []
+    for row, (post_id, neighbors) in enumerate(compute_neighbors(matrix, post_ids, k, chunk_size)):
+        old = old_neighbors.get(post_id)
+        if old is None or [item[0] for item in old] != [item[0] for item in neighbors]:
+            changed.append(post_id)
+        batch.append(PostSimilarity(post_id=post_id, vector=_truncate_row(matrix, row), neighbors=neighbors,
+                                    index_version=version))
+        if len(batch) >= BATCH_SIZE:
+            _save_rows(batch)
+            batch = []
+    if batch:
+        _save_rows(batch)
+
+    # 已下线的文章不再参与推荐
+    PostSimilarity.objects.exclude(post__status='published').delete()
+    _stored_vectors.clear()
+    cache.set(VECTORIZER_CACHE_KEY, {'version': version, 'vectorizer': vectorizer}, timeout=None)
+    _invalidate_recommendations(changed)
+    return {
+        'posts': len(post_ids),
+        'terms': len(vectorizer.vocabulary_),
+        'changed': len(changed),
+        'version': version,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def _save_rows(rows: list):
+    bulk_upsert(
+        PostSimilarity, rows, unique_fields=['post'],
+        update_fields=['vector', 'neighbors', 'index_version', 'updated_at'],
+    )
+
+
+def update_posts_similarity(posts: list) -> list:
+    """
+    一批文章发布或修改后增量更新索引，返回相似列表发生变化的其他文章 id。
+    已有文章的向量缓存在进程内 (见 _load_stored_vectors)，整批文章通过一次矩阵乘法得到与所有文章的相似度。
+    还没有全量构建过索引 (或缓存中的词表已丢失) 时不做任何事，等待下一次全量构建。
+    """
+    unpublished = [post.id for post in posts if post.status != 'published']
+    if unpublished:
+        PostSimilarity.objects.filter(post_id__in=unpublished).delete()
+    posts = [post for post in posts if post.status == 'published']
+    state = cache.get(VECTORIZER_CACHE_KEY) if posts else None
+    if not state:
+        return []
+    vectorizer, version = state['vectorizer'], state['version']
+
+    vectors = vectorizer.transform([post_tokens(post) for post in posts]).tocsr()
+    encoded = [_truncate_row(vectors, row) for row in range(len(posts))]
+    n_terms = len(vectorizer.vocabulary_)
+    query = _stack_vectors(encoded, n_terms)
+
+    other_ids, stored = _load_stored_vectors(version, n_terms)
+    scores = (query @ stored.T).toarray()
+    # 修改前的向量与各篇文章的相似度，用于找出不再相似、需要从相似列表中移除它的文章
+    previous = np.searchsorted(other_ids, [post.id for post in posts])
+    has_previous = np.isin([post.id for post in posts], other_ids)
+    old_scores = (stored[previous[has_previous]] @ stored.T).toarray()
+
+    changed = set()
+    for row, post in enumerate(posts):
+        post_scores = scores[row]
+        post_scores[other_ids == post.id] = -1.0  # 排除自身
+        neighbors = _top_k(post_scores, other_ids, TOP_K)
+        changed.update(_insert_into_neighbors(post.id, other_ids, post_scores))
+        if has_previous[row]:
+            post_old_scores = old_scores[np.count_nonzero(has_previous[:row])]
+            no_longer_close = (post_old_scores >= MIN_SCORE) & (post_scores < MIN_SCORE)
+            changed.update(_remove_from_neighbors(post.id, other_ids[no_longer_close].tolist()))
+        PostSimilarity.objects.update_or_create(
+            post_id=post.id,
+            defaults={'vector': encoded[row], 'neighbors': neighbors, 'index_version': version},
+        )
+    # 调用方 (refresh_dirty_recommendations) 会重新计算这些文章的推荐
+    changed.difference_update(post.id for post in posts)
+    return sorted(changed)
+
+
+def _load_stored_vectors(version: int, n_terms: int) -> tuple:
+    """
+    【性能优化】返回当前索引版本中已有文章的 (按 id 排序的文章 id, 截断向量组成的稀疏矩阵)。
+    矩阵缓存在进程内：索引版本变化后才重新读取全部向量，之后每次只读取上次读取后更新过的行，
+    并去掉已删除的行 (只读取 id)。按 updated_at 增量读取是近似的 (其他进程的事务提交晚于它的时间戳时会漏读)，
+    下一次全量构建时修正。
+    """
+    cached = _stored_vectors.get(version)
+    rows = PostSimilarity.objects.filter(index_version=version)
+    if cached is None:
+        _stored_vectors.clear()
+        ids, matrix, watermark = np.zeros(0, dtype=np.int64), _stack_vectors([], n_terms), None
+    else:
+        ids, matrix, watermark = cached
+        if watermark is not None:
+            rows = rows.filter(updated_at__gte=watermark)
+
+    updated_ids, blobs = [], []
+    for post_id, blob, updated_at in rows.values_list('post_id', 'vector', 'updated_at').iterator(
+            chunk_size=BATCH_SIZE):
+        updated_ids.append(post_id)
+        blobs.append(blob)
+        watermark = updated_at if watermark is None else max(watermark, updated_at)
+    if cached is not None:
+        live_ids = np.fromiter(
+            PostSimilarity.objects.filter(index_version=version).values_list('post_id', flat=True)
+            .iterator(chunk_size=BATCH_SIZE), dtype=np.int64,
+        )
+        keep = np.isin(ids, live_ids) & ~np.isin(ids, updated_ids)
+        ids, matrix = ids[keep], matrix[keep]
+
+    if updated_ids:
+        ids = np.concatenate([ids, np.asarray(updated_ids, dtype=np.int64)])
+        matrix = sparse.vstack([matrix, _stack_vectors(blobs, n_terms)], format='csr')
+    order = np.argsort(ids, kind='stable')
+    ids, matrix = ids[order], matrix[order]
+    _stored_vectors[version] = (ids, matrix, watermark)
+    return ids, matrix
+
+
+def _stack_vectors(blobs: list, n_terms: int) -> sparse.csr_matrix:
+    """把编码后的向量拼成稀疏矩阵，每个向量一行。"""
+    if not blobs:
+        return sparse.csr_matrix((0, n_terms), dtype=np.float32)
+    decoded = [_decode_vector(blob) for blob in blobs]
+    indptr = np.zeros(len(decoded) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(indices) for indices, _ in decoded])
+    return sparse.csr_matrix(
+        (np.concatenate([values for _, values in decoded]), np.concatenate([indices for indices, _ in decoded]),
+         indptr),
+        shape=(len(decoded), n_terms),
+    )
+
+
+def _insert_into_neighbors(post_id: int, other_ids: np.ndarray, scores: np.ndarray) -> list:
+    """把新文章插入到相似度足够高的文章的相似列表中 (或更新已有的得分)。"""
+    close = scores >= MIN_SCORE
+    score_map = dict(zip(other_ids[close].tolist(), scores[close].tolist()))
+    changed = []
+    for row in PostSimilarity.objects.filter(post_id__in=list(score_map)).only('post_id', 'neighbors'):
+        score = round(score_map[row.post_id], 4)
+        neighbors = [item for item in row.neighbors if item[0] != post_id]
+        if len(neighbors) >= TOP_K and score <= neighbors[-1][1]:
+            if len(neighbors) == len(row.neighbors):
+                continue
+        neighbors.append([post_id, score])
+        neighbors.sort(key=lambda item: (-item[1], item[0]))
+        row.neighbors = neighbors[:TOP_K]
+        changed.append(row)
+    PostSimilarity.objects.bulk_update(changed, ['neighbors'], batch_size=BATCH_SIZE)
+    return [row.post_id for row in changed]
+
+
+def _remove_from_neighbors(post_id: int, post_ids: list) -> list:
+    """修改后的文章与这些文章不再相似时，把它从它们的相似列表中移除。"""
+    changed = []
+    for row in PostSimilarity.objects.filter(post_id__in=post_ids).only('post_id', 'neighbors'):
+        neighbors = [item for item in row.neighbors if item[0] != post_id]
+        if len(neighbors) != len(row.neighbors):
+            row.neighbors = neighbors
+            changed.append(row)
+    PostSimilarity.objects.bulk_update(changed, ['neighbors'], batch_size=BATCH_SIZE)
+    return [row.post_id for row in changed]
+
+
+def get_similar_posts(post_id: int) -> list:
+    """读取索引中的相似文章 [(post_id, score), ...]；没有索引时返回空列表。"""
+    row = PostSimilarity.objects.filter(post_id=post_id).values_list('neighbors', flat=True).first()
+    return [(item[0], item[1]) for item in row or []]
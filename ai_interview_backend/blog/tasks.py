@@ -2,8 +2,9 @@
 from celery import shared_task
 from django.utils import timezone
 from .models import Post, DailyPostStats
-from .recommendations import calculate_recommendations
-from django.core.cache import cache
+from .recommendations import mark_recommendations_dirty, refresh_dirty_recommendations
+from .similarity import build_similarity_index
+from .view_counter import flush_view_counts
 
 @shared_task
 def record_daily_stats():
@@ -12,11 +13,11 @@ def record_daily_stats():
 
     for post in posts:
         # 使用 update_or_create 来避免重复创建
+        # 当日浏览量由 flush_post_views 写回时累加，这里不再覆盖
         DailyPostStats.objects.update_or_create(
             post=post,
             date=today,
             defaults={
-                'views': post.view_count,
                 'likes': post.like_count
             }
         )
@@ -26,17 +27,40 @@ def record_daily_stats():
 @shared_task
 def generate_recommendations_for_post(post_id: int):
     """
-    为单篇文章生成推荐并存入 Redis 缓存。
+    为单篇文章生成推荐。文章保存时不再逐篇投递这个任务 (见 blog/signals.py)，
+    保留它以兼容队列中已有的消息：只标记文章，由 refresh_dirty_recommendations 批量处理。
     """
-    try:
-        post = Post.objects.get(id=post_id)
-        recommended_ids = calculate_recommendations(post)
+    mark_recommendations_dirty([post_id])
+    return f"Marked Post ID {post_id} for recommendation refresh"
 
-        # 缓存键的格式：recommendations:post_id
-        cache_key = f"recommendations:{post_id}"
-        # 缓存有效期设置为 1 天 (86400秒)，之后会自动过期或被下次更新覆盖
-        cache.set(cache_key, recommended_ids, timeout=86400)
 
-        return f"Successfully generated recommendations for Post ID {post_id}"
-    except Post.DoesNotExist:
-        return f"Post with ID {post_id} not found."
\ No newline at end of file
+@shared_task
+def refresh_recommendations():
+    """
+    批量刷新变更文章及受影响文章的推荐缓存，由 Celery Beat 定时执行。
+    """
+    stats = refresh_dirty_recommendations()
+    if stats['dirty']:
+        print(f"Celery 任务：推荐刷新完成: {stats}")
+    return f"Refreshed recommendations for {stats['refreshed']} posts ({stats['dirty']} changed)."
+
+
+@shared_task
+def rebuild_post_similarity_index():
+    """
+    全量重建正文相似度索引 (分词、TF-IDF、top-k 相似文章)，由 Celery Beat 每晚执行。
+    """
+    stats = build_similarity_index()
+    print(f"Celery 任务：相似文章索引重建完成: {stats}")
+    return f"Rebuilt similarity index for {stats['posts']} posts, {stats['changed']} changed."
+
+
+@shared_task
+def flush_post_views():
+    """
+    把 Redis 中缓冲的文章浏览量批量写回 Post.view_count 和 DailyPostStats，由 Celery Beat 定时执行。
+    """
+    result = flush_view_counts()
+    if result.get('skipped'):
+        return "Another flush is in progress"
+    return f"Flushed {result['views']} views from {result['days']} day buffer(s)"
@@ -1,3 +1,436 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import numpy as np
+from redis import RedisError
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, SimpleTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from . import similarity, view_counter
+from .models import Category, Tag, Post, PostSimilarity, DailyPostStats
+from . import recommendations
+from .recommendations import calculate_recommendations, recommendation_cache_key, DIRTY_SET_KEY
+
+
+def _emulate_mysql_upsert(test_case):
+    """让 SQLite 按 MySQL 的方式执行 bulk_create 的 upsert：不支持指定冲突字段，按任意唯一索引判断冲突。"""
+    def on_conflict_suffix_sql(fields, on_conflict, update_fields, unique_fields):
+        if on_conflict is None:
+            return ''
+        return 'ON CONFLICT DO UPDATE SET ' + ', '.join(
+            f'{name} = EXCLUDED.{name}' for name in map(connection.ops.quote_name, update_fields)
+        )
+    patchers = [
+        mock.patch.object(type(connection.features), 'supports_update_conflicts_with_target', False),
+        mock.patch.object(connection.ops, 'on_conflict_suffix_sql', on_conflict_suffix_sql),
+    ]
+    for patcher in patchers:
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+
+
+class CalculateRecommendationsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        self.category = Category.objects.create(name='后端', slug='backend')
+        self.other_category = Category.objects.create(name='前端', slug='frontend')
+        self.python = Tag.objects.create(name='Python', slug='python')
+        self.django = Tag.objects.create(name='Django', slug='django')
+        self.now = timezone.now()
+        self.source = self._post('source', tags=[self.python, self.django], category=self.category)
+
+    def _post(self, title, tags=(), category=None, status='published', published_at=None, **fields):
+        post = Post.objects.create(
+            title=title, content=title, author=self.author, status=status, category=category,
+            published_at=published_at or self.now, **fields,
+        )
+        post.tags.set(tags)
+        return post
+
+    def test_tags_outweigh_category(self):
+        category_only = self._post('category', category=self.category)
+        one_tag = self._post('one tag', tags=[self.python], category=self.other_category)
+        two_tags = self._post('two tags', tags=[self.python, self.django])
+        one_tag_and_category = self._post('one tag and category', tags=[self.python], category=self.category)
+        self._post('unrelated', category=self.other_category)
+        self._post('draft', tags=[self.python, self.django], status='draft')
+
+        self.assertEqual(
+            calculate_recommendations(self.source),
+            [two_tags.id, one_tag_and_category.id, one_tag.id, category_only.id],
+        )
+
+    def test_content_similarity_is_scored(self):
+        similar = self._post('similar')
+        two_tags = self._post('two tags', tags=[self.python, self.django])
+        category_only = self._post('category', category=self.category)
+        # 相似度 0.5 相当于一个共同标签 (5 分)
+        PostSimilarity.objects.create(post=self.source, neighbors=[[similar.id, 0.5]])
+
+        self.assertEqual(calculate_recommendations(self.source), [two_tags.id, similar.id, category_only.id])
+
+    def test_ties_are_broken_by_publish_time_then_id(self):
+        older = self._post('older', tags=[self.python], published_at=self.now - timedelta(days=1))
+        first = self._post('first', tags=[self.python])
+        second = self._post('second', tags=[self.python])
+
+        self.assertEqual(calculate_recommendations(self.source), [second.id, first.id, older.id])
+        self.assertEqual(calculate_recommendations(self.source, top_n=2), [second.id, first.id])
+
+    def test_post_without_tags_or_similarity_falls_back_to_popular(self):
+        lonely = self._post('lonely')
+        popular = self._post('popular', view_count=100)
+        self._post('draft', status='draft', view_count=1000)
+
+        self.assertEqual(calculate_recommendations(lonely, top_n=2), [popular.id, self.source.id])
+
+
+class RecommendationRefreshTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch('blog.recommendations.get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        self.python = Tag.objects.create(name='Python', slug='python')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = self._post('first', tags=[self.python])
+            self.second = self._post('second', tags=[self.python])
+        self.redis.delete(DIRTY_SET_KEY)
+
+    def _post(self, title, tags=(), status='published'):
+        post = Post.objects.create(title=title, content=title, author=self.author, status=status)
+        post.tags.set(tags)
+        return post
+
+    def _dirty(self):
+        return sorted(int(post_id) for post_id in self.redis.smembers(DIRTY_SET_KEY))
+
+    def test_posts_are_marked_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.first.title = 'renamed'
+            self.first.save()
+        self.assertEqual(self._dirty(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._dirty(), [self.first.id])
+
+    def test_counter_only_saves_are_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.view_count = 10
+            self.first.save(update_fields=['view_count', 'like_count'])
+        self.assertEqual(self._dirty(), [])
+
+    def test_new_drafts_are_ignored_but_unpublishing_is_marked(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = self._post('draft', status='draft')
+        self.assertEqual(self._dirty(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.status = 'draft'
+            self.first.save()
+        self.assertEqual(self._dirty(), [self.first.id])
+        self.assertNotIn(draft.id, self._dirty())
+
+    def test_tag_changes_are_marked_from_both_sides(self):
+        django = Tag.objects.create(name='Django', slug='django')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.tags.add(django)
+        self.assertEqual(self._dirty(), [self.first.id])
+        self.redis.delete(DIRTY_SET_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            django.posts.add(self.second)
+        self.assertEqual(self._dirty(), [self.second.id])
+        self.redis.delete(DIRTY_SET_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            django.posts.clear()
+        self.assertEqual(self._dirty(), [self.first.id, self.second.id])
+
+    def test_deleting_a_post_marks_its_tag_neighbors(self):
+        third = self._post('third', tags=[self.python])
+        deleted_id = self.first.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertEqual(self._dirty(), sorted([deleted_id, self.second.id, third.id]))
+
+    def test_refresh_caches_published_and_drops_unpublished(self):
+        draft = self._post('draft', tags=[self.python], status='draft')
+        cache.set(recommendation_cache_key(draft.id), [self.first.id])
+        recommendations.mark_recommendations_dirty([self.first.id, draft.id])
+
+        stats = recommendations.refresh_dirty_recommendations()
+
+        self.assertEqual(stats, {'dirty': 2, 'refreshed': 2, 'remaining': 0})
+        self.assertEqual(cache.get(recommendation_cache_key(self.first.id)), [self.second.id])
+        self.assertEqual(cache.get(recommendation_cache_key(self.second.id)), [self.first.id])
+        self.assertIsNone(cache.get(recommendation_cache_key(draft.id)))
+
+    def test_failed_refresh_puts_ids_back(self):
+        recommendations.mark_recommendations_dirty([self.first.id, self.second.id])
+        with mock.patch.object(recommendations, 'calculate_recommendations', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                recommendations.refresh_dirty_recommendations()
+        self.assertEqual(self._dirty(), [self.first.id, self.second.id])
+
+    def test_refresh_without_dirty_posts(self):
+        self.assertEqual(recommendations.refresh_dirty_recommendations(), {'dirty': 0, 'refreshed': 0})
+
+
+class TopKTests(SimpleTestCase):
+    def test_orders_by_score_and_filters_low_scores(self):
+        scores = np.array([0.2, 0.9, similarity.MIN_SCORE / 2, 0.5, -1.0])
+        ids = np.array([10, 11, 12, 13, 14])
+        self.assertEqual(similarity._top_k(scores, ids, 3), [[11, 0.9], [13, 0.5], [10, 0.2]])
+        self.assertEqual(similarity._top_k(scores, ids, 10), [[11, 0.9], [13, 0.5], [10, 0.2]])
+
+    def test_ties_are_ordered_by_id(self):
+        scores = np.array([0.5, 0.5, 0.5, 0.1])
+        ids = np.array([30, 10, 20, 40])
+        self.assertEqual(similarity._top_k(scores, ids, 2), [[10, 0.5], [20, 0.5]])
+
+    def test_empty_input(self):
+        self.assertEqual(similarity._top_k(np.array([]), np.array([], dtype=np.int64), 5), [])
+
+
+class InsertIntoNeighborsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(similarity, 'TOP_K', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        self.posts = [Post.objects.create(title=f'post {i}', content='', author=author) for i in range(4)]
+        self.new_id = 999
+
+    def _row(self, post, neighbors):
+        PostSimilarity.objects.create(post=post, neighbors=neighbors)
+
+    def _neighbors(self, post):
+        return PostSimilarity.objects.get(post=post).neighbors
+
+    def _insert(self, scores):
+        other_ids = np.array([post.id for post in self.posts[:len(scores)]])
+        return similarity._insert_into_neighbors(self.new_id, other_ids, np.array(scores))
+
+    def test_inserts_into_lists_with_room_or_lower_scores(self):
+        with_room, full_low, full_high, below_min = self.posts
+        self._row(with_room, [[1, 0.9]])
+        self._row(full_low, [[1, 0.9], [2, 0.3]])
+        self._row(full_high, [[1, 0.9], [2, 0.8]])
+        self._row(below_min, [])
+
+        changed = self._insert([0.5, 0.5, 0.5, similarity.MIN_SCORE / 2])
+
+        self.assertEqual(sorted(changed), [with_room.id, full_low.id])
+        self.assertEqual(self._neighbors(with_room), [[1, 0.9], [self.new_id, 0.5]])
+        self.assertEqual(self._neighbors(full_low), [[1, 0.9], [self.new_id, 0.5]])
+        self.assertEqual(self._neighbors(full_high), [[1, 0.9], [2, 0.8]])
+        self.assertEqual(self._neighbors(below_min), [])
+
+    def test_existing_entry_is_rescored(self):
+        post = self.posts[0]
+        self._row(post, [[self.new_id, 0.9], [2, 0.8]])
+
+        self.assertEqual(self._insert([0.1]), [post.id])
+        self.assertEqual(self._neighbors(post), [[2, 0.8], [self.new_id, 0.1]])
+
+    def test_ties_are_ordered_by_id(self):
+        post = self.posts[0]
+        self._row(post, [[self.new_id + 1, 0.5]])
+
+        self._insert([0.5])
+        self.assertEqual(self._neighbors(post), [[self.new_id, 0.5], [self.new_id + 1, 0.5]])
+
+
+class SimilarityIndexTests(TestCase):
+    def setUp(self):
+        _emulate_mysql_upsert(self)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(similarity._stored_vectors.clear)
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        self.django_posts = [
+            self._post('Django ORM', 'django orm queryset python database migrations'),
+            self._post('Django views', 'django views python templates queryset'),
+        ]
+        self.cooking = self._post('Braised pork', 'pork soy sauce sugar recipe cooking')
+
+    def _post(self, title, content, status='published'):
+        return Post.objects.create(title=title, content=content, author=self.author, status=status)
+
+    def _neighbor_ids(self, post):
+        return [post_id for post_id, _ in similarity.get_similar_posts(post.id)]
+
+    def test_build_then_update_incrementally(self):
+        stats = similarity.build_similarity_index()
+        self.assertEqual(stats['posts'], 3)
+        first, second = self.django_posts
+        self.assertEqual(self._neighbor_ids(first), [second.id])
+        self.assertEqual(self._neighbor_ids(self.cooking), [])
+
+        new_post = self._post('Django admin', 'django admin python queryset')
+        changed = similarity.update_posts_similarity([new_post])
+
+        self.assertEqual(changed, [first.id, second.id])
+        self.assertEqual(set(self._neighbor_ids(new_post)), {first.id, second.id})
+        self.assertIn(new_post.id, self._neighbor_ids(first))
+        self.assertNotIn(new_post.id, self._neighbor_ids(self.cooking))
+
+        # 重建索引时覆盖已有的行
+        similarity.build_similarity_index()
+        self.assertEqual(PostSimilarity.objects.count(), 4)
+        self.assertEqual(set(PostSimilarity.objects.values_list('index_version', flat=True)), {2})
+
+    def test_edit_removes_post_from_lists_it_no_longer_belongs_to(self):
+        similarity.build_similarity_index()
+        first, second = self.django_posts
+        first.content = 'pork soy sauce sugar recipe'
+        first.title = 'Pork recipe'
+        first.save()
+
+        changed = similarity.update_posts_similarity([first])
+
+        self.assertEqual(changed, [second.id, self.cooking.id])
+        self.assertEqual(self._neighbor_ids(second), [])
+        self.assertEqual(self._neighbor_ids(self.cooking), [first.id])
+        self.assertEqual(self._neighbor_ids(first), [self.cooking.id])
+
+    def test_stored_vectors_are_reused_between_updates(self):
+        for i in range(8):
+            self._post(f'Filler {i}', f'unrelated filler words number{i}')
+        similarity.build_similarity_index()
+        similarity.update_posts_similarity([self._post('Django admin', 'django admin python queryset')])
+        deleted = self.django_posts[1]
+        deleted.delete()
+
+        latest = self._post('Django forms', 'django forms python queryset')
+        with mock.patch.object(similarity, '_decode_vector', wraps=similarity._decode_vector) as decode:
+            similarity.update_posts_similarity([latest])
+        # 只解码新文章的向量和上次读取后更新过的行，而不是全部 12 篇文章的向量
+        self.assertLessEqual(decode.call_count, 3)
+        neighbor_ids = self._neighbor_ids(latest)
+        self.assertIn(self.django_posts[0].id, neighbor_ids)
+        self.assertNotIn(deleted.id, neighbor_ids)
+
+    def test_update_without_index_is_a_no_op(self):
+        self.assertEqual(similarity.update_posts_similarity(self.django_posts), [])
+        self.assertFalse(PostSimilarity.objects.exists())
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        for target in ('core.locks.get_redis_connection', 'blog.view_counter.get_redis_connection'):
+            patcher = mock.patch(target, return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        self.post = Post.objects.create(title='first', content='', author=author, status='published')
+        self.other = Post.objects.create(title='second', content='', author=author, status='published')
+        self.day = view_counter._today()
+
+    def _record(self, post, times, viewer=None):
+        for _ in range(times):
+            view_counter.record_post_view(post.id, viewer)
+
+    def _views(self, post):
+        post.refresh_from_db()
+        stats = DailyPostStats.objects.filter(post=post, date=self.day).first()
+        return post.view_count, stats.views if stats else None
+
+    def test_flush_applies_buffered_views(self):
+        self._record(self.post, 3)
+        self._record(self.other, 2)
+        DailyPostStats.objects.create(post=self.other, date=self.day, views=4)
+
+        self.assertEqual(view_counter.flush_view_counts(), {'views': 5, 'days': 1})
+        self.assertEqual(self._views(self.post), (3, 3))
+        self.assertEqual(self._views(self.other), (2, 6))
+        self.assertEqual(self.redis.keys('post_views:*'), [])
+
+    def test_flush_on_mysql(self):
+        _emulate_mysql_upsert(self)
+        self._record(self.post, 3)
+        self._record(self.other, 2)
+        DailyPostStats.objects.create(post=self.other, date=self.day, views=4)
+
+        self.assertEqual(view_counter.flush_view_counts(), {'views': 5, 'days': 1})
+        self.assertEqual(self._views(self.post), (3, 3))
+        self.assertEqual(self._views(self.other), (2, 6))
+
+    def test_flush_drops_views_of_deleted_posts(self):
+        self._record(self.post, 1)
+        self._record(self.other, 2)
+        self.other.delete()
+
+        view_counter.flush_view_counts()
+        self.assertEqual(self._views(self.post), (1, 1))
+        self.assertFalse(DailyPostStats.objects.exclude(post=self.post).exists())
+        self.assertEqual(self.redis.keys('post_views:*'), [])
+
+    def test_flush_retries_leftover_flushing_hash(self):
+        self.redis.hset(view_counter.FLUSHING_PREFIX + self.day, str(self.post.id), 4)
+        self._record(self.post, 1)
+
+        self.assertEqual(view_counter.flush_view_counts(), {'views': 5, 'days': 2})
+        self.assertEqual(self._views(self.post), (5, 5))
+
+    def test_flush_skips_when_another_worker_holds_the_lock(self):
+        self.redis.set(view_counter.FLUSH_LOCK_KEY, 'other-worker')
+        self._record(self.post, 1)
+
+        self.assertEqual(view_counter.flush_view_counts(), {'skipped': True})
+        self.assertEqual(self._views(self.post), (0, None))
+        self.assertEqual(self.redis.get(view_counter.FLUSH_LOCK_KEY), b'other-worker')
+
+    def test_flush_keeps_lock_taken_over_after_expiry(self):
+        self._record(self.post, 1)
+        apply_deltas = view_counter._apply_deltas
+
+        def slow_apply(day, deltas):
+            # 写回超过锁的超时时间，锁已被下一次执行获得
+            self.redis.set(view_counter.FLUSH_LOCK_KEY, 'next-worker')
+            apply_deltas(day, deltas)
+
+        with mock.patch.object(view_counter, '_apply_deltas', side_effect=slow_apply):
+            view_counter.flush_view_counts()
+        self.assertEqual(self.redis.get(view_counter.FLUSH_LOCK_KEY), b'next-worker')
+
+    def test_failed_flush_keeps_deltas_and_releases_lock(self):
+        self._record(self.post, 2)
+        with mock.patch.object(view_counter, '_apply_deltas', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                view_counter.flush_view_counts()
+        self.assertFalse(self.redis.exists(view_counter.FLUSH_LOCK_KEY))
+
+        view_counter.flush_view_counts()
+        self.assertEqual(self._views(self.post), (2, 2))
+
+    def test_pending_views_include_hash_being_flushed(self):
+        self.redis.hset(view_counter.FLUSHING_PREFIX + self.day, str(self.post.id), 4)
+        self.assertEqual(view_counter.record_post_view(self.post.id), 5)
+
+    def test_unique_viewers_are_counted_once(self):
+        with mock.patch.object(view_counter, 'UNIQUE_VIEWERS', True):
+            self._record(self.post, 3, viewer='u1')
+            self.assertEqual(view_counter.record_post_view(self.post.id, 'u2'), 2)
+
+    def test_retrieve_counts_views_without_writing_to_the_database(self):
+        client = APIClient()
+        for expected in (1, 2):
+            response = client.get(f'/api/v1/posts/{self.post.id}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['view_count'], expected)
+        self.assertEqual(self._views(self.post), (0, None))
+
+    def test_retrieve_survives_redis_outage(self):
+        Post.objects.filter(id=self.post.id).update(view_count=7)
+        with mock.patch('blog.view_counter.get_redis_connection', side_effect=RedisError('down')):
+            response = APIClient().get(f'/api/v1/posts/{self.post.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['view_count'], 7)
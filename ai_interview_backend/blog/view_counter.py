@@ -0,0 +1,136 @@
+# ai-interview-backend/blog/view_counter.py
+"""
+文章浏览量的写回缓冲 (write-behind)。
+
+- 打开文章详情时只在 Redis 中计数 (HINCRBY 到按日期划分的哈希 post_views:pending:{日期})，不写数据库；
+  可选用 HyperLogLog 按访客去重，同一访客当天重复打开只计一次；
+- Celery 定时任务 flush_view_counts 把哈希原子地改名后取出增量，
+  批量累加到 Post.view_count 和对应日期的 DailyPostStats.views。
+  写库失败时改名后的哈希保留在 Redis 中，下次执行时重试。
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, Value, F, IntegerField
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from core.db import bulk_upsert
+from core.locks import acquire_lock, release_lock
+
+from .models import Post, DailyPostStats
+
+PENDING_PREFIX = 'post_views:pending:'
+FLUSHING_PREFIX = 'post_views:flushing:'
+VIEWERS_PREFIX = 'post_viewers:'
+FLUSH_LOCK_KEY = 'post_views:flush_lock'
+# 同一访客同一天重复打开文章时只计一次浏览
+UNIQUE_VIEWERS = getattr(settings, 'POST_VIEW_UNIQUE_VIEWERS', False)
+# 访客去重的 HyperLogLog 只需要保留到第二天
+VIEWERS_TTL = 2 * 86400
+# 防止多个 worker 同时写回，锁的超时时间 (秒) 应大于一次写回的耗时
+FLUSH_LOCK_TIMEOUT = 300
+BATCH_SIZE = getattr(settings, 'POST_VIEW_FLUSH_BATCH_SIZE', 500)
+
+
+def _today() -> str:
+    # 与 record_daily_stats 和 my_daily_stats 使用同一种日期
+    return timezone.now().date().isoformat()
+
+
+def viewer_key(request) -> str:
+    """登录用户按用户 id 去重，匿名访客按 IP 去重。"""
+    if request.user.is_authenticated:
+        return f"u{request.user.id}"
+    return f"ip{request.META.get('REMOTE_ADDR', '')}"
+
+
+def record_post_view(post_id: int, viewer: str = None) -> int:
+    """
+    记录一次浏览，返回该文章尚未写回数据库的浏览量 (数据库中的 view_count 加上它就是最新的浏览量)。
+    """
+    redis = get_redis_connection('default')
+    day = _today()
+    field = str(post_id)
+    counted = True
+    if UNIQUE_VIEWERS and viewer:
+        viewers_key = f"{VIEWERS_PREFIX}{day}:{post_id}"
+        pipe = redis.pipeline()
+        pipe.pfadd(viewers_key, viewer)
+        pipe.expire(viewers_key, VIEWERS_TTL)
+        counted = bool(pipe.execute()[0])
+
+    pipe = redis.pipeline()
+    if counted:
+        pipe.hincrby(PENDING_PREFIX + day, field, 1)
+    else:
+        pipe.hget(PENDING_PREFIX + day, field)
+    # 正在写回的增量也还没有进入数据库
+    pipe.hget(FLUSHING_PREFIX + day, field)
+    pending, flushing = pipe.execute()
+    return int(pending or 0) + int(flushing or 0)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _apply_deltas(day: str, deltas: dict):
+    """在一个事务中把某一天的浏览增量写入文章和每日统计，每批只执行固定的几条语句。"""
+    post_ids = sorted(deltas)
+    with transaction.atomic():
+        for start in range(0, len(post_ids), BATCH_SIZE):
+            batch = post_ids[start:start + BATCH_SIZE]
+            # .update() 不触发 post_save，不会把文章标记为需要刷新推荐
+            Post.objects.filter(id__in=batch).update(view_count=F('view_count') + Case(
+                *[When(id=post_id, then=Value(deltas[post_id])) for post_id in batch],
+                default=Value(0), output_field=IntegerField(),
+            ))
+            existing = dict(
+                DailyPostStats.objects.filter(date=day, post_id__in=batch).values_list('post_id', 'views')
+            )
+            # 已删除的文章没有对应的记录可写，直接丢弃它们的增量
+            live_ids = Post.objects.filter(id__in=batch).values_list('id', flat=True)
+            bulk_upsert(
+                DailyPostStats,
+                [DailyPostStats(post_id=post_id, date=day, views=existing.get(post_id, 0) + deltas[post_id])
+                 for post_id in live_ids],
+                unique_fields=['post', 'date'], update_fields=['views'],
+            )
+
+
+def _flush_key(redis, key) -> int:
+    day = _decode(key).rsplit(':', 1)[1]
+    deltas = {int(post_id): int(count) for post_id, count in redis.hgetall(key).items() if int(count)}
+    if deltas:
+        _apply_deltas(day, deltas)
+    # 写库成功后才删除；在这两步之间进程退出会导致这批增量下次被重复计入
+    redis.delete(key)
+    return sum(deltas.values())
+
+
+def flush_view_counts() -> dict:
+    """
+    【性能优化】把 Redis 中缓冲的浏览量批量写回数据库，返回统计信息。
+    先处理上次写回失败遗留的哈希，再把各日期的待写回哈希改名后逐个写回。
+    """
+    redis = get_redis_connection('default')
+    token = acquire_lock(FLUSH_LOCK_KEY, FLUSH_LOCK_TIMEOUT, redis)
+    if token is None:
+        return {'skipped': True}
+    try:
+        views, keys = 0, 0
+        for key in list(redis.scan_iter(match=FLUSHING_PREFIX + '*')):
+            views += _flush_key(redis, key)
+            keys += 1
+        for key in list(redis.scan_iter(match=PENDING_PREFIX + '*')):
+            flushing_key = FLUSHING_PREFIX + _decode(key)[len(PENDING_PREFIX):]
+            # 改名是原子的：改名之后的浏览会写入新的待写回哈希，不会丢失
+            if not redis.renamenx(key, flushing_key):
+                continue
+            views += _flush_key(redis, flushing_key)
+            keys += 1
+        return {'views': views, 'days': keys}
+    finally:
+        # 写回超过锁的超时时间时，锁可能已被下一次执行获得，只释放自己的锁
+        release_lock(FLUSH_LOCK_KEY, token, redis)
@@ -1,8 +1,9 @@
 # ai-interview-backend/blog/views.py
 
 from datetime import timedelta
+from redis import RedisError
 from django.utils import timezone
-from django.db.models import F, Q, Sum
+from django.db.models import Q, Sum
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from django.core.cache import cache # <-- 导入 cache
@@ -19,6 +20,7 @@ from .serializers import (
     TagSerializer, CommentSerializer, PostCreateUpdateSerializer,
 )
 from .permissions import IsOwnerOrReadOnly
+from .view_counter import record_post_view, viewer_key
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -78,14 +80,17 @@ class PostViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         """
         在获取单篇文章详情时，增加浏览量。
+        【性能优化】浏览量先计入 Redis，由定时任务批量写回数据库 (见 blog/view_counter.py)，
+        返回的浏览量是数据库中的值加上尚未写回的部分。
         """
         instance = self.get_object()
         # 只有已发布的公开文章才增加浏览量
         if instance.status == 'published':
-            # 使用 F 对象避免竞态条件
-            instance.view_count = F('view_count') + 1
-            instance.save(update_fields=['view_count'])
-            instance.refresh_from_db()
+            try:
+                instance.view_count += record_post_view(instance.id, viewer_key(request))
+            except RedisError as e:
+                # Redis 不可用时不计这次浏览，文章照常返回 (浏览量为数据库中的值)
+                print(f"记录文章 {instance.id} 的浏览量失败: {e}")
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -0,0 +1,20 @@
+# ai_interview_backend/core/db.py
+"""
+数据库相关的通用工具。
+"""
+
+from django.db import connections, router
+
+
+def bulk_upsert(model, objs: list, unique_fields: list, update_fields: list, batch_size: int = None):
+    """
+    批量插入，唯一键冲突时更新 update_fields。
+
+    MySQL 的 INSERT ... ON DUPLICATE KEY UPDATE 不能指定冲突的字段 (按表上任意唯一索引判断冲突)，
+    Django 在该后端上传入 unique_fields 会抛出 NotSupportedError，因此只在支持的数据库上传入。
+    调用方需保证 unique_fields 对应表上的唯一约束，且表上没有其他可能冲突的唯一索引。
+    """
+    options = {'update_conflicts': True, 'update_fields': update_fields, 'batch_size': batch_size}
+    if connections[router.db_for_write(model)].features.supports_update_conflicts_with_target:
+        options['unique_fields'] = unique_fields
+    return model.objects.bulk_create(objs, **options)
@@ -0,0 +1,33 @@
+# ai_interview_backend/core/locks.py
+"""
+基于 Redis 的短时互斥锁。
+
+加锁时用 SET NX 写入一个随机令牌，释放时只有令牌仍然一致才删除 (Lua 脚本保证比较和删除是原子的)。
+持锁时间超过超时时间后锁会自动过期并可能被其他进程获得，此时原持有者的释放不会误删别人的锁。
+"""
+
+import uuid
+
+from django_redis import get_redis_connection
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def acquire_lock(key: str, timeout: int, redis=None) -> str:
+    """尝试加锁，成功时返回释放锁需要的令牌，锁已被占用时返回 None。"""
+    redis = redis or get_redis_connection('default')
+    token = uuid.uuid4().hex
+    if redis.set(key, token, nx=True, ex=timeout):
+        return token
+    return None
+
+
+def release_lock(key: str, token: str, redis=None) -> bool:
+    """释放自己持有的锁；锁已过期或已被其他进程持有时不做任何事，返回 False。"""
+    redis = redis or get_redis_connection('default')
+    return bool(redis.eval(_RELEASE_SCRIPT, 1, key, token))
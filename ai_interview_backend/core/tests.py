@@ -1,3 +1,36 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.test import SimpleTestCase
+
+from .locks import acquire_lock, release_lock
+
+
+class RedisLockTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patcher = mock.patch('core.locks.get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lock_is_exclusive_until_released(self):
+        token = acquire_lock('lock', 10)
+        self.assertTrue(token)
+        self.assertLessEqual(self.redis.ttl('lock'), 10)
+        self.assertIsNone(acquire_lock('lock', 10))
+
+        self.assertTrue(release_lock('lock', token))
+        self.assertTrue(acquire_lock('lock', 10))
+
+    def test_release_keeps_lock_of_another_holder(self):
+        token = acquire_lock('lock', 10)
+        # 锁过期后被其他进程获得
+        self.redis.set('lock', 'other-holder')
+
+        self.assertFalse(release_lock('lock', token))
+        self.assertEqual(self.redis.get('lock'), b'other-holder')
+
+    def test_release_of_expired_lock(self):
+        token = acquire_lock('lock', 10)
+        self.redis.delete('lock')
+        self.assertFalse(release_lock('lock', token))
@@ -1,3 +1,31 @@
-from django.shortcuts import render
+# ai_interview_backend/core/views.py
 
-# Create your views here.
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+METRICS_AUTH_TOKEN = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+METRICS_ALLOWED_IPS = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+
+
+def _metrics_allowed(request) -> bool:
+    if METRICS_AUTH_TOKEN and request.headers.get('Authorization') == f"Bearer {METRICS_AUTH_TOKEN}":
+        return True
+    return request.META.get('REMOTE_ADDR') in METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """
+    Prometheus 指标导出接口 (LLM 调用耗时、token 数等，见 interviews/llm_metrics.py)。
+    gunicorn / Celery 多进程部署时需设置环境变量 PROMETHEUS_MULTIPROC_DIR，由本接口汇总各进程的指标。
+    """
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
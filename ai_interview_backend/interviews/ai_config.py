@@ -0,0 +1,210 @@
+# ai_interview_backend/interviews/ai_config.py
+
+import os
+import time
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from dotenv import load_dotenv
+
+from users.models import User
+from system.models import AISetting, AIModel
+
+load_dotenv()
+SYSTEM_DEFAULT_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+DEFAULT_MODEL_SLUG = "deepseek-chat"
+
+# Redis 中解析结果的有效期；本地 (进程内) 缓存的有效期要短得多，用于限制跨进程的失效延迟
+CONFIG_CACHE_TIMEOUT = getattr(settings, 'AI_CONFIG_CACHE_TIMEOUT', 600)
+LOCAL_CACHE_TIMEOUT = getattr(settings, 'AI_CONFIG_LOCAL_CACHE_TIMEOUT', 30)
+
+# 解析结果中需要保留的 AIModel 字段
+_MODEL_FIELDS = ('id', 'name', 'model_slug', 'base_url', 'description', 'is_active', 'supports_json_mode')
+_GENERATION_KEY = 'ai_config:generation'
+_MEMO_ATTR = '_ai_config_memo'
+
+_lock = threading.Lock()
+_local_cache: dict = {}
+_local_generation = {'value': None, 'expires_at': 0.0}
+# 进程内失效计数，用于让挂在 user 实例上的请求级缓存同步失效
+_local_epoch = {'value': 0}
+_stats = {
+    'request_hits': 0,
+    'local_hits': 0,
+    'redis_hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+}
+
+
+def _incr(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def _resolve_from_db(user: User) -> tuple[str | None, AIModel | None]:
+    """
+    获取用户的AI配置。
+    1. 确定要使用的模型 (用户默认 -> 系统默认)。
+    2. 根据确定的模型，查找对应的API Key (用户自定义Key -> 系统默认Key)。
+    返回 (api_key, model_object)
+    """
+    user_setting = None
+    try:
+        user_setting = AISetting.objects.select_related('ai_model__failover_model').get(user_id=user.id)
+    except AISetting.DoesNotExist:
+        print(f"用户 {user.username} 没有任何AI设置。")
+
+    # --- 步骤1: 确定模型 ---
+    final_model = None
+    if user_setting and user_setting.ai_model:
+        final_model = user_setting.ai_model
+        print(f"用户 {user.username} 已选择默认模型: {final_model.name}")
+
+    if not final_model:
+        try:
+            final_model = AIModel.objects.select_related('failover_model').get(
+                model_slug=DEFAULT_MODEL_SLUG, is_active=True
+            )
+            print(f"用户未设置默认模型，回退到系统默认模型: {final_model.name}")
+        except AIModel.DoesNotExist:
+            print(f"警告: 系统默认模型 slug '{DEFAULT_MODEL_SLUG}' 在数据库中不存在！")
+            return SYSTEM_DEFAULT_API_KEY, None  # 返回 None 表示模型查找失败
+
+    # --- 步骤2: 根据确定的模型查找 API Key ---
+    api_key = None
+    if user_setting and user_setting.api_keys:
+        model_id_str = str(final_model.id)
+        api_key = user_setting.api_keys.get(model_id_str)
+        if api_key:
+            print(f"找到并使用用户为模型 '{final_model.name}' 自定义的 API Key。")
+
+    if not api_key:
+        print(f"用户未提供该模型的 Key，回退到系统默认 API Key。")
+        api_key = SYSTEM_DEFAULT_API_KEY
+
+    # --- 步骤3: 备用模型 (供 llm_gateway 故障转移)，Key 的查找规则与主模型相同 ---
+    final_model.failover = None
+    fallback = final_model.failover_model
+    if fallback and fallback.is_active and fallback.id != final_model.id:
+        fallback_key = (user_setting.api_keys or {}).get(str(fallback.id)) if user_setting else None
+        final_model.failover = (fallback_key or SYSTEM_DEFAULT_API_KEY, fallback)
+
+    return api_key, final_model
+
+
+def _serialize(config: tuple[str | None, AIModel | None]) -> dict:
+    api_key, model = config
+    model_data = {field: getattr(model, field) for field in _MODEL_FIELDS} if model else None
+    failover = getattr(model, 'failover', None)
+    failover_data = None
+    if failover:
+        failover_key, failover_model = failover
+        failover_data = {
+            'api_key': failover_key,
+            'model': {field: getattr(failover_model, field) for field in _MODEL_FIELDS},
+        }
+    return {'api_key': api_key, 'model': model_data, 'failover': failover_data}
+
+
+def _deserialize(data: dict) -> tuple[str | None, AIModel | None]:
+    model_data = data.get('model')
+    # 重建一个未保存的 AIModel 实例，调用方只会读取它的字段
+    model = AIModel(**model_data) if model_data else None
+    if model:
+        failover_data = data.get('failover')
+        model.failover = (
+            (failover_data['api_key'], AIModel(**failover_data['model'])) if failover_data else None
+        )
+    return data.get('api_key'), model
+
+
+def _get_generation() -> int:
+    """全局版本号：任何 AIModel 变更都会使所有用户的缓存失效。"""
+    now = time.monotonic()
+    if _local_generation['value'] is not None and _local_generation['expires_at'] > now:
+        return _local_generation['value']
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        generation = 0
+        cache.add(_GENERATION_KEY, generation, timeout=None)
+    _local_generation['value'] = generation
+    _local_generation['expires_at'] = now + LOCAL_CACHE_TIMEOUT
+    return generation
+
+
+def _redis_key(user_id: int, generation: int) -> str:
+    return f"ai_config:{generation}:{user_id}"
+
+
+def get_user_ai_config(user: User) -> tuple[str | None, AIModel | None]:
+    """
+    带缓存的 AI 配置解析，依次查找:
+    1. 请求级缓存 (挂在 user 实例上，同一请求内多次调用只解析一次)
+    2. 进程内本地缓存 (短 TTL)
+    3. Redis 缓存
+    4. 数据库
+    """
+    now = time.monotonic()
+    epoch = _local_epoch['value']
+
+    memo = getattr(user, _MEMO_ATTR, None)
+    if memo and memo['epoch'] == epoch and memo['expires_at'] > now:
+        _incr('request_hits')
+        return memo['config']
+
+    local = _local_cache.get(user.id)
+    if local and local['expires_at'] > now:
+        _incr('local_hits')
+        config = local['config']
+    else:
+        key = _redis_key(user.id, _get_generation())
+        data = cache.get(key)
+        if data is not None:
+            _incr('redis_hits')
+        else:
+            _incr('misses')
+            data = _serialize(_resolve_from_db(user))
+            cache.set(key, data, timeout=CONFIG_CACHE_TIMEOUT)
+        config = _deserialize(data)
+        with _lock:
+            _local_cache[user.id] = {'config': config, 'expires_at': now + LOCAL_CACHE_TIMEOUT}
+
+    setattr(user, _MEMO_ATTR, {'config': config, 'epoch': epoch, 'expires_at': now + LOCAL_CACHE_TIMEOUT})
+    return config
+
+
+def invalidate_user_ai_config(user_id: int):
+    """用户的 AISetting 变更后调用。"""
+    cache.delete(_redis_key(user_id, _get_generation()))
+    with _lock:
+        _local_cache.pop(user_id, None)
+        _local_epoch['value'] += 1
+        _stats['invalidations'] += 1
+
+
+def invalidate_all_ai_configs():
+    """AIModel 变更后调用：递增全局版本号，使所有用户的缓存失效。"""
+    try:
+        generation = cache.incr(_GENERATION_KEY)
+    except ValueError:
+        # 版本号键不存在 (例如 Redis 被清空)
+        generation = 1
+        cache.set(_GENERATION_KEY, generation, timeout=None)
+    with _lock:
+        _local_cache.clear()
+        _local_generation['value'] = generation
+        _local_generation['expires_at'] = time.monotonic() + LOCAL_CACHE_TIMEOUT
+        _local_epoch['value'] += 1
+        _stats['invalidations'] += 1
+
+
+def get_ai_config_cache_stats() -> dict:
+    """返回当前 worker 进程的 AI 配置缓存命中统计。"""
+    with _lock:
+        data = dict(_stats)
+        data['local_size'] = len(_local_cache)
+    lookups = data['request_hits'] + data['local_hits'] + data['redis_hits'] + data['misses']
+    data['hit_rate'] = round((lookups - data['misses']) / lookups, 4) if lookups else 0.0
+    return data
@@ -1,65 +1,33 @@
 # ai_interview_backend/interviews/ai_services.py
 
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
 from users.models import User
-from system.models import AISetting, AIModel
+from system.models import AIModel
+from .ai_config import get_user_ai_config
+from .llm_cache import cached_llm_call
+from .emotions import summarize_emotions, summarize_session_emotions, describe_emotion_summary
+from .prompts import render_prompt
+from .json_stream import IncrementalJSONParser
+from .llm_gateway import call_llm, LLMStream
 
-load_dotenv()
-SYSTEM_DEFAULT_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEFAULT_MODEL_SLUG = "deepseek-chat"
 
-
-def _get_user_ai_config(user: User) -> tuple[str | None, AIModel | None]:
+def _parse_json_content(model: AIModel, content: str) -> dict:
     """
-    【新版】获取用户的AI配置。
-    1. 确定要使用的模型 (用户默认 -> 系统默认)。
-    2. 根据确定的模型，查找对应的API Key (用户自定义Key -> 系统默认Key)。
-    返回 (api_key, model_object)
+    解析模型返回的 JSON 文本；不支持 JSON Mode 的模型可能会用代码块包裹结果。
     """
-    user_setting = None
-    try:
-        user_setting = user.ai_setting
-    except AISetting.DoesNotExist:
-        print(f"用户 {user.username} 没有任何AI设置。")
-
-    # --- 步骤1: 确定模型 ---
-    final_model = None
-    if user_setting and user_setting.ai_model:
-        final_model = user_setting.ai_model
-        print(f"用户 {user.username} 已选择默认模型: {final_model.name}")
-
-    if not final_model:
-        try:
-            final_model = AIModel.objects.get(model_slug=DEFAULT_MODEL_SLUG, is_active=True)
-            print(f"用户未设置默认模型，回退到系统默认模型: {final_model.name}")
-        except AIModel.DoesNotExist:
-            print(f"警告: 系统默认模型 slug '{DEFAULT_MODEL_SLUG}' 在数据库中不存在！")
-            return SYSTEM_DEFAULT_API_KEY, None  # 返回 None 表示模型查找失败
-
-    # --- 步骤2: 根据确定的模型查找 API Key ---
-    api_key = None
-    if user_setting and user_setting.api_keys:
-        model_id_str = str(final_model.id)
-        api_key = user_setting.api_keys.get(model_id_str)
-        if api_key:
-            print(f"找到并使用用户为模型 '{final_model.name}' 自定义的 API Key。")
-
-    if not api_key:
-        print(f"用户未提供该模型的 Key，回退到系统默认 API Key。")
-        api_key = SYSTEM_DEFAULT_API_KEY
-
-    return api_key, final_model
+    if not model.supports_json_mode:
+        # 清理可能存在的代码块标记
+        content = content.strip()
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.endswith("```"):
+            content = content[:-3]
+        content = content.strip()
 
+    return json.loads(content)
 
-def _call_openai_api(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float):
-    """
-    一个统一调用 OpenAI API 的辅助函数，现在能智能处理 JSON Mode。
-    """
-    client = OpenAI(api_key=api_key, base_url=model.base_url)
 
+def _build_request_params(model: AIModel, messages: list, max_tokens: int, temperature: float) -> dict:
     request_params = {
         "model": model.model_slug,
         "messages": messages,
@@ -73,155 +41,138 @@ def _call_openai_api(api_key: str, model: AIModel, messages: list, max_tokens: i
         print(f"为模型 '{model.name}' 启用 JSON Mode。")
     else:
         print(f"模型 '{model.name}' 不支持 JSON Mode，将进行常规调用。")
+    return request_params
 
-    response = client.chat.completions.create(**request_params)
-    content = response.choices[0].message.content
 
-    if not model.supports_json_mode:
-        # 清理可能存在的代码块标记
-        content = content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
+def _call_openai_api(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float,
+                     cache_policy: str = None, endpoint: str = None):
+    """
+    一个统一调用 OpenAI API 的辅助函数，现在能智能处理 JSON Mode。
+    传入 cache_policy (调用方函数名) 时，相同提示词的结果会从 LLM 响应缓存中复用。
+    endpoint 为指标中的调用方标签，默认与 cache_policy 相同。
+    请求经由 llm_gateway 发出 (截止时间、重试、熔断与故障转移)。
+    """
+    endpoint = endpoint or cache_policy
+
+    def call():
+        return call_llm(
+            endpoint, api_key, model, 'json',
+            lambda m: _build_request_params(m, messages, max_tokens, temperature),
+            # 同时返回实际使用的模型，故障转移的结果不写入缓存
+            lambda m, response: (_parse_json_content(m, response.choices[0].message.content), m),
+        )
 
-    return json.loads(content)
+    return cached_llm_call(cache_policy, model, messages, max_tokens, temperature, 'json', call)
 
 
-def _call_openai_api_stream(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float):
-    client = OpenAI(api_key=api_key, base_url=model.base_url)
-    stream = client.chat.completions.create(
-        model=model.model_slug,
-        messages=messages,
-        stream=True,
-        max_tokens=max_tokens,
-        temperature=temperature
+def _call_openai_json_stream(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float,
+                             item_keys=(), on_progress=None, endpoint: str = None) -> tuple:
+    """
+    【性能优化】以流式方式调用并增量解析 JSON，用于报告、简历等输出很长的场景。
+    每当一个顶层字段或 item_keys 数组中的一个元素完整时，以目前已完整的内容调用 on_progress(partial)。
+    返回 (结果, 是否完整)：输出被截断或格式有误时返回修复后的结果，
+    调用中途出错时返回已完整的部分；一点内容都没有时抛出异常。
+    """
+    parser = IncrementalJSONParser(item_keys)
+    stream = LLMStream(
+        endpoint, api_key, model, 'json_stream',
+        lambda m: _build_request_params(m, messages, max_tokens, temperature),
     )
-    for chunk in stream:
-        content = chunk.choices[0].delta.content or ""
-        yield content
-
-
-def generate_first_question(job_position: str, user: User, resume_text: str = None) -> str:
-    api_key, model = _get_user_ai_config(user)
-    if not api_key or not model:
-        return "系统AI服务未配置或模型不存在。"
+    try:
+        for content in stream:
+            if parser.feed(content) and on_progress:
+                on_progress(parser.partial())
+    except Exception as e:
+        partial = parser.partial()
+        if not partial:
+            raise
+        print(f"流式 JSON 调用中断，保留已生成的 {len(partial)} 个字段: {e}")
+        return partial, False
+    return _finish_json_stream(parser, stream)
 
-    system_prompt = (
-        "你是一位顶尖公司的资深技术面试官，以提问精准、深入、专业著称。"
-        "你的任务是开启一场关于特定岗位的面试。"
-    )
-    if resume_text:
-        user_prompt = (
-            f"我正在应聘 '{job_position}' 岗位。这是我的简历内容：\n\n"
-            f"--- 简历开始 ---\n{resume_text}\n--- 简历结束 ---\n\n"
-            "请仔细阅读我的简历，并提出一个有针对性的开场问题。"
-            "请严格按照以下 JSON 格式返回，只包含问题文本：\n"
-            "{\"question\": \"(你的问题在这里)\"}"
-        )
-    else:
-        user_prompt = (
-            f"我正在应聘 '{job_position}' 岗位，但未提供简历。"
-            "请为我生成一个通用但热情的开场问题，要求我进行一个简洁的自我介绍。"
-            "请严格按照以下 JSON 格式返回，只包含问题文本：\n"
-            "{\"question\": \"(你的问题在这里)\"}"
-        )
 
+def _finish_json_stream(parser: IncrementalJSONParser, stream: LLMStream) -> tuple:
     try:
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        ai_response = _call_openai_api(api_key, model, messages, 300, 0.7)
-        return ai_response.get("question", "你好，请做个自我介绍吧。")
-    except Exception as e:
-        print(f"调用 AI 生成第一问时发生错误: {e}")
-        return f"你好，欢迎参加 {job_position} 的面试。很抱歉，我的AI大脑暂时出了一点小问题。不过没关系，我们可以从一个经典问题开始：请先做一个简单的自我介绍吧。"
+        result, complete = parser.finish()
+    except ValueError:
+        stream.json_parse_failure()
+        raise
+    if not complete:
+        stream.json_parse_failure()
+    return result, complete
+
+
+def _build_text_params(model: AIModel, messages: list, max_tokens: int, temperature: float) -> dict:
+    return {
+        'model': model.model_slug,
+        'messages': messages,
+        'stream': False,
+        'max_tokens': max_tokens,
+        'temperature': temperature,
+    }
 
 
-def analyze_answer(job_position: str, question: str, answer: str, user: User) -> str:
-    api_key, model = _get_user_ai_config(user)
-    if not api_key or not model:
-        return "AI服务未配置，无法生成简评。"
+def _call_openai_text(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float,
+                      cache_policy: str = None, endpoint: str = None) -> str:
+    """
+    非流式、纯文本返回的调用 (用于简评、参考答案等不需要 JSON 的场景)。
+    """
+    endpoint = endpoint or cache_policy
 
-    system_prompt = "你是一位专业的面试官，任务是根据候选人的回答给出一个简短、有建设性的评价。"
-    user_prompt = (
-        f"我正在面试 '{job_position}' 岗位。\n"
-        f"面试官提问: {question}\n"
-        f"我的回答: {answer}\n\n"
-        "请对我的回答给出一个大约50-100字的简评。直接返回评价本身，不要包含多余内容。"
-    )
-    try:
-        client = OpenAI(api_key=api_key, base_url=model.base_url)
-        response = client.chat.completions.create(
-            model=model.model_slug,
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-            stream=False,
-            max_tokens=200,
-            temperature=0.6
+    def call():
+        return call_llm(
+            endpoint, api_key, model, 'text',
+            lambda m: _build_text_params(m, messages, max_tokens, temperature),
+            lambda m, response: (response.choices[0].message.content.strip(), m),
         )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"调用 AI 生成简评时发生错误: {e}")
-        return "AI 在分析时遇到了一点小问题。"
 
+    return cached_llm_call(cache_policy, model, messages, max_tokens, temperature, 'text', call)
 
-def generate_next_question_stream(job_position: str, interview_history: list, user: User):
-    api_key, model = _get_user_ai_config(user)
-    if not api_key or not model:
-        yield "AI服务未配置。"
-        return
 
-    history_prompt_part = ""
-    for turn in interview_history:
-        history_prompt_part += f"面试官: {turn['question']}\n我: {turn['answer']}\n\n"
-    system_prompt = "你是一位专业的AI面试官，任务是根据对话历史提出下一个有深度的追问。直接返回问题本身。"
-    user_prompt = f"这是关于 '{job_position}' 的面试历史:\n{history_prompt_part}\n现在，请提出你的下一个问题。"
-
-    try:
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        yield from _call_openai_api_stream(api_key, model, messages, 500, 0.8)
-    except Exception as e:
-        print(f"调用 AI 生成下一问时发生错误: {e}")
-        yield "请谈谈你遇到的最大的技术挑战是什么？"
+def _call_openai_api_stream(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float,
+                            endpoint: str = None):
+    yield from LLMStream(
+        endpoint, api_key, model, 'stream',
+        lambda m: _build_text_params(m, messages, max_tokens, temperature),
+    )
 
 
 # --- [核心改造 1/3] 新增一个辅助函数，用于简化情绪数据的文本描述 ---
+# 【性能优化】统计逻辑改为 interviews/emotions.py 中基于 NumPy 的向量化实现
 def _summarize_emotion_data(analysis_data: list) -> str:
     if not analysis_data:
         return "无情绪数据。"
+    return describe_emotion_summary(summarize_emotions(analysis_data))
 
-    emotion_map: dict[str, str] = {
-        'neutral': '平静', 'happy': '开心', 'sad': '悲伤', 'angry': '生气',
-        'fearful': '害怕', 'disgusted': '厌恶', 'surprised': '惊讶',
-    }
 
-    primary_emotions = []
-    for frame in analysis_data:
-        emotions = frame.get('emotions', {})
-        if emotions:
-            # 找到得分最高的情绪
-            top_emotion = max(emotions, key=emotions.get)
-            primary_emotions.append(emotion_map.get(top_emotion, '未知'))
+# --- 提示词构造 (同步与异步服务共用) ---
+# 【性能优化】模板见 prompts.py：静态的角色设定与输出格式放在 system 消息中且逐字节不变，
+# 这里只负责计算每次调用的动态部分，上游服务可以对静态前缀命中缓存。
+def _build_first_question_messages(job_position: str, resume_text: str = None) -> list:
+    if resume_text:
+        return render_prompt('first_question', job_position=job_position, resume_text=resume_text)
+    return render_prompt('first_question_no_resume', job_position=job_position)
+
 
-    if not primary_emotions:
-        return "情绪稳定。"
+def _build_analyze_answer_messages(job_position: str, question: str, answer: str) -> list:
+    return render_prompt('analyze_answer', job_position=job_position, question=question, answer=answer)
 
-    # 统计主要情绪
-    from collections import Counter
-    emotion_counts = Counter(primary_emotions)
-    summary = ", ".join([f"{emotion}({count}次)" for emotion, count in emotion_counts.most_common(3)])
-    return f"主要情绪表现: {summary}。"
 
+def _build_next_question_messages(job_position: str, interview_history: list, history_summary: str = '') -> list:
+    history_prompt_part = "".join(f"面试官: {turn['question']}\n我: {turn['answer']}\n\n" for turn in interview_history)
+    # 【性能优化】较早的轮次只以摘要形式出现，提示词长度不随面试轮数增长
+    if history_summary:
+        history_prompt_part = f"较早轮次摘要:\n{history_summary}\n\n最近的问答:\n{history_prompt_part}"
+    return render_prompt('next_question', job_position=job_position, history=history_prompt_part)
 
-# --- [核心改造 2/3] 重写 generate_final_report 函数 ---
-def generate_final_report(job_position: str, interview_history: list, user: User, resume_text: str = None) -> dict:
-    api_key, model = _get_user_ai_config(user)
-    if not api_key or not model:
-        return {"error": "AI服务未配置，无法生成报告。"}
 
+def _build_final_report_messages(job_position: str, interview_history: list, resume_text: str = None) -> list:
     # 构造包含情绪分析的面试历史
     history_prompt_part = ""
-    for i, turn in enumerate(interview_history):
-        emotion_summary = _summarize_emotion_data(turn.get('analysis_data', []))
+    # 一次性批量统计所有题目的情绪数据
+    emotion_summaries = summarize_session_emotions([turn.get('analysis_data') for turn in interview_history])
+    for i, (turn, summary) in enumerate(zip(interview_history, emotion_summaries)):
+        emotion_summary = describe_emotion_summary(summary) if turn.get('analysis_data') else "无情绪数据。"
         history_prompt_part += f"--- 问题 {i + 1} ---\n"
         history_prompt_part += f"面试官提问: {turn['question']}\n"
         history_prompt_part += f"我的回答: {turn['answer']}\n"
@@ -232,71 +183,149 @@ def generate_final_report(job_position: str, interview_history: list, user: User
     if resume_text:
         resume_prompt_part = f"--- 候选人简历 ---\n{resume_text}\n--- 简历结束 ---\n"
 
-    system_prompt = (
-        "你是一位顶级的职业规划师和面试分析专家，拥有多年的HR和技术面试官经验。"
-        "你的任务是基于候选人的**简历**、**完整的面试记录**以及**每道题回答时的情绪变化**，进行一次全面、深度、富有洞察力的评估。"
-        "你的分析必须体现出你综合了所有信息，例如，指出回答中的亮点是否在简历中有所体现，或者情绪波动是否与问题难度相关。"
-    )
+    return render_prompt('final_report', job_position=job_position, resume_part=resume_prompt_part,
+                         history=history_prompt_part)
 
-    user_prompt = (
-        f"我刚刚完成了一场关于 '{job_position}' 岗位的模拟面试。请严格遵循以下要求，生成一份综合评估报告。\n\n"
-        f"{resume_prompt_part}\n\n"
-        f"--- 面试记录 (含情绪总结) ---\n{history_prompt_part}--- 面试记录结束 ---\n\n"
-        "请严格按照下面的 JSON 格式返回你的分析报告。所有评分都是0-5分，所有文本内容需客观、专业且有建设性。\n"
-        "在 strength_analysis 和 weakness_analysis 中，你的分析必须明确关联到具体的简历内容或面试问答。\n"
-        "{\n"
-        "  \"overall_score\": \"(一个0到100的整数，代表综合得分)\",\n"
-        "  \"ability_scores\": [\n"
-        "    {\"name\": \"专业知识\", \"score\": (0-5分)},\n"
-        "    {\"name\": \"技术深度\", \"score\": (0-5分)},\n"
-        "    {\"name\": \"求职动机\", \"score\": (0-5分)},\n"
-        "    {\"name\": \"业务理解\", \"score\": (0-5分)},\n"
-        "    {\"name\": \"沟通表达\", \"score\": (0-5分)}\n"
-        "  ],\n"
-        "  \"overall_comment\": \"(一段100字左右的总体评价，需体现出你结合了简历和面试表现)\",\n"
-        "  \"strength_analysis\": \"(分点列出本次面试的亮点，例如：'在回答问题2时，候选人很好地将简历中提到的XX项目经验与实际问题结合，并全程表现自信（情绪主要是开心和平静），这是一个很大的加分项。')\",\n"
-        "  \"weakness_analysis\": \"(分点列出本次面试的不足，例如：'对于问题3中关于性能优化的追问，候选人的回答较为宽泛，未能深入到简历中提到的ClickHouse具体应用细节，且情绪数据显示出犹豫（多次出现惊讶），表明在该领域的知识深度有待加强。')\",\n"
-        "  \"improvement_suggestions\": [\n"
-        "    \"(第一条具体的改进建议)\",\n"
-        "    \"(第二条具体的改进建议)\",\n"
-        "    \"(第三条具体的改进建议)\"\n"
-        "  ],\n"
-        "  \"keyword_analysis\": {\n"
-        "    \"matched_keywords\": [\"(关键词1)\", \"(关键词2)\", \"(关键词3)\"],\n"
-        "    \"missing_keywords\": [\"(关键词1)\", \"(关键词2)\", \"(关键词3)\"],\n"
-        "    \"analysis_comment\": \"(一段关于我关键词使用情况的简短分析)\"\n"
-        "  },\n"
-        "  \"star_analysis\": [\n"
-        "    {\n"
-        "      \"question_sequence\": 1,\n"
-        "      \"is_behavioral_question\": true,\n"
-        "      \"conforms_to_star\": false,\n"
-        "      \"overall_star_feedback\": \"(对这个回答的STAR法则应用情况给出一个简短的总体评价)\",\n"
-        "      \"situation_analysis\": \"(针对'Situation'部分的详尽分析)\",\n"
-        "      \"task_analysis\": \"(针对'Task'部分的详尽分析)\",\n"
-        "      \"action_analysis\": \"(针对'Action'部分的详尽分析)\",\n"
-        "      \"result_analysis\": \"(针对'Result'部分的详尽分析，尤其要强调量化结果的重要性)\"\n"
-        "    }\n"
-        "  ]\n"
-        "}"
-    )
 
-    try:
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        report_data = _call_openai_api(api_key, model, messages, 4096, 0.5)
+def _build_reference_answer_messages(job_position: str, question: str, resume_text: str = None) -> list:
+    resume_context = "我没有提供简历。"
+    if resume_text:
+        resume_context = f"请参考我的简历：\n{resume_text}"
+    return render_prompt('reference_answer', job_position=job_position, resume_context=resume_context,
+                         question=question)
 
-        if 'overall_score' in report_data:
+
+def _build_polish_messages(original_html: str, job_position: str = None) -> list:
+    job_context = f" 这段描述是为应聘 '{job_position}' 岗位准备的。" if job_position else ""
+    return render_prompt('polish_description', job_context=job_context, original_html=original_html)
+
+
+def _build_resume_analysis_messages(resume_text: str, jd_text: str) -> list:
+    return render_prompt('resume_analysis', jd_text=jd_text, resume_text=resume_text)
+
+
+def _build_generate_resume_messages(name: str, position: str, experience_years: str, keywords: str) -> list:
+    return render_prompt('generate_resume', name=name, position=position, experience_years=experience_years,
+                         keywords=keywords)
+
+
+# --- 结果后处理与兜底文案 (同步与异步服务共用) ---
+def _first_question_fallback(job_position: str) -> str:
+    return f"你好，欢迎参加 {job_position} 的面试。很抱歉，我的AI大脑暂时出了一点小问题。不过没关系，我们可以从一个经典问题开始：请先做一个简单的自我介绍吧。"
+
+
+NEXT_QUESTION_FALLBACK = "请谈谈你遇到的最大的技术挑战是什么？"
+
+
+def _normalize_report_scores(report_data: dict) -> dict:
+    if 'overall_score' in report_data:
+        try:
+            report_data['overall_score'] = int(report_data['overall_score'])
+        except:
+            report_data['overall_score'] = 0
+    if 'ability_scores' in report_data and isinstance(report_data.get('ability_scores'), list):
+        for item in report_data['ability_scores']:
             try:
-                report_data['overall_score'] = int(report_data['overall_score'])
+                item['score'] = float(item.get('score', 0))
             except:
-                report_data['overall_score'] = 0
-        if 'ability_scores' in report_data and isinstance(report_data.get('ability_scores'), list):
-            for item in report_data['ability_scores']:
+                item['score'] = 0
+    return report_data
+
+
+# 报告中逐项输出、需要尽早展示的数组字段
+FINAL_REPORT_ITEM_KEYS = ('ability_scores', 'improvement_suggestions', 'star_analysis')
+# 报告至少要包含这些字段才有展示意义，不完整的输出缺少它们时视为失败
+FINAL_REPORT_REQUIRED_KEYS = ('overall_score', 'ability_scores', 'overall_comment')
+GENERATED_RESUME_ITEM_KEYS = ('sidebar', 'main')
+
+
+def _finalize_report(report_data: dict, complete: bool) -> dict:
+    report_data = _normalize_report_scores(report_data)
+    if complete:
+        return report_data
+    missing = [key for key in FINAL_REPORT_REQUIRED_KEYS if key not in report_data]
+    if missing:
+        return {"error": f"AI 输出不完整，缺少 {', '.join(missing)}", "partial": report_data}
+    # 主要内容已生成，保留不完整的报告并做标记，前端据此提示
+    report_data['is_partial'] = True
+    return report_data
+
+
+def _normalize_analysis_scores(analysis_report: dict) -> dict:
+    if 'overall_score' in analysis_report and not isinstance(analysis_report['overall_score'], int):
+        try:
+            analysis_report['overall_score'] = int(analysis_report['overall_score'])
+        except (ValueError, TypeError):
+            analysis_report['overall_score'] = 0
+
+    if 'ability_scores' in analysis_report and isinstance(analysis_report.get('ability_scores'), list):
+        for item in analysis_report['ability_scores']:
+            if 'score' in item and not isinstance(item['score'], (int, float)):
                 try:
-                    item['score'] = float(item.get('score', 0))
-                except:
+                    item['score'] = float(item['score'])
+                except (ValueError, TypeError):
                     item['score'] = 0
-        return report_data
+    return analysis_report
+
+
+def generate_first_question(job_position: str, user: User, resume_text: str = None) -> str:
+    api_key, model = get_user_ai_config(user)
+    if not api_key or not model:
+        return "系统AI服务未配置或模型不存在。"
+
+    try:
+        messages = _build_first_question_messages(job_position, resume_text)
+        ai_response = _call_openai_api(api_key, model, messages, 300, 0.7,
+                                       cache_policy='generate_first_question')
+        return ai_response.get("question", "你好，请做个自我介绍吧。")
+    except Exception as e:
+        print(f"调用 AI 生成第一问时发生错误: {e}")
+        return _first_question_fallback(job_position)
+
+
+def analyze_answer(job_position: str, question: str, answer: str, user: User) -> str:
+    api_key, model = get_user_ai_config(user)
+    if not api_key or not model:
+        return "AI服务未配置，无法生成简评。"
+
+    try:
+        messages = _build_analyze_answer_messages(job_position, question, answer)
+        return _call_openai_text(api_key, model, messages, 200, 0.6, cache_policy='analyze_answer')
+    except Exception as e:
+        print(f"调用 AI 生成简评时发生错误: {e}")
+        return "AI 在分析时遇到了一点小问题。"
+
+
+def generate_next_question_stream(job_position: str, interview_history: list, user: User, history_summary: str = ''):
+    api_key, model = get_user_ai_config(user)
+    if not api_key or not model:
+        yield "AI服务未配置。"
+        return
+
+    try:
+        messages = _build_next_question_messages(job_position, interview_history, history_summary)
+        yield from _call_openai_api_stream(api_key, model, messages, 500, 0.8,
+                                           endpoint='generate_next_question_stream')
+    except Exception as e:
+        print(f"调用 AI 生成下一问时发生错误: {e}")
+        yield NEXT_QUESTION_FALLBACK
+
+
+# --- [核心改造 2/3] 重写 generate_final_report 函数 ---
+def generate_final_report(job_position: str, interview_history: list, user: User, resume_text: str = None,
+                          on_progress=None) -> dict:
+    api_key, model = get_user_ai_config(user)
+    if not api_key or not model:
+        return {"error": "AI服务未配置，无法生成报告。"}
+
+    try:
+        messages = _build_final_report_messages(job_position, interview_history, resume_text)
+        report_data, complete = _call_openai_json_stream(
+            api_key, model, messages, 4096, 0.5, item_keys=FINAL_REPORT_ITEM_KEYS,
+            endpoint='generate_final_report',
+            on_progress=on_progress and (lambda partial: on_progress(_normalize_report_scores(partial)))
+        )
+        return _finalize_report(report_data, complete)
     except Exception as e:
         print(f"调用 AI 生成最终报告时发生错误: {e}")
         return {"error": f"生成报告失败: {e}"}
@@ -305,65 +334,28 @@ def generate_final_report(job_position: str, interview_history: list, user: User
 # --- [核心改造 3/3] 新增一个函数，用于生成 AI 参考答案 ---
 def generate_reference_answer_for_question(job_position: str, question: str, user: User,
                                            resume_text: str = None) -> str:
-    api_key, model = _get_user_ai_config(user)
+    api_key, model = get_user_ai_config(user)
     if not api_key or not model:
         return "AI 服务未配置，无法生成参考答案。"
 
-    system_prompt = (
-        "你是一位经验极其丰富的资深技术专家和面试官，现在需要扮演一位明星候选人。"
-        "你的任务是针对一个具体问题，给出一个逻辑清晰、内容详实、并严格遵循 STAR 法则的完美回答。"
-    )
-
-    resume_context = "我没有提供简历。"
-    if resume_text:
-        resume_context = f"请参考我的简历：\n{resume_text}"
-
-    user_prompt = (
-        f"我正在面试 '{job_position}' 岗位。\n"
-        f"{resume_context}\n\n"
-        f"面试官的问题是：\n"
-        f"--- 问题开始 ---\n{question}\n--- 问题结束 ---\n\n"
-        "请为我生成一份这个问题的“专家级”参考答案。要求：\n"
-        "1. 如果是行为面试题，必须严格遵循 STAR 法则，每个部分都要清晰明了。\n"
-        "2. 内容要具体、有深度，最好包含量化的结果。\n"
-        "3. 直接返回答案文本，不需要任何额外的问候或解释。"
-    )
     try:
-        client = OpenAI(api_key=api_key, base_url=model.base_url)
-        response = client.chat.completions.create(
-            model=model.model_slug,
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-            stream=False,
-            max_tokens=1024,
-            temperature=0.6
-        )
-        return response.choices[0].message.content.strip()
+        messages = _build_reference_answer_messages(job_position, question, resume_text)
+        return _call_openai_text(api_key, model, messages, 1024, 0.6,
+                                 cache_policy='generate_reference_answer_for_question')
     except Exception as e:
         print(f"调用 AI 生成参考答案时发生错误: {e}")
         return "抱歉，AI 在思考参考答案时遇到了一点小问题。"
 
 
 def polish_description_by_ai(original_html: str, user: User, job_position: str = None) -> str:
-    # ... (此函数保持不变) ...
-    api_key, model = _get_user_ai_config(user)
+    api_key, model = get_user_ai_config(user)
     if not api_key or not model:
         return "<p>AI 服务未配置，无法进行润色。</p>"
 
-    system_prompt = (
-        "你是一位顶级的简历优化专家和资深 HR，尤其擅长使用 STAR 法则优化工作和项目描述。"
-        "规则：必须保持并返回与用户输入完全相同的 HTML 结构（如 <ul>, <li>），只修改文本内容。"
-    )
-    job_context = f" 这段描述是为应聘 '{job_position}' 岗位准备的。" if job_position else ""
-    user_prompt = (
-        f"请根据 STAR 法则，优化以下简历描述。{job_context}\n\n"
-        f"原始 HTML 内容：\n```html\n{original_html}\n```\n\n"
-        f"请严格按照以下 JSON 格式返回优化后的 HTML 内容：\n"
-        "{\"polished_html\": \"(这里是你优化后的 HTML 字符串)\"}"
-    )
-
     try:
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        result_json = _call_openai_api(api_key, model, messages, 2048, 0.5)
+        messages = _build_polish_messages(original_html, job_position)
+        result_json = _call_openai_api(api_key, model, messages, 2048, 0.5,
+                                       cache_policy='polish_description_by_ai')
         return result_json.get("polished_html", original_html)
     except Exception as e:
         print(f"调用 AI 进行文本润色时发生错误: {e}")
@@ -371,74 +363,15 @@ def polish_description_by_ai(original_html: str, user: User, job_position: str =
 
 
 def analyze_resume_against_jd(resume_text: str, jd_text: str, user: User) -> dict:
-    # ... (此函数保持不变) ...
-    api_key, model = _get_user_ai_config(user)
+    api_key, model = get_user_ai_config(user)
     if not api_key or not model:
         return {"error": "AI 服务未配置，无法进行分析。"}
 
-    system_prompt = (
-        "你是一位顶级的职业规划导师和资深技术招聘官，拥有15年以上的经验，以分析精准、洞察深刻、要求严格著称。"
-        "你的任务是：像对待一份真实投递的简历一样，基于一份岗位描述（JD）和一份候选人简历，进行一次全面、深度、数据驱动的评估。"
-    )
-
-    user_prompt = (
-        f"请严格遵循以下步骤，对提供的简历和JD进行分析，并以一个完整的JSON对象格式返回结果，不要包含任何额外的解释。\n\n"
-        f"--- 岗位描述 (JD) ---\n"
-        f"{jd_text}\n"
-        f"--- JD 结束 ---\n\n"
-        f"--- 候选人简历 ---\n"
-        f"{resume_text}\n"
-        f"--- 简历结束 ---\n\n"
-        f"分析步骤与返回的JSON格式要求如下:\n"
-        "{\n"
-        "  \"overall_score\": (请给出一个0-100的整数，代表简历与JD的整体匹配度得分),\n"
-
-        "  \"ability_scores\": [\n"
-        "    {\"name\": \"岗位技能匹配度\", \"score\": (请根据简历中体现的技能与JD要求的吻合度，给出0-5分，可有1位小数)},\n"
-        "    {\"name\": \"项目经验含金量\", \"score\": (请评估简历中的项目经验是否复杂、有深度、与JD相关，给出0-5分)},\n"
-        "    {\"name\": \"经验的量化成果\", \"score\": (请评估简历中的描述是否大量使用了具体数字来量化工作成果，给出0-5分)},\n"
-        "    {\"name\": \"简历专业性\", \"score\": (请评估简历的整体排版、措辞和专业度，有无错别字等，给出0-5分)}\n"
-        "  ],\n"
-
-        "  \"keyword_analysis\": {\n"
-        "    \"jd_keywords\": [\"从JD中提取出5-8个最核心的技术/经验关键词\"],\n"
-        "    \"matched_keywords\": [\"在简历中明确匹配到的JD关键词\"],\n"
-        "    \"missing_keywords\": [\"简历中缺失的、但JD中很重要的关键词\"]\n"
-        "  },\n"
-        "  \"strengths_analysis\": [\n"
-        "    \"(分点列出2-3条简历中最突出的、与JD高度匹配的亮点)\"\n"
-        "  ],\n"
-        "  \"weaknesses_analysis\": [\n"
-        "    \"(分点列出2-3条简历中明显的不足或与JD不匹配之处)\"\n"
-        "  ],\n"
-        "  \"suggestions\": [\n"
-        "    {\n"
-        "      \"module\": \"(建议修改的简历模块名，如：'项目经历', '专业技能')\",\n"
-        "      \"suggestion\": \"(提供一条非常具体、可执行的修改建议，例如：'在AI模拟面试平台的项目描述中，将“提升了页面加载速度”具体化为“通过代码分割和图片懒加载，将首页的LCP时间从3.2s优化至1.8s”。')\"\n"
-        "    }\n"
-        "  ]\n"
-        "}"
-    )
-
     try:
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        analysis_report = _call_openai_api(api_key, model, messages, 3072, 0.6)
-
-        if 'overall_score' in analysis_report and not isinstance(analysis_report['overall_score'], int):
-            try:
-                analysis_report['overall_score'] = int(analysis_report['overall_score'])
-            except (ValueError, TypeError):
-                analysis_report['overall_score'] = 0
-
-        if 'ability_scores' in analysis_report and isinstance(analysis_report.get('ability_scores'), list):
-            for item in analysis_report['ability_scores']:
-                if 'score' in item and not isinstance(item['score'], (int, float)):
-                    try:
-                        item['score'] = float(item['score'])
-                    except (ValueError, TypeError):
-                        item['score'] = 0
-
-        return analysis_report
+        messages = _build_resume_analysis_messages(resume_text, jd_text)
+        analysis_report = _call_openai_api(api_key, model, messages, 3072, 0.6,
+                                           endpoint='analyze_resume_against_jd')
+        return _normalize_analysis_scores(analysis_report)
 
     except Exception as e:
         print(f"调用 AI 进行简历分析时发生错误: {e}")
@@ -446,134 +379,18 @@ def analyze_resume_against_jd(resume_text: str, jd_text: str, user: User) -> dic
 
 
 def generate_resume_by_ai(name: str, position: str, experience_years: str, keywords: str, user: User) -> dict:
-    # ... (此函数保持不变) ...
-    api_key, model = _get_user_ai_config(user)
+    api_key, model = get_user_ai_config(user)
     if not api_key or not model:
         return {"error": "AI 服务未配置"}
 
-    system_prompt = (
-        "你是一位世界顶级的简历撰写专家，任务是根据用户的核心信息，生成一份专业、完整的简历。"
-        "你必须严格按照我指定的 JSON 格式返回，包含 'sidebar' 和 'main' 两个区域的模块数组。"
-    )
-    user_prompt = (
-        f"请为我生成一份简历。我的核心信息如下：\n"
-        f"- 姓名: {name}\n"
-        f"- 期望岗位: {position}\n"
-        f"- 工作年限: {experience_years}\n"
-        f"- 其他关键词或个人优势: {keywords}\n\n"
-        f"请为我生成“基本信息”、“教育背景”、“工作经历”、“项目经历”、“专业技能”和“自我评价”这几个核心模块。"
-        f"内容需要你根据期望岗位进行专业的、合理的虚构和扩展，使其看起来非常真实和有竞争力。"
-        f"返回的 JSON 结构必须如下（不要包含任何额外解释）：\n"
-        "{\n"
-        "  \"sidebar\": [\n"
-        "    {\n"
-        "      \"id\": \"(生成一个uuid)\",\n"
-        "      \"componentName\": \"BaseInfoModule\",\n"
-        "      \"moduleType\": \"BaseInfo\",\n"
-        "      \"title\": \"基本信息\",\n"
-        "      \"props\": {\n"
-        "        \"show\": true,\n"
-        "        \"name\": \"(用户的姓名)\",\n"
-        "        \"photo\": \"\",\n"
-        "        \"items\": [\n"
-        "          {\"id\": \"(uuid)\", \"label\": \"电话\", \"value\": \"138-xxxx-xxxx\"},\n"
-        "          {\"id\": \"(uuid)\", \"label\": \"邮箱\", \"value\": \"xxxx@email.com\"}\n"
-        "        ]\n"
-        "      }\n"
-        "    },\n"
-        "    {\n"
-        "      \"id\": \"(uuid)\",\n"
-        "      \"componentName\": \"SkillsModule\",\n"
-        "      \"moduleType\": \"Skills\",\n"
-        "      \"title\": \"专业技能\",\n"
-        "      \"props\": {\n"
-        "        \"show\": true,\n"
-        "        \"title\": \"专业技能\",\n"
-        "        \"skills\": [\n"
-        "          {\"id\": \"(uuid)\", \"name\": \"(根据岗位生成的核心技能1)\", \"proficiency\": \"精通\"},\n"
-        "          {\"id\": \"(uuid)\", \"name\": \"(技能2)\", \"proficiency\": \"熟练\"}\n"
-        "        ]\n"
-        "      }\n"
-        "    }\n"
-        "  ],\n"
-        "  \"main\": [\n"
-        "    {\n"
-        "      \"id\": \"(uuid)\",\n"
-        "      \"componentName\": \"SummaryModule\",\n"
-        "      \"moduleType\": \"Summary\",\n"
-        "      \"title\": \"自我评价\",\n"
-        "      \"props\": {\n"
-        "        \"show\": true,\n"
-        "        \"title\": \"自我评价\",\n"
-        "        \"summary\": \"(生成一段2-3句话分点的、高度概括的自我评价)\"\n"
-        "      }\n"
-        "    },\n"
-        "    {\n"
-        "      \"id\": \"(uuid)\",\n"
-        "      \"componentName\": \"WorkExpModule\",\n"
-        "      \"moduleType\": \"WorkExp\",\n"
-        "      \"title\": \"工作经历\",\n"
-        "      \"props\": {\n"
-        "        \"show\": true,\n"
-        "        \"title\": \"工作经历\",\n"
-        "        \"experiences\": [\n"
-        "          {\n"
-        "            \"id\": \"(uuid)\",\n"
-        "            \"company\": \"(虚构一个知名的相关公司)\",\n"
-        "            \"position\": \"(相关职位)\",\n"
-        "            \"dateRange\": [\"(合理的开始年份)\", \"(合理的结束年份)\"],\n"
-        "            \"description\": \"(使用STAR法则分点生成一段非常有吸引力的工作描述，包含量化结果)\"\n"
-        "          }\n"
-        "        ]\n"
-        "      }\n"
-        "    },\n"
-        "    {\n"
-        "      \"id\": \"(uuid)\",\n"
-        "      \"componentName\": \"ProjectModule\",\n"
-        "      \"moduleType\": \"Project\",\n"
-        "      \"title\": \"项目经历\",\n"
-        "      \"props\": {\n"
-        "        \"show\": true,\n"
-        "        \"title\": \"项目经历\",\n"
-        "        \"projects\": [\n"
-        "          {\n"
-        "            \"id\": \"(uuid)\",\n"
-        "            \"name\": \"(虚构一个亮眼的相关项目)\",\n"
-        "            \"role\": \"(核心角色)\",\n"
-        "            \"dateRange\": [\"(合理的开始年份)\", \"(合理的结束年份)\"],\n"
-        "            \"description\": \"(使用STAR法则分点生成一段非常有吸引力的项目描述)\",\n"
-        "            \"techStack\": \"(项目使用的技术栈)\"\n"
-        "          }\n"
-        "        ]\n"
-        "      }\n"
-        "    },\n"
-        "    {\n"
-        "      \"id\": \"(uuid)\",\n"
-        "      \"componentName\": \"EducationModule\",\n"
-        "      \"moduleType\": \"Education\",\n"
-        "      \"title\": \"教育背景\",\n"
-        "      \"props\": {\n"
-        "        \"show\": true,\n"
-        "        \"title\": \"教育背景\",\n"
-        "        \"educations\": [\n"
-        "          {\n"
-        "            \"id\": \"(uuid)\",\n"
-        "            \"school\": \"(虚构一所不错的大学)\",\n"
-        "            \"major\": \"(相关专业)\",\n"
-        "            \"degree\": \"(本科/硕士)\",\n"
-        "            \"dateRange\": [\"(合理的开始年份)\", \"(合理的结束年份)\"],\n"
-        "            \"description\": \"\"\n"
-        "          }\n"
-        "        ]\n"
-        "      }\n"
-        "    }\n"
-        "  ]\n"
-        "}"
-    )
     try:
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        resume_json = _call_openai_api(api_key, model, messages, 4096, 0.8)
+        messages = _build_generate_resume_messages(name, position, experience_years, keywords)
+        resume_json, complete = _call_openai_json_stream(api_key, model, messages, 4096, 0.8,
+                                                         item_keys=GENERATED_RESUME_ITEM_KEYS,
+                                                         endpoint='generate_resume_by_ai')
+        if not complete:
+            print(f"AI 生成的简历不完整，已保留可解析的部分: {list(resume_json)}")
         return resume_json
     except Exception as e:
         print(f"调用 AI 生成简历时发生错误: {e}")
-        return {"error": f"AI 生成失败: {e}"}
\ No newline at end of file
+        return {"error": f"AI 生成失败: {e}"}
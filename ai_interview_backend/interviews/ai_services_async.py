@@ -0,0 +1,229 @@
+# ai_interview_backend/interviews/ai_services_async.py
+"""
+基于 AsyncOpenAI 的异步 AI 服务，与 ai_services.py 中的同步函数一一对应。
+提示词与结果后处理完全复用同步版本，只替换网络调用部分，
+供 ASGI 下的异步视图使用：等待 LLM 响应期间不再占用 worker 线程。
+"""
+
+from asgiref.sync import sync_to_async
+from users.models import User
+from system.models import AIModel
+from .ai_config import get_user_ai_config
+from .llm_cache import acached_llm_call
+from .prompts import load_prompt_templates
+from .json_stream import IncrementalJSONParser
+from .llm_gateway import acall_llm, LLMStream
+from .ai_services import (
+    _parse_json_content,
+    _build_request_params,
+    _build_text_params,
+    _finish_json_stream,
+    _build_first_question_messages,
+    _build_analyze_answer_messages,
+    _build_next_question_messages,
+    _build_final_report_messages,
+    _build_reference_answer_messages,
+    _build_polish_messages,
+    _build_resume_analysis_messages,
+    _build_generate_resume_messages,
+    _first_question_fallback,
+    _normalize_analysis_scores,
+    _finalize_report,
+    FINAL_REPORT_ITEM_KEYS,
+    GENERATED_RESUME_ITEM_KEYS,
+    NEXT_QUESTION_FALLBACK,
+)
+
+
+def _get_user_ai_config_and_prompts(user: User):
+    # 顺带刷新提示词模板缓存，构造提示词时就不会在事件循环中查询数据库
+    load_prompt_templates()
+    return get_user_ai_config(user)
+
+
+# AI 配置解析可能访问数据库 / Redis，需要放到线程中执行
+aget_user_ai_config = sync_to_async(_get_user_ai_config_and_prompts)
+
+
+async def _acall_openai_api(api_key: str, model: AIModel, messages: list, max_tokens: int, temperature: float,
+                            cache_policy: str = None, endpoint: str = None):
+    endpoint = endpoint or cache_policy
+
+    async def call():
+        return await acall_llm(
+            endpoint, api_key, model, 'json',
+            lambda m: _build_request_params(m, messages, max_tokens, temperature),
+            # 同时返回实际使用的模型，故障转移的结果不写入缓存
+            lambda m, response: (_parse_json_content(m, response.choices[0].message.content), m),
+        )
+
+    return await acached_llm_call(cache_policy, model, messages, max_tokens, temperature, 'json', call)
+
+
+async def _acall_openai_text(api_key: str, model: AIModel, messages: list, max_tokens: int,
+                             temperature: float, cache_policy: str = None, endpoint: str = None) -> str:
+    endpoint = endpoint or cache_policy
+
+    async def call():
+        return await acall_llm(
+            endpoint, api_key, model, 'text',
+            lambda m: _build_text_params(m, messages, max_tokens, temperature),
+            lambda m, response: (response.choices[0].message.content.strip(), m),
+        )
+
+    return await acached_llm_call(cache_policy, model, messages, max_tokens, temperature, 'text', call)
+
+
+async def _acall_openai_json_stream(api_key: str, model: AIModel, messages: list, max_tokens: int,
+                                    temperature: float, item_keys=(), on_progress=None, endpoint: str = None) -> tuple:
+    parser = IncrementalJSONParser(item_keys)
+    stream = LLMStream(
+        endpoint, api_key, model, 'json_stream',
+        lambda m: _build_request_params(m, messages, max_tokens, temperature),
+    )
+    try:
+        async for content in stream:
+            if parser.feed(content) and on_progress:
+                on_progress(parser.partial())
+    except Exception as e:
+        partial = parser.partial()
+        if not partial:
+            raise
+        print(f"流式 JSON 调用中断，保留已生成的 {len(partial)} 个字段: {e}")
+        return partial, False
+    return _finish_json_stream(parser, stream)
+
+
+async def _acall_openai_api_stream(api_key: str, model: AIModel, messages: list, max_tokens: int,
+                                   temperature: float, endpoint: str = None):
+    async for content in LLMStream(
+        endpoint, api_key, model, 'stream',
+        lambda m: _build_text_params(m, messages, max_tokens, temperature),
+    ):
+        yield content
+
+
+async def agenerate_first_question(job_position: str, user: User, resume_text: str = None) -> str:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return "系统AI服务未配置或模型不存在。"
+
+    try:
+        messages = _build_first_question_messages(job_position, resume_text)
+        ai_response = await _acall_openai_api(api_key, model, messages, 300, 0.7,
+                                              cache_policy='generate_first_question')
+        return ai_response.get("question", "你好，请做个自我介绍吧。")
+    except Exception as e:
+        print(f"调用 AI 生成第一问时发生错误: {e}")
+        return _first_question_fallback(job_position)
+
+
+async def aanalyze_answer(job_position: str, question: str, answer: str, user: User) -> str:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return "AI服务未配置，无法生成简评。"
+
+    try:
+        messages = _build_analyze_answer_messages(job_position, question, answer)
+        return await _acall_openai_text(api_key, model, messages, 200, 0.6, cache_policy='analyze_answer')
+    except Exception as e:
+        print(f"调用 AI 生成简评时发生错误: {e}")
+        return "AI 在分析时遇到了一点小问题。"
+
+
+async def agenerate_next_question_stream(job_position: str, interview_history: list, user: User,
+                                         history_summary: str = ''):
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        yield "AI服务未配置。"
+        return
+
+    try:
+        messages = _build_next_question_messages(job_position, interview_history, history_summary)
+        async for content in _acall_openai_api_stream(api_key, model, messages, 500, 0.8,
+                                                      endpoint='generate_next_question_stream'):
+            yield content
+    except Exception as e:
+        print(f"调用 AI 生成下一问时发生错误: {e}")
+        yield NEXT_QUESTION_FALLBACK
+
+
+async def agenerate_final_report(job_position: str, interview_history: list, user: User,
+                                 resume_text: str = None) -> dict:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return {"error": "AI服务未配置，无法生成报告。"}
+
+    try:
+        messages = _build_final_report_messages(job_position, interview_history, resume_text)
+        report_data, complete = await _acall_openai_json_stream(api_key, model, messages, 4096, 0.5,
+                                                                item_keys=FINAL_REPORT_ITEM_KEYS,
+                                                                endpoint='generate_final_report')
+        return _finalize_report(report_data, complete)
+    except Exception as e:
+        print(f"调用 AI 生成最终报告时发生错误: {e}")
+        return {"error": f"生成报告失败: {e}"}
+
+
+async def agenerate_reference_answer_for_question(job_position: str, question: str, user: User,
+                                                  resume_text: str = None) -> str:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return "AI 服务未配置，无法生成参考答案。"
+
+    try:
+        messages = _build_reference_answer_messages(job_position, question, resume_text)
+        return await _acall_openai_text(api_key, model, messages, 1024, 0.6,
+                                        cache_policy='generate_reference_answer_for_question')
+    except Exception as e:
+        print(f"调用 AI 生成参考答案时发生错误: {e}")
+        return "抱歉，AI 在思考参考答案时遇到了一点小问题。"
+
+
+async def apolish_description_by_ai(original_html: str, user: User, job_position: str = None) -> str:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return "<p>AI 服务未配置，无法进行润色。</p>"
+
+    try:
+        messages = _build_polish_messages(original_html, job_position)
+        result_json = await _acall_openai_api(api_key, model, messages, 2048, 0.5,
+                                              cache_policy='polish_description_by_ai')
+        return result_json.get("polished_html", original_html)
+    except Exception as e:
+        print(f"调用 AI 进行文本润色时发生错误: {e}")
+        return original_html
+
+
+async def aanalyze_resume_against_jd(resume_text: str, jd_text: str, user: User) -> dict:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return {"error": "AI 服务未配置，无法进行分析。"}
+
+    try:
+        messages = _build_resume_analysis_messages(resume_text, jd_text)
+        analysis_report = await _acall_openai_api(api_key, model, messages, 3072, 0.6,
+                                                  endpoint='analyze_resume_against_jd')
+        return _normalize_analysis_scores(analysis_report)
+    except Exception as e:
+        print(f"调用 AI 进行简历分析时发生错误: {e}")
+        return {"error": f"分析失败，AI服务暂时不可用: {e}"}
+
+
+async def agenerate_resume_by_ai(name: str, position: str, experience_years: str, keywords: str,
+                                 user: User) -> dict:
+    api_key, model = await aget_user_ai_config(user)
+    if not api_key or not model:
+        return {"error": "AI 服务未配置"}
+
+    try:
+        messages = _build_generate_resume_messages(name, position, experience_years, keywords)
+        resume_json, complete = await _acall_openai_json_stream(api_key, model, messages, 4096, 0.8,
+                                                                item_keys=GENERATED_RESUME_ITEM_KEYS,
+                                                                endpoint='generate_resume_by_ai')
+        if not complete:
+            print(f"AI 生成的简历不完整，已保留可解析的部分: {list(resume_json)}")
+        return resume_json
+    except Exception as e:
+        print(f"调用 AI 生成简历时发生错误: {e}")
+        return {"error": f"AI 生成失败: {e}"}
@@ -0,0 +1,129 @@
+# ai_interview_backend/interviews/answer_stream.py
+"""
+一轮问答的事件生产者：并行生成简评与下一问，把结果以类型化事件写入 TurnEventStream。
+
+事件类型:
+- token:          下一问的一个文本片段 {content}
+- feedback:       对刚提交回答的简评 {question_id, feedback}
+- question_saved: 下一问已落库 {question_id, sequence, question_text}
+- done:           本轮结束 {question_id}
+- error:          生成失败 {message}
+
+生产者不依赖 HTTP 连接，客户端断开后仍会把本轮跑完并落库，重连时直接从缓冲区读取。
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from .models import InterviewQuestion
+from .ai_services import analyze_answer, generate_next_question_stream
+from .ai_services_async import aanalyze_answer, agenerate_next_question_stream
+from .streaming import sse_event, run_in_background, run_producer
+
+# 持有异步生产者任务的强引用，防止任务在客户端断开后被垃圾回收
+_running_tasks = set()
+
+
+def _question_saved_data(question: InterviewQuestion) -> dict:
+    return {'question_id': question.id, 'sequence': question.sequence, 'question_text': question.question_text}
+
+
+def produce_turn_events(stream, session, current_question, history, next_sequence, user, history_summary=''):
+    """同步生产者，在 run_producer 的线程中执行。"""
+    feedback_future = run_in_background(
+        analyze_answer, session.job_position, current_question.question_text, current_question.answer_text, user
+    )
+
+    def emit_feedback():
+        feedback_text = feedback_future.result()
+        current_question.ai_feedback = {"feedback": feedback_text}
+        current_question.save(update_fields=['ai_feedback'])
+        stream.append('feedback', {'question_id': current_question.id, 'feedback': feedback_text})
+
+    try:
+        question_buffer = []
+        feedback_sent = False
+        for chunk in generate_next_question_stream(session.job_position, history, user, history_summary):
+            question_buffer.append(chunk)
+            stream.append('token', {'content': chunk})
+            if not feedback_sent and feedback_future.done():
+                feedback_sent = True
+                emit_feedback()
+        next_question = InterviewQuestion.objects.create(session=session, question_text="".join(question_buffer),
+                                                         sequence=next_sequence)
+        stream.append('question_saved', _question_saved_data(next_question))
+        if not feedback_sent:
+            emit_feedback()
+        stream.append('done', {'question_id': next_question.id})
+    except Exception as e:
+        print(f"生成面试下一问事件流时发生错误: {e}")
+        stream.append('error', {'message': '生成下一题失败，请重新提交。'})
+        # 允许客户端重新提交本轮回答
+        stream.release_producer()
+
+
+def start_turn_producer(stream, session, current_question, history, next_sequence, user, history_summary=''):
+    return run_producer(produce_turn_events, stream, session, current_question, history, next_sequence, user,
+                        history_summary)
+
+
+async def aproduce_turn_events(stream, session, current_question, history, next_sequence, user,
+                               history_summary=''):
+    """异步生产者，作为独立的 asyncio 任务运行。"""
+    append = sync_to_async(stream.append, thread_sensitive=False)
+    feedback_task = asyncio.create_task(
+        aanalyze_answer(session.job_position, current_question.question_text, current_question.answer_text, user)
+    )
+
+    async def emit_feedback():
+        feedback_text = await feedback_task
+        current_question.ai_feedback = {"feedback": feedback_text}
+        await current_question.asave(update_fields=['ai_feedback'])
+        await append('feedback', {'question_id': current_question.id, 'feedback': feedback_text})
+
+    try:
+        question_buffer = []
+        feedback_sent = False
+        async for chunk in agenerate_next_question_stream(session.job_position, history, user, history_summary):
+            question_buffer.append(chunk)
+            await append('token', {'content': chunk})
+            if not feedback_sent and feedback_task.done():
+                feedback_sent = True
+                await emit_feedback()
+        next_question = await InterviewQuestion.objects.acreate(session=session,
+                                                                question_text="".join(question_buffer),
+                                                                sequence=next_sequence)
+        await append('question_saved', _question_saved_data(next_question))
+        if not feedback_sent:
+            await emit_feedback()
+        await append('done', {'question_id': next_question.id})
+    except Exception as e:
+        print(f"生成面试下一问事件流时发生错误: {e}")
+        await append('error', {'message': '生成下一题失败，请重新提交。'})
+        await sync_to_async(stream.release_producer, thread_sensitive=False)()
+
+
+def astart_turn_producer(stream, session, current_question, history, next_sequence, user, history_summary=''):
+    task = asyncio.create_task(aproduce_turn_events(stream, session, current_question, history, next_sequence, user,
+                                                    history_summary))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return task
+
+
+def replay_turn_from_db(current_question: InterviewQuestion):
+    """
+    事件缓冲区已过期时，根据数据库中已保存的结果重建本轮的关键事件。
+    本轮尚未完成 (下一问还未落库) 时返回 None。
+    """
+    next_question = InterviewQuestion.objects.filter(session_id=current_question.session_id,
+                                                     sequence__gt=current_question.sequence).order_by('sequence').first()
+    if next_question is None:
+        return None
+    events = [sse_event('question_saved', _question_saved_data(next_question))]
+    if current_question.ai_feedback:
+        events.append(sse_event('feedback', {'question_id': current_question.id,
+                                             'feedback': current_question.ai_feedback.get('feedback', '')}))
+    events.append(sse_event('done', {'question_id': next_question.id}))
+    return events
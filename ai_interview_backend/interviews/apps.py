@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InterviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'interviews'
+
+    def ready(self):
+        import interviews.signals # 导入信号模块，注册 AI 配置缓存的失效处理
@@ -0,0 +1,255 @@
+# ai_interview_backend/interviews/async_views.py
+"""
+ASGI 原生的异步接口，与 views.py 中的同步接口功能一致，挂载在 /api/v1/async/ 下。
+DRF 的视图不支持 async，这里使用 Django 原生异步视图，并手动完成 JWT 认证。
+在 ASGI (uvicorn / daphne) 下运行时，等待 LLM 的 5~30 秒内不会占用任何 worker 线程。
+"""
+
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from resumes.models import Resume
+from resumes.services import format_resume_to_text
+from reports.models import ResumeAnalysisReport
+from reports.serializers import ResumeAnalysisReportSerializer
+from reports.services import submit_resume_analysis, AnalysisInProgress
+from .models import InterviewSession, InterviewQuestion
+from .serializers import SubmitAnswerSerializer
+from .views import get_user_cache_key, report_status_payload, REPORT_STATUS_FIELDS
+from .tasks import request_final_report
+from .streaming import SSE_CONTENT_TYPE, TurnEventStream, parse_last_event_id
+from .emotion_buffer import collect_answer_emotions
+from .history import build_rolling_history
+from .answer_stream import astart_turn_producer, replay_turn_from_db
+from .ai_services_async import (
+    aanalyze_answer,
+    apolish_description_by_ai,
+    agenerate_resume_by_ai,
+)
+
+
+def _error(message: str, status: int) -> JsonResponse:
+    return JsonResponse({"error": message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _jwt_authenticated(view_func):
+    authenticator = JWTAuthentication()
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except AuthenticationFailed as e:
+            return _error(str(e.detail), 401)
+        if result is None:
+            return _error("身份认证信息未提供。", 401)
+        request.user = result[0]
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_jwt_required(view_func):
+    """
+    异步视图的 JWT 认证装饰器，认证成功后把用户挂到 request.user 上。
+    """
+    return csrf_exempt(require_POST(_jwt_authenticated(view_func)))
+
+
+def async_jwt_required_get(view_func):
+    """只读 (GET) 接口使用的版本。"""
+    return require_GET(_jwt_authenticated(view_func))
+
+
+def _load_json_body(request) -> dict:
+    try:
+        return json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return {}
+
+
+def _sse_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type=SSE_CONTENT_TYPE)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _aiter_events(events: list):
+    for event in events:
+        yield event
+
+
+@async_jwt_required
+async def submit_answer_stream(request, pk):
+    try:
+        session = await InterviewSession.objects.aget(id=pk, user=request.user)
+    except InterviewSession.DoesNotExist:
+        return _error("面试不存在。", 404)
+    if session.status != InterviewSession.Status.RUNNING:
+        return _error("面试已结束或已取消。", 400)
+
+    serializer = SubmitAnswerSerializer(data=_load_json_body(request))
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    question_id = serializer.validated_data['question_id']
+    answer_text = serializer.validated_data['answer_text']
+    analysis_data = serializer.validated_data.get('analysis_data')
+    try:
+        current_question = await session.questions.aget(id=question_id)
+    except InterviewQuestion.DoesNotExist:
+        return _error("问题不存在", 404)
+
+    # 同一轮问答只生成一次，重复提交直接接入已有的事件流
+    stream = await sync_to_async(TurnEventStream, thread_sensitive=False)(session.id, current_question.id)
+    if not await sync_to_async(stream.claim_producer, thread_sensitive=False)():
+        return _sse_response(stream.aiter_sse(parse_last_event_id(request)))
+
+    release_producer = sync_to_async(stream.release_producer, thread_sensitive=False)
+    # 从抢占生产者身份到生产者启动之间出错时必须释放，否则重试会接入一个没有生产者的事件流直到超时
+    try:
+        first_answer = current_question.answered_at is None
+        current_question.answer_text = answer_text
+        current_question.answered_at = timezone.now()
+        # 【性能优化】合并回答期间通过 WebSocket 上报的情绪帧与请求体中的帧，按时间桶降采样后以紧凑的二进制格式存储
+        frame_stats = await sync_to_async(collect_answer_emotions, thread_sensitive=False)(current_question,
+                                                                                          analysis_data)
+        if frame_stats['dropped']:
+            print(f"问题 {current_question.id} 的情绪帧已降采样: {frame_stats}")
+        await cache.atouch(get_user_cache_key(request.user), timeout=7200)
+        await current_question.asave()
+        if first_answer:
+            # 面试记录列表使用的已回答题数，进行中和已取消的面试也需要 (重新回答同一题不重复计数)
+            await InterviewSession.objects.filter(id=session.id).aupdate(answered_count=F('answered_count') + 1)
+
+        answered_count = await session.questions.filter(answered_at__isnull=False).acount()
+        interview_finished = answered_count >= session.question_count
+        if not interview_finished:
+            # 【性能优化】只取最近几轮的完整问答，更早的轮次使用会话上增量维护的摘要
+            history_summary, history = await sync_to_async(build_rolling_history)(session)
+
+            # 生产者作为独立任务运行，客户端断开后仍会完成本轮生成并落库
+            astart_turn_producer(stream, session, current_question, history, answered_count + 1, request.user,
+                                 history_summary)
+    except Exception:
+        await release_producer()
+        raise
+
+    if interview_finished:
+        await release_producer()
+        feedback_text = await aanalyze_answer(session.job_position, current_question.question_text, answer_text,
+                                              request.user)
+        current_question.ai_feedback = {"feedback": feedback_text}
+        await current_question.asave(update_fields=['ai_feedback'])
+        return JsonResponse({"feedback": feedback_text, "interview_finished": True},
+                            json_dumps_params={'ensure_ascii': False})
+    return _sse_response(stream.aiter_sse(0))
+
+
+@async_jwt_required_get
+async def answer_stream(request, pk):
+    try:
+        session = await InterviewSession.objects.aget(id=pk, user=request.user)
+        current_question = await session.questions.aget(id=request.GET.get('question_id'))
+    except (InterviewSession.DoesNotExist, InterviewQuestion.DoesNotExist, ValueError):
+        return _error("问题不存在", 404)
+
+    stream = await sync_to_async(TurnEventStream, thread_sensitive=False)(session.id, current_question.id)
+    if await sync_to_async(stream.exists, thread_sensitive=False)():
+        return _sse_response(stream.aiter_sse(parse_last_event_id(request)))
+
+    events = await sync_to_async(replay_turn_from_db)(current_question)
+    if events is None:
+        return _error("没有可恢复的事件流，请重新提交回答。", 404)
+    return _sse_response(_aiter_events(events))
+
+
+@async_jwt_required
+async def finish_interview(request, pk):
+    try:
+        session = await InterviewSession.objects.aget(id=pk, user=request.user)
+    except InterviewSession.DoesNotExist:
+        return _error("面试不存在。", 404)
+    await cache.adelete(get_user_cache_key(request.user))
+
+    if session.report:
+        return JsonResponse(session.report, json_dumps_params={'ensure_ascii': False})
+
+    if not await session.questions.filter(answered_at__isnull=False).aexists():
+        return _error("没有有效的问答记录，无法生成报告", 400)
+
+    if session.status != InterviewSession.Status.FINISHED:
+        session.status = InterviewSession.Status.FINISHED
+        session.finished_at = timezone.now()
+        await session.asave(update_fields=['status', 'finished_at', 'updated_at'])
+
+    await sync_to_async(request_final_report)(session)
+    await session.arefresh_from_db(fields=REPORT_STATUS_FIELDS)
+    return JsonResponse(report_status_payload(session), status=202, json_dumps_params={'ensure_ascii': False})
+
+
+@async_jwt_required
+async def polish_description(request):
+    data = _load_json_body(request)
+    original_html = data.get('html_content')
+    if not original_html:
+        return _error('缺少 html_content 字段', 400)
+
+    polished_html = await apolish_description_by_ai(
+        original_html=original_html,
+        user=request.user,
+        job_position=data.get('job_position')
+    )
+    return JsonResponse({'polished_html': polished_html}, json_dumps_params={'ensure_ascii': False})
+
+
+@async_jwt_required
+async def analyze_resume(request):
+    data = _load_json_body(request)
+    resume_id = data.get('resume_id')
+    jd_text = data.get('jd_text')
+    if not resume_id or not jd_text:
+        return _error('必须提供 resume_id 和 jd_text 字段', 400)
+
+    try:
+        resume_instance = await Resume.objects.aget(id=resume_id, user=request.user)
+    except Resume.DoesNotExist:
+        return _error('简历不存在', 404)
+    resume_text = await sync_to_async(format_resume_to_text)(resume_instance)
+    if not resume_text.strip():
+        return _error('无法从该简历中提取有效文本内容', 400)
+
+    try:
+        report, _ = await sync_to_async(submit_resume_analysis)(request.user, resume_instance, resume_text, jd_text)
+    except AnalysisInProgress:
+        return _error('相同的分析正在提交中，请稍后重试。', 409)
+    if report is None:
+        return _error('AI 服务未配置，无法进行分析。', 500)
+    status = 201 if report.status == ResumeAnalysisReport.Status.COMPLETED else 202
+    return JsonResponse(ResumeAnalysisReportSerializer(report).data, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@async_jwt_required
+async def generate_resume(request):
+    data = _load_json_body(request)
+    name = data.get('name')
+    position = data.get('position')
+    experience_years = data.get('experience_years')
+    if not all([name, position, experience_years]):
+        return _error('姓名、岗位和工作年限为必填项', 400)
+
+    resume_json = await agenerate_resume_by_ai(name, position, experience_years, data.get('keywords', ''),
+                                               request.user)
+    status = 500 if 'error' in resume_json else 200
+    return JsonResponse(resume_json, status=status, json_dumps_params={'ensure_ascii': False})
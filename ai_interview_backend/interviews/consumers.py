@@ -0,0 +1,102 @@
+# ai_interview_backend/interviews/consumers.py
+
+import json
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .emotion_buffer import EmotionFrameBuffer
+from .emotions import MAX_RAW_FRAMES, find_invalid_frame
+from .models import InterviewSession, InterviewQuestion
+
+
+class InterviewEmotionConsumer(AsyncWebsocketConsumer):
+    """
+    【性能优化】面试过程中的情绪帧上报通道。
+
+    候选人回答期间，前端每隔几秒通过 WebSocket 发送一批情绪帧，
+    服务端降采样后暂存在 Redis (EmotionFrameBuffer)，提交回答时一次性合并入库，
+    避免在提交回答 (同时开始调用 LLM) 时才上传并处理整段情绪数据。
+
+    消息格式: {"type": "emotion_frames", "question_id": 1, "frames": [{"timestamp": ..., "emotions": {...}}]}
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = None
+        self.session_id = None
+        # 已校验过归属、且尚未回答的问题 ID，避免每批帧都查询数据库
+        self.question_ids = set()
+
+    async def connect(self):
+        self.user = self.scope["user"]
+        if not self.user.is_authenticated:
+            print("Interview WebSocket Auth Failed: User not authenticated")
+            await self.close()
+            return
+
+        self.session_id = self.scope['url_route']['kwargs']['session_id']
+        if not await self.session_in_progress():
+            await self.close()
+            return
+        await self.accept()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if not text_data:
+            return
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return  # 忽略无效的 JSON
+
+        if data.get('type') == 'emotion_frames':
+            await self.handle_emotion_frames(data)
+
+    async def handle_emotion_frames(self, data):
+        question_id = data.get('question_id')
+        frames = data.get('frames')
+        if not isinstance(frames, list) or len(frames) > MAX_RAW_FRAMES:
+            await self.send_error(question_id, '情绪帧格式错误或数量超过上限。')
+            return
+        # 格式错误的一批帧整体拒绝，不能让异常中断整场面试的连接
+        invalid = find_invalid_frame(frames)
+        if invalid:
+            await self.send_error(question_id, f"第 {invalid[0] + 1} 个情绪帧格式错误：{invalid[1]}")
+            return
+        if question_id not in self.question_ids:
+            if not await self.question_is_open(question_id):
+                await self.send_error(question_id, '问题不存在或已回答。')
+                return
+            self.question_ids.add(question_id)
+
+        buffer = EmotionFrameBuffer(self.session_id, question_id)
+        try:
+            received = await sync_to_async(buffer.append, thread_sensitive=False)(frames)
+        except Exception as e:
+            print(f"缓存情绪帧失败 (问题 {question_id}): {e}")
+            await self.send_error(question_id, '情绪帧保存失败。')
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'emotion_frames_ack',
+            'question_id': question_id,
+            'received': received,
+        }))
+
+    async def send_error(self, question_id, message: str):
+        await self.send(text_data=json.dumps({'type': 'error', 'question_id': question_id, 'message': message},
+                                             ensure_ascii=False))
+
+    @database_sync_to_async
+    def session_in_progress(self) -> bool:
+        return InterviewSession.objects.filter(
+            id=self.session_id, user=self.user, status=InterviewSession.Status.RUNNING
+        ).exists()
+
+    @database_sync_to_async
+    def question_is_open(self, question_id) -> bool:
+        if not isinstance(question_id, int):
+            return False
+        return InterviewQuestion.objects.filter(
+            id=question_id, session_id=self.session_id, answered_at__isnull=True
+        ).exists()
@@ -0,0 +1,85 @@
+# ai_interview_backend/interviews/emotion_buffer.py
+
+import numpy as np
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from .emotions import (
+    frames_to_array, downsample_emotion_arrays, encode_emotion_arrays, decode_emotion_arrays, MAX_FRAMES,
+)
+
+# 缓冲区在 Redis 中的保留时间 (秒)，超过这个时间仍未提交回答的帧会被丢弃
+BUFFER_TTL = getattr(settings, 'INTERVIEW_EMOTION_BUFFER_TTL', 3600)
+# 缓冲区累积到这么多段后合并为一段，保证单道题占用的 Redis 空间有上限
+COMPACT_CHUNKS = getattr(settings, 'INTERVIEW_EMOTION_BUFFER_COMPACT_CHUNKS', 32)
+
+
+class EmotionFrameBuffer:
+    """
+    一道题回答期间通过 WebSocket 陆续上报的情绪帧缓冲区。
+
+    以 Redis 列表存放，每个元素是一批已按时间桶降采样的帧 (emotions.py 中的二进制编码)；
+    提交回答时由 flush 一次性取出，与请求体中的帧合并后写入 InterviewQuestion。
+    """
+
+    def __init__(self, session_id, question_id):
+        self.key = f"interview_emotions:{session_id}:{question_id}"
+        self.count_key = f"{self.key}:received"
+        self.redis = get_redis_connection('default')
+
+    def append(self, frames: list) -> int:
+        """追加一批帧，返回其中的有效帧数。"""
+        timestamps, scores = frames_to_array(frames)
+        received = scores.shape[0]
+        if not received:
+            return 0
+        timestamps, scores = downsample_emotion_arrays(timestamps, scores, max_frames=MAX_FRAMES)
+        pipe = self.redis.pipeline()
+        pipe.rpush(self.key, encode_emotion_arrays(timestamps, scores))
+        pipe.incrby(self.count_key, received)
+        pipe.expire(self.key, BUFFER_TTL)
+        pipe.expire(self.count_key, BUFFER_TTL)
+        length = pipe.execute()[0]
+        if length >= COMPACT_CHUNKS:
+            self.compact()
+        return received
+
+    @staticmethod
+    def _merge(chunks: list) -> tuple:
+        arrays = [decode_emotion_arrays(chunk) for chunk in chunks]
+        return np.concatenate([a[0] for a in arrays]), np.concatenate([a[1] for a in arrays])
+
+    def compact(self):
+        """把已有的各段合并成一段。合并期间新追加的段保留在列表尾部，不会丢失。"""
+        chunks = self.redis.lrange(self.key, 0, -1)
+        if len(chunks) < 2:
+            return
+        timestamps, scores = downsample_emotion_arrays(*self._merge(chunks), max_frames=MAX_FRAMES)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.ltrim(self.key, len(chunks), -1)
+        pipe.lpush(self.key, encode_emotion_arrays(timestamps, scores))
+        pipe.expire(self.key, BUFFER_TTL)
+        pipe.execute()
+
+    def flush(self):
+        """取出并清空缓冲区，返回 (timestamps, scores, 收到的有效帧数)；缓冲区为空时返回 None。"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrange(self.key, 0, -1)
+        pipe.get(self.count_key)
+        pipe.delete(self.key, self.count_key)
+        chunks, received, _ = pipe.execute()
+        if not chunks:
+            return None
+        timestamps, scores = self._merge(chunks)
+        return timestamps, scores, int(received or 0)
+
+
+def collect_answer_emotions(question, analysis_data: list = None) -> dict:
+    """
+    提交回答时汇总这道题的情绪帧：WebSocket 缓冲区中的帧与请求体中的帧 (旧版客户端) 合并，
+    降采样后写入 question (不保存)，返回降采样统计。
+    """
+    buffered = EmotionFrameBuffer(question.session_id, question.id).flush()
+    if buffered is None and not analysis_data:
+        return {'received': 0, 'valid': 0, 'stored': 0, 'dropped': 0}
+    return question.ingest_analysis_frames(analysis_data, buffered)
@@ -0,0 +1,332 @@
+# ai_interview_backend/interviews/emotions.py
+"""
+回答期间情绪时间线 (analysis_data) 的向量化统计。
+
+前端 (face-api.js) 每帧上报一个 {'timestamp': 毫秒, 'emotions': {情绪: 得分}}，
+这里把一道题的所有帧一次性转换成 (帧数 × 7) 的 NumPy 数组，
+在数组上计算主导情绪分布、情绪切换、波动度和分段均值，供报告提示词使用。
+
+情绪帧在数据库中以紧凑的列式二进制格式存储 (见 encode_emotion_frames)：
+    头部 '<2sBBIq'：魔数 b'EM'、版本、标志位、帧数、首帧时间戳 (毫秒)
+    正文：int32 时间戳增量 × n，随后是 uint8 量化得分 (n × 7，按 EMOTION_LABELS 列序)
+    标志位 FLAG_ZLIB 表示正文经过 zlib 压缩；FLAG_WIDE_DELTAS 表示时间戳增量为 int64
+    (相邻两帧间隔超出 int32 范围时使用)。
+"""
+
+import math
+import zlib
+import struct
+
+import numpy as np
+from django.conf import settings
+
+# 列顺序固定，所有数组的第 i 列都对应 EMOTION_LABELS[i]
+EMOTION_LABELS = ('neutral', 'happy', 'sad', 'angry', 'fearful', 'disgusted', 'surprised')
+EMOTION_NAMES = {
+    'neutral': '平静', 'happy': '开心', 'sad': '悲伤', 'angry': '生气',
+    'fearful': '害怕', 'disgusted': '厌恶', 'surprised': '惊讶',
+}
+SEGMENT_NAMES = ('开始', '中段', '结尾')
+
+_N_EMOTIONS = len(EMOTION_LABELS)
+
+_HEADER = struct.Struct('<2sBBIq')
+_MAGIC = b'EM'
+_VERSION = 1
+FLAG_ZLIB = 0x01
+FLAG_WIDE_DELTAS = 0x02
+# 时间戳 (毫秒) 的上限：数组中以 float64 保存，超过 2^53 会丢失精度
+MAX_TIMESTAMP = 2 ** 53
+# 得分量化为 0~255 的整数，精度约 0.004，远高于前端模型本身的精度
+_QUANT_SCALE = 255
+COMPRESS = getattr(settings, 'INTERVIEW_EMOTION_COMPRESS', True)
+
+# 入库前的降采样：同一时间桶 (毫秒) 内的帧合并为一帧，每道题最多保留 MAX_FRAMES 帧
+BUCKET_MS = getattr(settings, 'INTERVIEW_EMOTION_BUCKET_MS', 250)
+AGGREGATION = getattr(settings, 'INTERVIEW_EMOTION_AGGREGATION', 'mean')  # 'mean' 或 'max'
+MAX_FRAMES = getattr(settings, 'INTERVIEW_EMOTION_MAX_FRAMES', 2400)
+# 单次提交允许的原始帧数上限，超出直接拒绝请求
+MAX_RAW_FRAMES = getattr(settings, 'INTERVIEW_EMOTION_MAX_RAW_FRAMES', 20000)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def frame_error(frame) -> str:
+    """检查单个情绪帧的格式，返回错误说明；格式正确时返回 None。"""
+    if not isinstance(frame, dict):
+        return "情绪帧必须是对象。"
+    timestamp = frame.get('timestamp')
+    # 与编码格式的范围一致 (见 encode_emotion_arrays)
+    if not _is_number(timestamp) or not 0 <= timestamp < MAX_TIMESTAMP:
+        return "timestamp 必须是非负的毫秒数。"
+    emotions = frame.get('emotions')
+    if emotions is not None and not isinstance(emotions, dict):
+        return "emotions 必须是 {情绪: 得分} 对象。"
+    if emotions and not all(_is_number(score) for score in emotions.values()):
+        return "情绪得分必须是数字。"
+    return None
+
+
+def find_invalid_frame(frames: list) -> tuple:
+    """返回第一个格式错误的帧的 (序号, 错误说明)；全部正确时返回 None。"""
+    for index, frame in enumerate(frames):
+        error = frame_error(frame)
+        if error:
+            return index, error
+    return None
+
+
+def _collect_frames(analysis_data: list, timestamps: list, rows: list) -> int:
+    """把一道题的有效帧追加到 timestamps / rows 中，返回追加的帧数。格式错误的帧直接跳过。"""
+    count = 0
+    for frame in analysis_data or []:
+        if frame_error(frame):
+            continue
+        emotions = frame.get('emotions')
+        if not emotions:
+            continue
+        rows.append([emotions.get(label, 0.0) for label in EMOTION_LABELS])
+        timestamps.append(frame['timestamp'])
+        count += 1
+    return count
+
+
+def _to_arrays(timestamps: list, rows: list) -> tuple:
+    if not rows:
+        return np.empty(0, dtype=np.float64), np.empty((0, _N_EMOTIONS), dtype=np.float64)
+    return np.asarray(timestamps, dtype=np.float64), np.asarray(rows, dtype=np.float64)
+
+
+def frames_to_array(analysis_data: list) -> tuple:
+    """
+    把情绪帧列表转换为 (timestamps, scores)：timestamps 形状为 (n,)，scores 形状为 (n, 7)。
+    没有情绪数据的帧会被跳过，缺失的情绪按 0 分处理。
+    """
+    timestamps, rows = [], []
+    _collect_frames(analysis_data, timestamps, rows)
+    return _to_arrays(timestamps, rows)
+
+
+def _aggregate(groups: np.ndarray, timestamps: np.ndarray, scores: np.ndarray, aggregation: str) -> tuple:
+    """按分组编号 (已按升序排列) 合并帧：时间戳取组内第一帧，得分取均值或最大值。"""
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    if aggregation == 'max':
+        merged = np.maximum.reduceat(scores, starts, axis=0)
+    else:
+        merged = np.add.reduceat(scores, starts, axis=0) / np.diff(np.r_[starts, len(groups)])[:, None]
+    return timestamps[starts], merged
+
+
+def downsample_emotion_arrays(timestamps: np.ndarray, scores: np.ndarray, bucket_ms: int = BUCKET_MS,
+                              max_frames: int = MAX_FRAMES, aggregation: str = AGGREGATION) -> tuple:
+    """
+    把情绪帧降采样到固定时间桶，并限制总帧数。
+    先按 bucket_ms 合并同一时间桶内的帧；仍超过 max_frames 时再把相邻的桶按固定个数合并。
+    """
+    if scores.shape[0] == 0:
+        return timestamps, scores
+    order = np.argsort(timestamps, kind='stable')
+    timestamps, scores = timestamps[order], scores[order]
+
+    if bucket_ms and bucket_ms > 0:
+        buckets = ((timestamps - timestamps[0]) // bucket_ms).astype(np.int64)
+        timestamps, scores = _aggregate(buckets, timestamps, scores, aggregation)
+
+    n_frames = scores.shape[0]
+    if max_frames and n_frames > max_frames:
+        per_group = -(-n_frames // max_frames)  # 向上取整
+        timestamps, scores = _aggregate(np.arange(n_frames) // per_group, timestamps, scores, aggregation)
+    return timestamps, scores
+
+
+def ingest_emotion_frames(analysis_data: list, buffered: tuple = None, bucket_ms: int = BUCKET_MS,
+                          max_frames: int = MAX_FRAMES, aggregation: str = AGGREGATION) -> tuple:
+    """
+    【性能优化】入库前的情绪帧处理：转换为数组、降采样、编码，返回 (二进制数据, 统计)。
+    buffered 为回答期间通过 WebSocket 收集并已预先降采样的 (timestamps, scores, 原始帧数)，会与请求体中的帧合并。
+    统计包含收到的帧数、有效帧数、最终保存的帧数和被合并/丢弃的帧数。
+    """
+    timestamps, scores = frames_to_array(analysis_data)
+    received = len(analysis_data or [])
+    valid = scores.shape[0]
+    if buffered is not None:
+        buffered_timestamps, buffered_scores, buffered_received = buffered
+        timestamps = np.concatenate([buffered_timestamps, timestamps])
+        scores = np.concatenate([buffered_scores, scores])
+        received += buffered_received
+        valid += buffered_received
+    timestamps, scores = downsample_emotion_arrays(timestamps, scores, bucket_ms, max_frames, aggregation)
+    stats = {'received': received, 'valid': valid, 'stored': int(scores.shape[0]),
+             'dropped': received - int(scores.shape[0])}
+    return encode_emotion_arrays(timestamps, scores), stats
+
+
+def encode_emotion_frames(analysis_data: list, compress: bool = COMPRESS) -> bytes:
+    """把情绪帧列表编码为紧凑的二进制格式；没有有效帧时返回 None。"""
+    timestamps, scores = frames_to_array(analysis_data)
+    return encode_emotion_arrays(timestamps, scores, compress)
+
+
+def encode_emotion_arrays(timestamps: np.ndarray, scores: np.ndarray, compress: bool = COMPRESS) -> bytes:
+    if not scores.shape[0]:
+        return None
+    timestamps = timestamps.astype(np.int64)
+    deltas = np.diff(timestamps, prepend=timestamps[0])
+    flags = 0
+    # 绝大多数增量只有几百毫秒，用 int32 存储；有间隔超出 int32 范围时整列改用 int64，不会溢出回绕
+    if deltas.size and (deltas.min() < np.iinfo(np.int32).min or deltas.max() > np.iinfo(np.int32).max):
+        deltas, flags = deltas.astype('<i8'), FLAG_WIDE_DELTAS
+    else:
+        deltas = deltas.astype('<i4')
+    quantized = np.rint(np.clip(scores, 0.0, 1.0) * _QUANT_SCALE).astype(np.uint8)
+    body = deltas.tobytes() + quantized.tobytes()
+    if compress:
+        compressed = zlib.compress(body, 6)
+        if len(compressed) < len(body):
+            body, flags = compressed, flags | FLAG_ZLIB
+    return _HEADER.pack(_MAGIC, _VERSION, flags, scores.shape[0], int(timestamps[0])) + body
+
+
+def decode_emotion_arrays(blob: bytes) -> tuple:
+    """把二进制情绪数据直接解码为 (timestamps, scores) 数组，不经过 dict。"""
+    blob = bytes(blob)  # 部分数据库驱动返回 memoryview
+    magic, version, flags, n_frames, base = _HEADER.unpack_from(blob)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("无法识别的情绪数据格式。")
+    body = blob[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    delta_type = np.dtype('<i8' if flags & FLAG_WIDE_DELTAS else '<i4')
+    deltas = np.frombuffer(body, dtype=delta_type, count=n_frames)
+    quantized = np.frombuffer(body, dtype=np.uint8, offset=n_frames * delta_type.itemsize).reshape(
+        n_frames, _N_EMOTIONS)
+    timestamps = (base + np.cumsum(deltas, dtype=np.int64)).astype(np.float64)
+    return timestamps, quantized.astype(np.float64) / _QUANT_SCALE
+
+
+def decode_emotion_frames(blob: bytes) -> list:
+    """把二进制情绪数据还原为前端使用的帧列表 [{'timestamp', 'emotions'}]。"""
+    if not blob:
+        return []
+    timestamps, scores = decode_emotion_arrays(blob)
+    scores = np.round(scores, 3).tolist()
+    return [
+        {'timestamp': int(timestamp), 'emotions': dict(zip(EMOTION_LABELS, row))}
+        for timestamp, row in zip(timestamps.tolist(), scores)
+    ]
+
+
+def _as_arrays(emotion_data) -> tuple:
+    """情绪数据可以是帧列表，也可以是二进制编码，统一转换为数组。"""
+    if isinstance(emotion_data, (bytes, bytearray, memoryview)):
+        return decode_emotion_arrays(emotion_data)
+    return frames_to_array(emotion_data)
+
+
+def _summarize_arrays(timestamps: np.ndarray, scores: np.ndarray, segments: int) -> dict:
+    n_frames = scores.shape[0]
+    summary = {'frames': int(n_frames)}
+    if n_frames == 0:
+        return summary
+
+    dominant = scores.argmax(axis=1)
+    histogram = np.bincount(dominant, minlength=_N_EMOTIONS)
+    order = np.argsort(-histogram, kind='stable')
+    summary['dominant'] = [
+        {'emotion': EMOTION_LABELS[i], 'count': int(histogram[i]), 'ratio': round(float(histogram[i]) / n_frames, 3)}
+        for i in order if histogram[i]
+    ]
+    summary['mean_scores'] = dict(zip(EMOTION_LABELS, np.round(scores.mean(axis=0), 3).tolist()))
+
+    # 相邻两帧主导情绪不同即记为一次切换；(from, to) 编码为 from * 7 + to 后统计次数
+    changed = dominant[1:] != dominant[:-1]
+    pair_counts = np.bincount(dominant[:-1][changed] * _N_EMOTIONS + dominant[1:][changed],
+                              minlength=_N_EMOTIONS * _N_EMOTIONS)
+    top_pairs = np.argsort(-pair_counts, kind='stable')[:3]
+    summary['transitions'] = int(changed.sum())
+    summary['top_transitions'] = [
+        {'from': EMOTION_LABELS[code // _N_EMOTIONS], 'to': EMOTION_LABELS[code % _N_EMOTIONS],
+         'count': int(pair_counts[code])}
+        for code in top_pairs if pair_counts[code]
+    ]
+
+    # 波动度：相邻两帧情绪分布的总变差距离 (0~1) 的平均值
+    if n_frames > 1:
+        totals = scores.sum(axis=1, keepdims=True)
+        probs = np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+        summary['volatility'] = round(float(np.abs(np.diff(probs, axis=0)).sum(axis=1).mean() / 2), 3)
+    else:
+        summary['volatility'] = 0.0
+
+    duration = float(timestamps.max() - timestamps.min()) / 1000 if timestamps.size else 0.0
+    summary['duration_seconds'] = round(duration, 1)
+
+    segment_means = []
+    for chunk in np.array_split(scores, min(segments, n_frames)):
+        means = chunk.mean(axis=0)
+        segment_means.append({
+            'dominant': EMOTION_LABELS[int(means.argmax())],
+            'mean_scores': dict(zip(EMOTION_LABELS, np.round(means, 3).tolist())),
+        })
+    summary['segments'] = segment_means
+    return summary
+
+
+def summarize_emotions(emotion_data, segments: int = 3) -> dict:
+    """统计一道题的情绪时间线 (帧列表或二进制编码)，返回可直接序列化为 JSON 的 dict。"""
+    timestamps, scores = _as_arrays(emotion_data)
+    return _summarize_arrays(timestamps, scores, segments)
+
+
+def summarize_session_emotions(emotion_data_list: list, segments: int = 3) -> list:
+    """
+    批量统计一场面试所有题目的情绪时间线，返回与输入顺序一致的统计列表。
+    帧列表形式的题目先拼成一个数组统一转换，二进制编码的题目直接解码为数组。
+    """
+    timestamps, rows = [], []
+    arrays = []
+    for emotion_data in emotion_data_list:
+        if isinstance(emotion_data, (bytes, bytearray, memoryview)):
+            arrays.append(decode_emotion_arrays(emotion_data))
+        else:
+            arrays.append(_collect_frames(emotion_data, timestamps, rows))
+    if not arrays:
+        return []
+
+    # 帧列表部分一次性转换后按题目边界切分
+    counts = [item for item in arrays if isinstance(item, int)]
+    all_timestamps, all_scores = _to_arrays(timestamps, rows)
+    boundaries = np.cumsum(counts)[:-1]
+    converted = iter(zip(np.split(all_timestamps, boundaries), np.split(all_scores, boundaries)))
+    return [
+        _summarize_arrays(*(next(converted) if isinstance(item, int) else item), segments)
+        for item in arrays
+    ]
+
+
+def describe_emotion_summary(summary: dict) -> str:
+    """把 summarize_emotions 的结果转换为提示词中使用的中文描述。"""
+    if not summary.get('frames'):
+        return "情绪稳定。"
+
+    dominant = ", ".join(
+        f"{EMOTION_NAMES[item['emotion']]}({item['count']}次, {item['ratio']:.0%})"
+        for item in summary['dominant'][:3]
+    )
+    parts = [f"主要情绪表现: {dominant}"]
+    if summary['transitions']:
+        transitions = ", ".join(
+            f"{EMOTION_NAMES[item['from']]}→{EMOTION_NAMES[item['to']]}({item['count']}次)"
+            for item in summary['top_transitions']
+        )
+        parts.append(f"情绪切换 {summary['transitions']} 次 (常见: {transitions})")
+    parts.append(f"波动度 {summary['volatility']:.2f} (0 为完全稳定, 1 为剧烈变化)")
+    if len(summary['segments']) == len(SEGMENT_NAMES):
+        trend = " → ".join(
+            f"{name}{EMOTION_NAMES[segment['dominant']]}"
+            for name, segment in zip(SEGMENT_NAMES, summary['segments'])
+        )
+        parts.append(f"情绪走势: {trend}")
+    return "；".join(parts) + "。"
@@ -0,0 +1,124 @@
+# ai_interview_backend/interviews/history.py
+"""
+生成下一问时使用的滚动面试历史。
+
+提示词中只保留最近 RECENT_TURNS 轮的完整问答，更早的轮次被折叠成一行一题的摘要，
+摘要保存在 InterviewSession.history_summary 中，每一轮只需要把刚滑出窗口的那一题追加进去，
+不再每轮重新查询、拼接全部问答。最近问答与摘要分别受 token 预算限制，提示词长度不随轮数增长。
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+from .models import InterviewSession
+
+# 提示词中保留原文的最近轮数
+RECENT_TURNS = getattr(settings, 'INTERVIEW_HISTORY_RECENT_TURNS', 2)
+# 整段面试历史的 token 预算，其中 SUMMARY_SHARE 的比例留给较早轮次的摘要
+TOKEN_BUDGET = getattr(settings, 'INTERVIEW_HISTORY_TOKEN_BUDGET', 2000)
+SUMMARY_SHARE = getattr(settings, 'INTERVIEW_HISTORY_SUMMARY_SHARE', 0.3)
+# 摘要中每道题的问题与回答最多保留的 token 数
+SUMMARY_QUESTION_TOKENS = 40
+SUMMARY_ANSWER_TOKENS = 80
+
+# DeepSeek 官方给出的换算：1 个中文字符约 0.6 token，1 个英文字符约 0.3 token
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+_CJK_TOKENS = 0.6
+_OTHER_TOKENS = 0.3
+_WHITESPACE_RE = re.compile(r'\s+')
+_OMITTED_PREFIX = '(更早的'
+
+
+def estimate_tokens(text: str) -> int:
+    """在本地估算文本的 token 数，不调用任何远程分词接口。"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return int(cjk * _CJK_TOKENS + (len(text) - cjk) * _OTHER_TOKENS) + 1
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """把文本截断到大约 max_tokens 个 token，截断时以省略号结尾。"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0.0
+    for index, char in enumerate(text):
+        used += _CJK_TOKENS if _CJK_RE.match(char) else _OTHER_TOKENS
+        if used > max_tokens - 1:
+            return text[:index] + '…'
+    return text
+
+
+def _plain(text: str) -> str:
+    """回答来自富文本编辑器，去掉 HTML 标签并合并空白。"""
+    return _WHITESPACE_RE.sub(' ', strip_tags(text or '')).strip()
+
+
+def summarize_turn(sequence: int, question: str, answer: str) -> str:
+    """把一轮问答折叠成摘要中的一行。"""
+    return (f"第{sequence}题 问: {clip_to_tokens(_plain(question), SUMMARY_QUESTION_TOKENS)}"
+            f" | 答: {clip_to_tokens(_plain(answer), SUMMARY_ANSWER_TOKENS)}")
+
+
+def compact_summary(summary: str, max_tokens: int) -> str:
+    """
+    把摘要压缩到 token 预算以内：先从最早的一题开始去掉回答部分，
+    仍然超出时再把最早的若干题合并为一行“已省略”的说明。
+    """
+    if estimate_tokens(summary) <= max_tokens:
+        return summary
+    lines = summary.split('\n')
+    omitted = 0
+    if lines and lines[0].startswith(_OMITTED_PREFIX):
+        omitted = int(re.search(r'\d+', lines[0]).group())
+        lines = lines[1:]
+
+    def render():
+        head = [f"{_OMITTED_PREFIX} {omitted} 道题已省略)"] if omitted else []
+        return '\n'.join(head + lines)
+
+    for index, line in enumerate(lines):
+        if estimate_tokens(render()) <= max_tokens:
+            return render()
+        lines[index] = line.split(' | 答: ')[0]
+    while lines and estimate_tokens(render()) > max_tokens:
+        lines.pop(0)
+        omitted += 1
+    return render()
+
+
+def build_rolling_history(session: InterviewSession) -> tuple:
+    """
+    返回 (较早轮次摘要, 最近几轮的问答列表)，并把刚滑出窗口的问答增量折叠进会话摘要。
+    只查询摘要之后的已回答问题 (通常为 RECENT_TURNS + 1 行)。
+    """
+    turns = list(
+        session.questions.filter(answered_at__isnull=False, sequence__gt=session.history_summary_until)
+        .order_by('sequence').only('sequence', 'question_text', 'answer_text')
+    )
+    to_fold = turns[:-RECENT_TURNS] if len(turns) > RECENT_TURNS else []
+    recent = turns[len(to_fold):]
+
+    summary_budget = int(TOKEN_BUDGET * SUMMARY_SHARE)
+    summary = session.history_summary
+    if to_fold:
+        lines = [summary] if summary else []
+        lines.extend(summarize_turn(q.sequence, q.question_text, q.answer_text) for q in to_fold)
+        summary = compact_summary('\n'.join(lines), summary_budget)
+        folded_until = to_fold[-1].sequence
+        # 条件更新：并发的另一轮已经折叠过时不重复写入
+        InterviewSession.objects.filter(id=session.id, history_summary_until=session.history_summary_until).update(
+            history_summary=summary, history_summary_until=folded_until
+        )
+        session.history_summary, session.history_summary_until = summary, folded_until
+
+    # 摘要没用完的预算留给最近几轮
+    turn_budget = (TOKEN_BUDGET - estimate_tokens(summary)) // max(len(recent), 1)
+    history = []
+    for q in recent:
+        question = _plain(q.question_text)
+        answer = clip_to_tokens(_plain(q.answer_text), max(turn_budget - estimate_tokens(question), 50))
+        history.append({'question': question, 'answer': answer})
+    return summary, history
@@ -0,0 +1,216 @@
+# ai_interview_backend/interviews/json_stream.py
+"""
+流式 JSON 解析。
+
+报告、简历等大段 JSON 输出改为流式调用后，IncrementalJSONParser 随着 token 到达增量扫描文本，
+顶层对象的某个字段 (如 overall_score) 或指定数组中的某个元素 (如 star_analysis 的一项) 一旦完整，
+就立即解析出来，调用方可以逐段展示、逐段保存，不必等整段输出结束。
+输出被截断或格式有误时，repair_json 尝试补全括号与引号，尽量保留已生成的内容。
+"""
+
+import json
+
+# repair_json 回退到更早的截断点的最大次数
+MAX_REPAIR_ATTEMPTS = 64
+
+_WHITESPACE = ' \t\r\n'
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _loads(text: str):
+    # strict=False: 允许字符串中出现未转义的换行等控制字符，部分模型会这样输出
+    return json.loads(text, strict=False)
+
+
+class IncrementalJSONParser:
+    """
+    增量扫描一个顶层 JSON 对象，每个字符只扫描一次。
+    item_keys 中的字段若是数组，其中的元素会在各自完整时单独解析。
+    顶层对象之前的内容 (如 ```json 代码块标记) 会被忽略。
+    """
+
+    def __init__(self, item_keys=()):
+        self.item_keys = set(item_keys)
+        self.buffer = ''
+        self.fields = {}   # 已完整的顶层字段
+        self.items = {}    # item_keys 中正在输出的数组里已完整的元素
+        self.done = False  # 顶层对象已闭合
+        self._pos = 0
+        self._start = None
+        self._end = None
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._awaiting_value = False
+        self._value_start = None
+        self._tracking_items = False
+        self._awaiting_item = False
+        self._item_start = None
+
+    def feed(self, chunk: str) -> list:
+        """追加一段文本，返回新完整的片段 [(字段名, 值或 None, 新元素或 None), ...]。"""
+        if not chunk or self.done:
+            return []
+        self.buffer += chunk
+        return self._scan()
+
+    def _scan(self) -> list:
+        events = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = _loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+            if c in _WHITESPACE:
+                continue
+
+            depth = len(self._stack)
+            if depth == 0:
+                if c == '{':
+                    self._start = i
+                    self._stack.append(c)
+                continue
+            if depth == 1 and self._awaiting_value:
+                self._value_start, self._awaiting_value = i, False
+            elif depth == 2 and self._awaiting_item:
+                self._item_start, self._awaiting_item = i, False
+
+            if c == '"':
+                self._in_string = True
+                if depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif c in _CLOSERS:
+                self._stack.append(c)
+                if depth == 1 and c == '[' and self._key in self.item_keys:
+                    self._tracking_items, self._awaiting_item = True, True
+                    self.items[self._key] = []
+            elif c in '}]':
+                if depth == 2 and self._tracking_items:
+                    self._end_item(buf, i, events)
+                    self._tracking_items = False
+                elif depth == 1:
+                    self._end_field(buf, i, events)
+                    self.done, self._end = True, i + 1
+                    self._stack.pop()
+                    break
+                self._stack.pop()
+            elif c == ',':
+                if depth == 1:
+                    self._end_field(buf, i, events)
+                elif depth == 2 and self._tracking_items:
+                    self._end_item(buf, i, events)
+                    self._awaiting_item = True
+            elif c == ':' and depth == 1:
+                self._awaiting_value = True
+        self._pos = len(buf) if not self.done else self._end
+        return events
+
+    def _end_field(self, buf: str, end: int, events: list):
+        start, self._value_start = self._value_start, None
+        if start is None or self._key is None:
+            return
+        try:
+            value = _loads(buf[start:end])
+        except json.JSONDecodeError:
+            return
+        self.fields[self._key] = value
+        self.items.pop(self._key, None)
+        events.append((self._key, value, None))
+
+    def _end_item(self, buf: str, end: int, events: list):
+        start, self._item_start = self._item_start, None
+        if start is None:
+            return
+        try:
+            item = _loads(buf[start:end])
+        except json.JSONDecodeError:
+            return
+        self.items[self._key].append(item)
+        events.append((self._key, None, item))
+
+    def partial(self) -> dict:
+        """目前为止已完整的内容：顶层字段，以及正在输出的数组中已完整的元素。"""
+        result = dict(self.fields)
+        for key, items in self.items.items():
+            if items:
+                result[key] = list(items)
+        return result
+
+    def finish(self) -> tuple:
+        """输出结束后调用，返回 (结果, 是否为完整合法的 JSON)；无法解析出任何内容时抛出 ValueError。"""
+        if self.done:
+            try:
+                return _loads(self.buffer[self._start:self._end]), True
+            except json.JSONDecodeError:
+                pass
+        repaired = repair_json(self.buffer)
+        if repaired is None:
+            raise ValueError(f"无法从模型输出中解析出 JSON: {self.buffer[:200]!r}")
+        return repaired, False
+
+
+def _scan_state(text: str) -> tuple:
+    """返回 (未闭合的容器栈, 是否停在字符串内, 可截断的位置列表)。"""
+    stack = []
+    in_string = escape = False
+    cuts = []
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == '\\':
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in _CLOSERS:
+            stack.append(c)
+            cuts.append(i + 1)  # 保留开括号，丢弃之后的内容
+        elif c in '}]':
+            if stack:
+                stack.pop()
+        elif c == ',':
+            cuts.append(i)      # 丢弃逗号及之后的内容
+    return stack, in_string, cuts
+
+
+def repair_json(text: str):
+    """
+    修复被截断的 JSON 对象：补全未闭合的字符串与括号，
+    仍无法解析时逐步回退到更早的元素边界，返回能解析出的最多内容；完全无法修复时返回 None。
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    text = text[start:]
+    _, _, cuts = _scan_state(text)
+    candidate = text
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        candidate = candidate.rstrip(_WHITESPACE).rstrip(',')
+        if candidate.endswith(':'):
+            candidate += ' null'
+        stack, in_string, _ = _scan_state(candidate)
+        suffix = ('"' if in_string else '') + ''.join(_CLOSERS[c] for c in reversed(stack))
+        try:
+            result = _loads(candidate + suffix)
+            return result if isinstance(result, dict) else None
+        except json.JSONDecodeError:
+            pass
+        while cuts and cuts[-1] >= len(candidate):
+            cuts.pop()
+        if not cuts:
+            return None
+        candidate = candidate[:cuts.pop()]
+    return None
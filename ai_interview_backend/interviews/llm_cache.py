@@ -0,0 +1,227 @@
+# ai_interview_backend/interviews/llm_cache.py
+"""
+按内容寻址的 LLM 响应缓存。
+
+缓存键是 (模型 slug, 服务地址, messages, max_tokens, temperature, 返回类型) 的哈希，
+与用户、请求无关：不同用户发出完全相同的提示词时直接复用结果，不再调用 AI。
+是否缓存、缓存多久由每个调用方 (按函数名) 单独配置，未配置的函数不会被缓存。
+主模型不可用、由备用模型返回的结果不写入缓存 (它不是该缓存键对应的模型的输出)。
+"""
+
+import json
+import time
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .llm_metrics import record_cache_lookup
+
+ENABLED = getattr(settings, 'LLM_RESPONSE_CACHE_ENABLED', True)
+# 函数名 -> 缓存时间 (秒)。只有列在这里的函数会使用缓存
+DEFAULT_POLICIES = {
+    'generate_first_question': 6 * 3600,
+    'analyze_answer': 3600,
+    'generate_reference_answer_for_question': 24 * 3600,
+    'polish_description_by_ai': 24 * 3600,
+}
+POLICIES = getattr(settings, 'LLM_RESPONSE_CACHE_POLICIES', DEFAULT_POLICIES)
+LOCAL_MAX_ENTRIES = getattr(settings, 'LLM_RESPONSE_CACHE_LOCAL_MAX_ENTRIES', 512)
+# 超过这个大小 (字节) 的响应不写入共享缓存，避免个别超长结果占满 Redis
+MAX_VALUE_BYTES = getattr(settings, 'LLM_RESPONSE_CACHE_MAX_VALUE_BYTES', 64 * 1024)
+BACKEND = getattr(settings, 'LLM_RESPONSE_CACHE_BACKEND', 'interviews.llm_cache.TieredCacheBackend')
+
+_KEY_PREFIX = 'llm_resp:'
+
+
+class LocalLRUBackend:
+    """进程内的 LRU 缓存，按条目数限制大小，每个条目有自己的过期时间。"""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: OrderedDict = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: int):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """基于 Django 缓存 (生产环境为 Redis) 的共享缓存，由 TTL 和 Redis 的淘汰策略限制大小。"""
+
+    def get(self, key: str):
+        return cache.get(_KEY_PREFIX + key)
+
+    def set(self, key: str, value, timeout: int):
+        cache.set(_KEY_PREFIX + key, value, timeout=timeout)
+
+
+class TieredCacheBackend:
+    """默认后端：先查进程内 LRU，再查 Redis；Redis 命中后回填到本地。"""
+
+    def __init__(self):
+        self.local = LocalLRUBackend()
+        self.shared = DjangoCacheBackend()
+
+    def get(self, key: str):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        entry = self.shared.get(key)
+        if entry is not None:
+            value, timeout = entry['value'], entry['timeout']
+            self.local.set(key, value, timeout)
+            return value
+        return None
+
+    def set(self, key: str, value, timeout: int):
+        self.local.set(key, value, timeout)
+        self.shared.set(key, {'value': value, 'timeout': timeout}, timeout)
+
+    def size(self) -> int:
+        return self.local.size()
+
+
+class LLMResponseCache:
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats: dict = {}
+
+    def _incr(self, policy: str, name: str):
+        with self._lock:
+            stats = self._stats.setdefault(policy, {'hits': 0, 'misses': 0, 'stores': 0, 'skipped': 0})
+            stats[name] += 1
+
+    @staticmethod
+    def make_key(model, messages: list, max_tokens: int, temperature: float, kind: str) -> str:
+        payload = json.dumps(
+            {'model': model.model_slug, 'base_url': model.base_url, 'messages': messages, 'max_tokens': max_tokens,
+             'temperature': temperature, 'kind': kind},
+            ensure_ascii=False, sort_keys=True, separators=(',', ':'),
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def timeout_for(policy: str):
+        if not ENABLED or not policy:
+            return None
+        return POLICIES.get(policy)
+
+    def get(self, policy: str, key: str):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # 缓存不可用时直接退化为调用 AI，不影响业务
+            print(f"读取 LLM 响应缓存失败: {e}")
+            value = None
+        self._incr(policy, 'hits' if value is not None else 'misses')
+        # 调用方可能会修改返回的 dict (例如分数归一化)，返回副本
+        return copy.deepcopy(value)
+
+    def set(self, policy: str, key: str, value, timeout: int):
+        if len(json.dumps(value, ensure_ascii=False).encode('utf-8')) > MAX_VALUE_BYTES:
+            self._incr(policy, 'skipped')
+            return
+        try:
+            self.backend.set(key, copy.deepcopy(value), timeout)
+            self._incr(policy, 'stores')
+        except Exception as e:
+            print(f"写入 LLM 响应缓存失败: {e}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            per_policy = {name: dict(stats) for name, stats in self._stats.items()}
+        hits = misses = 0
+        for stats in per_policy.values():
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+            hits += stats['hits']
+            misses += stats['misses']
+        data = {
+            'enabled': ENABLED,
+            'policies': per_policy,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+        if hasattr(self.backend, 'size'):
+            data['local_size'] = self.backend.size()
+        return data
+
+
+_response_cache = LLMResponseCache(import_string(BACKEND)())
+
+
+def _served_by(model, served) -> bool:
+    return served.model_slug == model.model_slug and served.base_url == model.base_url
+
+
+def cached_llm_call(policy: str, model, messages: list, max_tokens: int, temperature: float,
+                    kind: str, call):
+    """
+    带缓存地执行一次 LLM 调用。policy 为调用方的函数名，未配置缓存策略时直接调用 call()。
+    call() 返回 (结果, 实际返回结果的模型)。只缓存主模型成功返回的结果：
+    故障转移到备用模型时不写入缓存，call() 抛出的异常会原样向上传递。
+    """
+    timeout = _response_cache.timeout_for(policy)
+    if not timeout:
+        return call()[0]
+    key = _response_cache.make_key(model, messages, max_tokens, temperature, kind)
+    value = _response_cache.get(policy, key)
+    record_cache_lookup(model.model_slug, policy, value is not None)
+    if value is not None:
+        return value
+    value, served = call()
+    if _served_by(model, served):
+        _response_cache.set(policy, key, value, timeout)
+    return value
+
+
+async def acached_llm_call(policy: str, model, messages: list, max_tokens: int, temperature: float,
+                           kind: str, call):
+    """cached_llm_call 的异步版本，call 为返回协程的函数。"""
+    timeout = _response_cache.timeout_for(policy)
+    if not timeout:
+        return (await call())[0]
+    key = _response_cache.make_key(model, messages, max_tokens, temperature, kind)
+    value = await sync_to_async(_response_cache.get, thread_sensitive=False)(policy, key)
+    record_cache_lookup(model.model_slug, policy, value is not None)
+    if value is not None:
+        return value
+    value, served = await call()
+    if _served_by(model, served):
+        await sync_to_async(_response_cache.set, thread_sensitive=False)(policy, key, value, timeout)
+    return value
+
+
+def get_llm_cache_stats() -> dict:
+    """返回当前 worker 进程的 LLM 响应缓存命中统计。"""
+    return _response_cache.snapshot()
@@ -0,0 +1,157 @@
+# ai_interview_backend/interviews/llm_clients.py
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+import httpx
+from django.conf import settings
+from openai import OpenAI, AsyncOpenAI
+
+# 连接池配置，可在 settings.py 中覆盖
+POOL_SIZE = getattr(settings, 'LLM_CLIENT_POOL_SIZE', 16)
+MAX_CONNECTIONS = getattr(settings, 'LLM_CLIENT_MAX_CONNECTIONS', 20)
+MAX_KEEPALIVE_CONNECTIONS = getattr(settings, 'LLM_CLIENT_MAX_KEEPALIVE_CONNECTIONS', 10)
+KEEPALIVE_EXPIRY = getattr(settings, 'LLM_CLIENT_KEEPALIVE_EXPIRY', 60.0)
+# 客户端的兜底超时；每次请求的实际超时由 llm_gateway 按调用方的截止时间单独设置
+DEFAULT_TIMEOUT = httpx.Timeout(getattr(settings, 'LLM_DEFAULT_DEADLINE', 60),
+                                connect=getattr(settings, 'LLM_CONNECT_TIMEOUT', 5))
+
+
+class _ClientRegistry:
+    """
+    进程级的 OpenAI / AsyncOpenAI 客户端注册表。
+    以 (base_url, api_key) 为键复用客户端，从而复用底层 httpx 连接池，
+    避免每次调用都重新进行 DNS 解析和 TLS 握手。超过容量时按 LRU 淘汰。
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._clients: OrderedDict = OrderedDict()
+        self._pid = os.getpid()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.stats = {
+            'pool_hits': 0,
+            'pool_misses': 0,
+            'evictions': 0,
+            'new_connections': 0,
+            'handshake_count': 0,
+            'handshake_seconds_total': 0.0,
+        }
+
+    def _check_fork(self):
+        # gunicorn 等预加载场景下，fork 出的 worker 不能继承父进程的连接
+        if self._pid != os.getpid():
+            self._clients.clear()
+            self._pid = os.getpid()
+            self._reset_stats()
+
+    def _record_trace(self, started: dict, event_name: str):
+        """处理 httpcore 的 trace 事件，统计新建连接数和 TCP+TLS 握手耗时。"""
+        if event_name == 'connection.connect_tcp.started':
+            started['at'] = time.perf_counter()
+        elif event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.stats['new_connections'] += 1
+        elif event_name in ('connection.start_tls.complete', 'connection.start_tls.failed'):
+            if 'at' in started:
+                elapsed = time.perf_counter() - started.pop('at')
+                with self._lock:
+                    self.stats['handshake_count'] += 1
+                    self.stats['handshake_seconds_total'] += elapsed
+
+    def _on_request(self, request: httpx.Request):
+        started = {}
+
+        def trace(event_name, info):
+            self._record_trace(started, event_name)
+
+        request.extensions['trace'] = trace
+
+    async def _on_async_request(self, request: httpx.Request):
+        # 异步传输层要求 trace 回调也是协程函数
+        started = {}
+
+        async def trace(event_name, info):
+            self._record_trace(started, event_name)
+
+        request.extensions['trace'] = trace
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+
+    def _build_client(self, api_key: str, base_url: str) -> OpenAI:
+        http_client = httpx.Client(limits=self._limits(), event_hooks={'request': [self._on_request]})
+        # 重试由 llm_gateway 负责 (带抖动的指数退避、熔断与故障转移)，关闭 SDK 内置的重试
+        return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0,
+                      timeout=DEFAULT_TIMEOUT)
+
+    def _build_async_client(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        http_client = httpx.AsyncClient(limits=self._limits(), event_hooks={'request': [self._on_async_request]})
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0,
+                           timeout=DEFAULT_TIMEOUT)
+
+    def _get_or_create(self, key: tuple, factory):
+        with self._lock:
+            self._check_fork()
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.stats['pool_hits'] += 1
+                return client
+
+            self.stats['pool_misses'] += 1
+            client = factory()
+            self._clients[key] = client
+            if len(self._clients) > self.max_size:
+                # 被淘汰的客户端可能仍被其他线程使用，不主动关闭，交由 GC 回收连接
+                self._clients.popitem(last=False)
+                self.stats['evictions'] += 1
+            return client
+
+    def get(self, api_key: str, base_url: str) -> OpenAI:
+        return self._get_or_create(('sync', base_url, api_key), lambda: self._build_client(api_key, base_url))
+
+    def get_async(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        # httpx.AsyncClient 的连接绑定在创建它的事件循环上，因此按事件循环区分；
+        # 键中直接持有 loop 对象 (而非 id)，避免已关闭的循环 id 被新循环复用
+        loop = asyncio.get_running_loop()
+        return self._get_or_create(('async', loop, base_url, api_key),
+                                   lambda: self._build_async_client(api_key, base_url))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = dict(self.stats)
+            data['pool_size'] = len(self._clients)
+            data['pool_capacity'] = self.max_size
+            data['pid'] = self._pid
+        count = data['handshake_count']
+        data['handshake_avg_ms'] = round(data['handshake_seconds_total'] / count * 1000, 2) if count else 0.0
+        return data
+
+
+_registry = _ClientRegistry(POOL_SIZE)
+
+
+def get_openai_client(api_key: str, base_url: str) -> OpenAI:
+    """获取一个可复用的 OpenAI 客户端 (带 keep-alive 连接池)。"""
+    return _registry.get(api_key, base_url)
+
+
+def get_async_openai_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """获取当前事件循环下可复用的 AsyncOpenAI 客户端，必须在协程中调用。"""
+    return _registry.get_async(api_key, base_url)
+
+
+def get_client_pool_stats() -> dict:
+    """返回当前 worker 进程的客户端池统计信息。"""
+    return _registry.snapshot()
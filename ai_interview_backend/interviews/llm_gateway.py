@@ -0,0 +1,584 @@
+# ai_interview_backend/interviews/llm_gateway.py
+"""
+LLM 调用网关：ai_services.py / ai_services_async.py 中的所有模型请求都经由这里发出。
+
+- 截止时间：每个调用方函数有自己的总时限 (DEADLINES)，按剩余时间设置每次请求的超时，
+  流式输出还限制两个数据块之间的最长间隔，模型服务挂起时不会无限占用 worker；
+- 重试：429 / 5xx / 连接错误按带抖动的指数退避重试，不超过截止时间；流式调用只在收到首个 token 前重试；
+- 对冲请求：对 HEDGE_ENDPOINTS 中的短调用，原请求超过近期 p95 耗时仍未返回时再发一个相同请求，取先返回者；
+- 熔断：每个模型一个熔断器，连续失败达到阈值后在冷却期内直接跳过该模型，
+  并故障转移到 AIModel.failover_model 指定的备用模型。
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+
+import httpx
+from django.conf import settings
+from openai import APIConnectionError, APIStatusError
+
+from system.models import AIModel
+from .llm_clients import get_openai_client, get_async_openai_client
+from .llm_metrics import (
+    LLMCallMetrics, LLM_HEDGED_REQUESTS, LLM_FAILOVERS, LLM_CIRCUIT_OPEN, record_retry, stream_params,
+)
+
+# 各调用方函数的总时限 (秒)，可在 settings.LLM_DEADLINES 中按函数名覆盖
+DEFAULT_DEADLINES = {
+    'generate_first_question': 20,
+    'analyze_answer': 20,
+    'generate_next_question_stream': 45,
+    'generate_reference_answer_for_question': 60,
+    'polish_description_by_ai': 60,
+    'analyze_resume_against_jd': 120,
+    'generate_final_report': 180,
+    'generate_resume_by_ai': 180,
+}
+DEADLINES = {**DEFAULT_DEADLINES, **getattr(settings, 'LLM_DEADLINES', {})}
+DEFAULT_DEADLINE = getattr(settings, 'LLM_DEFAULT_DEADLINE', 60)
+CONNECT_TIMEOUT = getattr(settings, 'LLM_CONNECT_TIMEOUT', 5)
+# 流式输出中两个数据块之间的最长等待时间
+STREAM_IDLE_TIMEOUT = getattr(settings, 'LLM_STREAM_IDLE_TIMEOUT', 30)
+
+MAX_RETRIES = getattr(settings, 'LLM_MAX_RETRIES', 2)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# 启用对冲请求的调用方函数 (只用于非流式的短调用)，以及计算 p95 所需的最少样本数
+HEDGE_ENDPOINTS = set(getattr(settings, 'LLM_HEDGE_ENDPOINTS', ['generate_first_question', 'analyze_answer']))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+# 同步对冲请求使用的线程数；线程都被占用时请求在调用方线程直接执行，不做对冲
+HEDGE_WORKERS = getattr(settings, 'LLM_HEDGE_WORKERS', 8)
+
+BREAKER_FAILURE_THRESHOLD = getattr(settings, 'LLM_BREAKER_FAILURE_THRESHOLD', 5)
+BREAKER_COOLDOWN = getattr(settings, 'LLM_BREAKER_COOLDOWN', 30)
+# 半开状态下探测请求的最长占用时间：超过所有调用方的截止时间仍没有结果时 (结果丢失)，放行下一个探测请求
+BREAKER_PROBE_TIMEOUT = max(DEFAULT_DEADLINE, *DEADLINES.values())
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """调用超过了调用方函数的总时限。"""
+
+
+class CircuitOpenError(Exception):
+    """模型的熔断器处于打开状态，请求未发出。"""
+
+
+class LLMUnavailableError(Exception):
+    """主模型与备用模型都不可用。"""
+
+
+def _is_upstream_failure(exc: Exception) -> bool:
+    """模型服务本身的故障 (可重试、计入熔断)：429、5xx、连接错误与超时。"""
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, (APIConnectionError, httpx.TransportError, LLMDeadlineExceeded))
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    # Full Jitter：在 [0, min(上限, 基数 * 2^attempt)] 中均匀取值，避免大量请求同时重试
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    if isinstance(exc, APIStatusError):
+        try:
+            delay = max(delay, min(float(exc.response.headers.get('retry-after')), RETRY_MAX_DELAY))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+
+class CircuitBreaker:
+    """单个模型的熔断器 (进程内)：closed -> open -> half_open (放行一个探测请求) -> closed / open。"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, model_slug: str):
+        self.model_slug = model_slug
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+                self.state, self.probing = self.HALF_OPEN, False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and (
+                    not self.probing or time.monotonic() - self.probe_started >= BREAKER_PROBE_TIMEOUT):
+                self.probing, self.probe_started = True, time.monotonic()
+                return True
+            return False
+
+    def release(self):
+        """请求没有结论就结束了 (调用方取消、流在首个 token 前被关闭)：不计成功或失败，放行下一个探测请求。"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"模型 {self.model_slug} 已恢复，熔断器关闭。")
+            self.state, self.failures, self.probing = self.CLOSED, 0, False
+        LLM_CIRCUIT_OPEN.labels(model=self.model_slug).set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= BREAKER_FAILURE_THRESHOLD:
+                if self.state != self.OPEN:
+                    print(f"模型 {self.model_slug} 连续失败 {self.failures} 次，熔断 {BREAKER_COOLDOWN} 秒。")
+                self.state, self.opened_at, self.probing = self.OPEN, time.monotonic(), False
+                opened = True
+            else:
+                opened = False
+        if opened:
+            LLM_CIRCUIT_OPEN.labels(model=self.model_slug).set(1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+class _Gateway:
+    """进程级状态：各模型的熔断器、各 (模型, 函数) 近期的耗时窗口，以及对冲请求使用的线程池。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: dict = {}
+        self._latencies: dict = {}
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+
+    def breaker(self, model_slug: str) -> CircuitBreaker:
+        with self._lock:
+            if model_slug not in self._breakers:
+                self._breakers[model_slug] = CircuitBreaker(model_slug)
+            return self._breakers[model_slug]
+
+    def record_latency(self, model_slug: str, endpoint: str, seconds: float):
+        with self._lock:
+            window = self._latencies.setdefault((model_slug, endpoint), deque(maxlen=HEDGE_WINDOW))
+            window.append(seconds)
+
+    def hedge_delay(self, model_slug: str, endpoint: str):
+        """近期成功请求耗时的 p95；未启用对冲或样本不足时返回 None。"""
+        if endpoint not in HEDGE_ENDPOINTS:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get((model_slug, endpoint), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def try_submit(self, fn):
+        """有空闲线程时在线程池中执行 fn 并返回 Future (立即开始，不排队)；没有空闲线程时返回 None。"""
+        with self._lock:
+            # fork 出的 worker 不能复用父进程的线程池
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='llm-hedge')
+                self._slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+                self._executor_pid = os.getpid()
+            executor, slots = self._executor, self._slots
+        if not slots.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                return fn()
+            finally:
+                slots.release()
+        try:
+            return executor.submit(run)
+        except BaseException:
+            slots.release()
+            raise
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+            hedge_delays = {f"{slug}:{endpoint}": None for slug, endpoint in self._latencies}
+        for key in hedge_delays:
+            slug, endpoint = key.split(':', 1)
+            delay = self.hedge_delay(slug, endpoint)
+            hedge_delays[key] = round(delay, 3) if delay is not None else None
+        return {
+            'breakers': {slug: breaker.snapshot() for slug, breaker in breakers.items()},
+            'hedge_delays': hedge_delays,
+        }
+
+
+_gateway = _Gateway()
+
+
+def _candidates(api_key: str, model: AIModel) -> list:
+    """主模型，以及 ai_config 解析出的备用模型 (如果配置了)。"""
+    candidates = [(api_key, model)]
+    failover = getattr(model, 'failover', None)
+    if failover is not None:
+        candidates.append(failover)
+    return candidates
+
+
+def _check_deadline(deadline: float):
+    if time.monotonic() >= deadline:
+        raise LLMDeadlineExceeded("LLM 调用已超过截止时间。")
+
+
+def _request_timeout(deadline: float, stream: bool) -> httpx.Timeout:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise LLMDeadlineExceeded("LLM 调用已超过截止时间。")
+    read = min(remaining, STREAM_IDLE_TIMEOUT) if stream else remaining
+    return httpx.Timeout(read, connect=min(CONNECT_TIMEOUT, remaining))
+
+
+def _deadline_for(endpoint: str) -> float:
+    return time.monotonic() + DEADLINES.get(endpoint, DEFAULT_DEADLINE)
+
+
+def _failover_log(endpoint: str, primary: AIModel, model: AIModel, error: Exception):
+    print(f"模型 {primary.model_slug} 不可用 ({error})，{endpoint} 故障转移到 {model.model_slug}。")
+    LLM_FAILOVERS.labels(endpoint=endpoint, from_model=primary.model_slug, to_model=model.model_slug).inc()
+
+
+# --- 非流式调用 ---
+def _request_once(endpoint: str, api_key: str, model: AIModel, kind: str, params: dict, parse, deadline: float):
+    started = time.monotonic()
+    with LLMCallMetrics(model.model_slug, endpoint, kind) as metrics:
+        client = get_openai_client(api_key, model.base_url)
+        response = client.chat.completions.create(**params, timeout=_request_timeout(deadline, stream=False))
+        metrics.record_usage(response.usage)
+        _gateway.record_latency(model.model_slug, endpoint, time.monotonic() - started)
+        try:
+            return parse(model, response)
+        except json.JSONDecodeError:
+            metrics.json_parse_failure()
+            raise
+
+
+def _request_hedged(endpoint: str, model: AIModel, request):
+    delay = _gateway.hedge_delay(model.model_slug, endpoint)
+    if delay is None:
+        return request()
+    # 同步请求阻塞调用方线程，要在对冲请求先返回时提前返回，原请求只能放到线程池中执行。
+    # 只在有空闲线程时才这样做，请求总是立即开始 (排队时间不会计入对冲延迟)；
+    # 线程池已满时在当前线程直接执行、不做对冲，并发数不受线程池大小限制
+    primary = _gateway.try_submit(request)
+    if primary is None:
+        return request()
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+    hedge = _gateway.try_submit(request)
+    if hedge is None:
+        # 没有空闲线程说明进程正忙，此时再加倍上游负载只会更慢
+        return primary.result()
+    # 同步请求无法取消，落后的一方在线程池中自然结束
+    LLM_HEDGED_REQUESTS.labels(model=model.model_slug, endpoint=endpoint, result='launched').inc()
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    LLM_HEDGED_REQUESTS.labels(model=model.model_slug, endpoint=endpoint, result='won').inc()
+                return future.result()
+    return primary.result()
+
+
+def _call_model(endpoint: str, api_key: str, model: AIModel, kind: str, make_params, parse, deadline: float):
+    breaker = _gateway.breaker(model.model_slug)
+    params = make_params(model)
+    for attempt in range(MAX_RETRIES + 1):
+        _check_deadline(deadline)
+        if not breaker.allow():
+            raise CircuitOpenError(f"模型 {model.model_slug} 处于熔断状态。")
+        try:
+            result = _request_hedged(
+                endpoint, model, lambda: _request_once(endpoint, api_key, model, kind, params, parse, deadline)
+            )
+        except Exception as e:
+            if not _is_upstream_failure(e):
+                breaker.record_success()  # 模型服务有响应，只是请求本身有问题
+                raise
+            breaker.record_failure()
+            delay = _retry_delay(e, attempt)
+            if attempt == MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            print(f"调用模型 {model.model_slug} 失败 ({e})，{delay:.2f} 秒后第 {attempt + 1} 次重试。")
+            record_retry(model.model_slug, endpoint)
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # 调用方取消或进程退出 (KeyboardInterrupt 等)：请求没有结论
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+def call_llm(endpoint: str, api_key: str, model: AIModel, kind: str, make_params, parse):
+    """
+    发起一次非流式调用。make_params(model) 返回 chat.completions.create 的参数 (随模型变化，如 JSON Mode)，
+    parse(model, response) 把响应转换为结果。主模型失败或熔断时转移到备用模型，全部失败时抛出最后一个错误。
+    """
+    deadline = _deadline_for(endpoint)
+    error = None
+    for key, candidate in _candidates(api_key, model):
+        if error is not None:
+            _failover_log(endpoint, model, candidate, error)
+        try:
+            return _call_model(endpoint, key, candidate, kind, make_params, parse, deadline)
+        except (CircuitOpenError, LLMDeadlineExceeded) as e:
+            error = e
+        except Exception as e:
+            if not _is_upstream_failure(e):
+                raise
+            error = e
+    raise LLMUnavailableError(f"{endpoint}: 没有可用的模型 ({error})") from error
+
+
+async def _arequest_once(endpoint: str, api_key: str, model: AIModel, kind: str, params: dict, parse,
+                         deadline: float):
+    started = time.monotonic()
+    with LLMCallMetrics(model.model_slug, endpoint, kind) as metrics:
+        client = get_async_openai_client(api_key, model.base_url)
+        response = await client.chat.completions.create(**params, timeout=_request_timeout(deadline, stream=False))
+        metrics.record_usage(response.usage)
+        _gateway.record_latency(model.model_slug, endpoint, time.monotonic() - started)
+        try:
+            return parse(model, response)
+        except json.JSONDecodeError:
+            metrics.json_parse_failure()
+            raise
+
+
+async def _arequest_hedged(endpoint: str, model: AIModel, request):
+    delay = _gateway.hedge_delay(model.model_slug, endpoint)
+    if delay is None:
+        return await request()
+    primary = asyncio.ensure_future(request())
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+    LLM_HEDGED_REQUESTS.labels(model=model.model_slug, endpoint=endpoint, result='launched').inc()
+    hedge = asyncio.ensure_future(request())
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        LLM_HEDGED_REQUESTS.labels(model=model.model_slug, endpoint=endpoint, result='won').inc()
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _acall_model(endpoint: str, api_key: str, model: AIModel, kind: str, make_params, parse,
+                       deadline: float):
+    breaker = _gateway.breaker(model.model_slug)
+    params = make_params(model)
+    for attempt in range(MAX_RETRIES + 1):
+        _check_deadline(deadline)
+        if not breaker.allow():
+            raise CircuitOpenError(f"模型 {model.model_slug} 处于熔断状态。")
+        try:
+            result = await _arequest_hedged(
+                endpoint, model, lambda: _arequest_once(endpoint, api_key, model, kind, params, parse, deadline)
+            )
+        except Exception as e:
+            if not _is_upstream_failure(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            delay = _retry_delay(e, attempt)
+            if attempt == MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            print(f"调用模型 {model.model_slug} 失败 ({e})，{delay:.2f} 秒后第 {attempt + 1} 次重试。")
+            record_retry(model.model_slug, endpoint)
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # 调用方取消 (asyncio.CancelledError，如 ASGI 客户端断开)：请求没有结论
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def acall_llm(endpoint: str, api_key: str, model: AIModel, kind: str, make_params, parse):
+    """call_llm 的异步版本。"""
+    deadline = _deadline_for(endpoint)
+    error = None
+    for key, candidate in _candidates(api_key, model):
+        if error is not None:
+            _failover_log(endpoint, model, candidate, error)
+        try:
+            return await _acall_model(endpoint, key, candidate, kind, make_params, parse, deadline)
+        except (CircuitOpenError, LLMDeadlineExceeded) as e:
+            error = e
+        except Exception as e:
+            if not _is_upstream_failure(e):
+                raise
+            error = e
+    raise LLMUnavailableError(f"{endpoint}: 没有可用的模型 ({error})") from error
+
+
+# --- 流式调用 ---
+class LLMStream:
+    """
+    流式调用，迭代得到文本片段 (同步用 for，异步用 async for)。
+    重试与故障转移只发生在收到首个 token 之前；之后的错误 (包括超过截止时间) 直接抛给调用方。
+    迭代开始后 self.model 为实际使用的模型，self.metrics 为本次请求的指标记录器。
+    """
+
+    def __init__(self, endpoint: str, api_key: str, model: AIModel, kind: str, make_params):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.model = model
+        self.kind = kind
+        self.make_params = make_params
+        self.metrics = None
+
+    def json_parse_failure(self):
+        if self.metrics is not None:
+            self.metrics.json_parse_failure()
+
+    def _attempts(self, deadline: float):
+        """依次产生 (api_key, 模型, 熔断器, 第几次尝试)，在两次尝试之间由调用方决定是否继续。"""
+        for key, candidate in _candidates(self.api_key, self.model):
+            breaker = _gateway.breaker(candidate.model_slug)
+            for attempt in range(MAX_RETRIES + 1):
+                _check_deadline(deadline)
+                if not breaker.allow():
+                    break
+                yield key, candidate, breaker, attempt
+
+    def _handle_failure(self, error: Exception, candidate: AIModel, breaker: CircuitBreaker, attempt: int,
+                        deadline: float):
+        """首个 token 之前失败：返回重试前需要等待的秒数；不应重试时重新抛出。"""
+        if not _is_upstream_failure(error):
+            breaker.record_success()
+            raise error
+        breaker.record_failure()
+        delay = _retry_delay(error, attempt) if attempt < MAX_RETRIES else 0.0
+        if time.monotonic() + delay >= deadline:
+            raise error
+        print(f"流式调用模型 {candidate.model_slug} 失败 ({error})，{delay:.2f} 秒后重试。")
+        record_retry(candidate.model_slug, self.endpoint)
+        return delay
+
+    @staticmethod
+    def _content(chunk, metrics: LLMCallMetrics, deadline: float) -> str:
+        if time.monotonic() > deadline:
+            raise LLMDeadlineExceeded("流式输出超过截止时间。")
+        metrics.record_usage(chunk.usage)
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return ''
+        metrics.first_token()
+        return chunk.choices[0].delta.content
+
+    def __iter__(self):
+        deadline = _deadline_for(self.endpoint)
+        error = None
+        for key, candidate, breaker, attempt in self._attempts(deadline):
+            if candidate is not self.model and attempt == 0:
+                _failover_log(self.endpoint, self.model, candidate,
+                              error or CircuitOpenError(f"模型 {self.model.model_slug} 处于熔断状态。"))
+            started = False
+            try:
+                with LLMCallMetrics(candidate.model_slug, self.endpoint, self.kind) as metrics:
+                    self.metrics = metrics
+                    client = get_openai_client(key, candidate.base_url)
+                    stream = client.chat.completions.create(
+                        **stream_params(self.make_params(candidate)), timeout=_request_timeout(deadline, stream=True)
+                    )
+                    for chunk in stream:
+                        content = self._content(chunk, metrics, deadline)
+                        if content:
+                            if not started:
+                                # 收到首个 token 就说明模型可用，之后的错误不再计入熔断
+                                started = True
+                                breaker.record_success()
+                            yield content
+            except Exception as e:
+                if started:
+                    raise
+                error = e
+                time.sleep(self._handle_failure(e, candidate, breaker, attempt, deadline))
+                continue
+            except BaseException:
+                # 调用方在首个 token 前关闭了流 (GeneratorExit) 或取消了任务：请求没有结论
+                if not started:
+                    breaker.release()
+                raise
+            if not started:
+                breaker.record_success()
+            self.model = candidate
+            return
+        raise LLMUnavailableError(f"{self.endpoint}: 没有可用的模型 ({error})") from error
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        deadline = _deadline_for(self.endpoint)
+        error = None
+        for key, candidate, breaker, attempt in self._attempts(deadline):
+            if candidate is not self.model and attempt == 0:
+                _failover_log(self.endpoint, self.model, candidate,
+                              error or CircuitOpenError(f"模型 {self.model.model_slug} 处于熔断状态。"))
+            started = False
+            try:
+                with LLMCallMetrics(candidate.model_slug, self.endpoint, self.kind) as metrics:
+                    self.metrics = metrics
+                    client = get_async_openai_client(key, candidate.base_url)
+                    stream = await client.chat.completions.create(
+                        **stream_params(self.make_params(candidate)), timeout=_request_timeout(deadline, stream=True)
+                    )
+                    async for chunk in stream:
+                        content = self._content(chunk, metrics, deadline)
+                        if content:
+                            if not started:
+                                # 收到首个 token 就说明模型可用，之后的错误不再计入熔断
+                                started = True
+                                breaker.record_success()
+                            yield content
+            except Exception as e:
+                if started:
+                    raise
+                error = e
+                await asyncio.sleep(self._handle_failure(e, candidate, breaker, attempt, deadline))
+                continue
+            except BaseException:
+                # 调用方在首个 token 前关闭了流 (GeneratorExit) 或取消了任务：请求没有结论
+                if not started:
+                    breaker.release()
+                raise
+            if not started:
+                breaker.record_success()
+            self.model = candidate
+            return
+        raise LLMUnavailableError(f"{self.endpoint}: 没有可用的模型 ({error})") from error
+
+
+def get_llm_gateway_stats() -> dict:
+    """返回当前 worker 进程中各模型的熔断器状态与对冲延迟。"""
+    return _gateway.snapshot()
@@ -0,0 +1,120 @@
+# ai_interview_backend/interviews/llm_metrics.py
+"""
+LLM 调用的 Prometheus 指标。
+
+每次真正发往模型服务的请求都由 LLMCallMetrics 记录：总耗时、首个 token 耗时 (流式)、
+prompt / completion token 数 (来自 response.usage)、结果 (成功 / 超时 / 出错)；
+另外记录网关 (llm_gateway.py) 的重试、对冲请求、故障转移与熔断状态，LLM 响应缓存的命中情况和 JSON 解析失败次数。
+所有指标都以模型 (AIModel.model_slug) 和调用方函数名 (endpoint) 为标签，通过 /metrics 接口导出 (见 core/views.py)。
+"""
+
+import time
+import asyncio
+
+from django.conf import settings
+from openai import APITimeoutError
+from prometheus_client import Counter, Gauge, Histogram
+
+# 流式调用时请求模型服务在最后一个数据块中返回 usage (OpenAI 兼容接口的 stream_options)
+STREAM_INCLUDE_USAGE = getattr(settings, 'LLM_STREAM_INCLUDE_USAGE', True)
+
+_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300)
+_TTFT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30)
+
+LLM_REQUESTS = Counter(
+    'llm_requests_total', 'LLM 调用次数 (不含缓存命中)', ['model', 'endpoint', 'kind', 'outcome']
+)
+LLM_LATENCY = Histogram(
+    'llm_request_duration_seconds', 'LLM 调用总耗时', ['model', 'endpoint', 'kind'], buckets=_LATENCY_BUCKETS
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    'llm_time_to_first_token_seconds', '流式调用收到首个 token 的耗时', ['model', 'endpoint'], buckets=_TTFT_BUCKETS
+)
+LLM_TOKENS = Counter(
+    'llm_tokens_total', 'LLM 调用消耗的 token 数', ['model', 'endpoint', 'type']
+)
+LLM_RETRIES = Counter(
+    'llm_retries_total', 'LLM 网关的重试次数', ['model', 'endpoint']
+)
+LLM_HEDGED_REQUESTS = Counter(
+    'llm_hedged_requests_total', '对冲请求次数 (launched: 已发出, won: 先于原请求返回)', ['model', 'endpoint', 'result']
+)
+LLM_FAILOVERS = Counter(
+    'llm_failovers_total', '故障转移到备用模型的次数', ['endpoint', 'from_model', 'to_model']
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    'llm_circuit_breaker_open', '模型熔断器是否处于打开状态', ['model'], multiprocess_mode='livemax'
+)
+LLM_CACHE_LOOKUPS = Counter(
+    'llm_cache_lookups_total', 'LLM 响应缓存查询次数', ['model', 'endpoint', 'result']
+)
+LLM_JSON_PARSE_FAILURES = Counter(
+    'llm_json_parse_failures_total', '模型输出无法直接解析为 JSON 的次数', ['model', 'endpoint']
+)
+
+
+class LLMCallMetrics:
+    """
+    一次 LLM 请求的指标记录器，用作上下文管理器 (同步、异步代码中都用 with)：
+
+        with LLMCallMetrics(model.model_slug, 'generate_final_report', 'json') as metrics:
+            response = client.chat.completions.create(...)
+            metrics.record_usage(response.usage)
+    """
+
+    def __init__(self, model_slug: str, endpoint: str, kind: str):
+        self.labels = {'model': model_slug, 'endpoint': endpoint or 'unknown'}
+        self.kind = kind
+        self.started_at = None
+        self.first_token_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            outcome = 'ok'
+        elif issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
+            outcome = 'cancelled'  # 流式输出被调用方提前关闭 (如客户端断开)
+        elif issubclass(exc_type, (APITimeoutError, TimeoutError)):
+            outcome = 'timeout'
+        else:
+            outcome = 'error'
+        LLM_REQUESTS.labels(kind=self.kind, outcome=outcome, **self.labels).inc()
+        LLM_LATENCY.labels(kind=self.kind, **self.labels).observe(time.perf_counter() - self.started_at)
+        return False
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            LLM_TIME_TO_FIRST_TOKEN.labels(**self.labels).observe(self.first_token_at - self.started_at)
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        LLM_TOKENS.labels(type='prompt', **self.labels).inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(type='completion', **self.labels).inc(usage.completion_tokens or 0)
+        # DeepSeek 会额外返回命中上下文缓存的 prompt token 数
+        cache_hit_tokens = getattr(usage, 'prompt_cache_hit_tokens', None)
+        if cache_hit_tokens:
+            LLM_TOKENS.labels(type='prompt_cache_hit', **self.labels).inc(cache_hit_tokens)
+
+    def json_parse_failure(self):
+        LLM_JSON_PARSE_FAILURES.labels(**self.labels).inc()
+
+
+def record_retry(model_slug: str, endpoint: str):
+    LLM_RETRIES.labels(model=model_slug, endpoint=endpoint).inc()
+
+
+def record_cache_lookup(model_slug: str, endpoint: str, hit: bool):
+    LLM_CACHE_LOOKUPS.labels(model=model_slug, endpoint=endpoint, result='hit' if hit else 'miss').inc()
+
+
+def stream_params(params: dict) -> dict:
+    """把请求参数改为流式，并在可能时要求返回 usage。"""
+    params['stream'] = True
+    if STREAM_INCLUDE_USAGE:
+        params['stream_options'] = {'include_usage': True}
+    return params
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+def mark_existing_reports_ready(apps, schema_editor):
+    """已经生成过报告的历史会话直接标记为已生成。"""
+    InterviewSession = apps.get_model('interviews', 'InterviewSession')
+    InterviewSession.objects.filter(report__isnull=False).update(report_status='ready', report_progress=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='report_error',
+            field=models.CharField(blank=True, max_length=255, verbose_name='报告生成失败原因'),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='report_progress',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='报告生成进度 (%)'),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='report_requested_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='报告任务提交时间'),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='report_status',
+            field=models.CharField(choices=[('none', '未生成'), ('pending', '排队中'), ('running', '生成中'), ('ready', '已生成'), ('failed', '生成失败')], default='none', max_length=20, verbose_name='报告生成状态'),
+        ),
+        migrations.RunPython(mark_existing_reports_ready, migrations.RunPython.noop),
+    ]
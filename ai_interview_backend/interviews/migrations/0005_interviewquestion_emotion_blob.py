@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+from interviews.emotions import encode_emotion_frames, decode_emotion_frames
+
+BATCH_SIZE = 500
+
+
+def encode_existing_analysis_data(apps, schema_editor):
+    """把已有的 JSON 情绪帧转换为二进制编码，并清空原字段。"""
+    InterviewQuestion = apps.get_model('interviews', 'InterviewQuestion')
+    queryset = InterviewQuestion.objects.filter(analysis_data__isnull=False).only('id', 'analysis_data')
+    batch = []
+    for question in queryset.iterator(chunk_size=BATCH_SIZE):
+        frames = question.analysis_data
+        question.emotion_blob = encode_emotion_frames(frames) if isinstance(frames, list) else None
+        question.analysis_data = None
+        batch.append(question)
+        if len(batch) >= BATCH_SIZE:
+            InterviewQuestion.objects.bulk_update(batch, ['emotion_blob', 'analysis_data'])
+            batch = []
+    if batch:
+        InterviewQuestion.objects.bulk_update(batch, ['emotion_blob', 'analysis_data'])
+
+
+def decode_emotion_blobs(apps, schema_editor):
+    InterviewQuestion = apps.get_model('interviews', 'InterviewQuestion')
+    queryset = InterviewQuestion.objects.filter(emotion_blob__isnull=False).only('id', 'emotion_blob')
+    batch = []
+    for question in queryset.iterator(chunk_size=BATCH_SIZE):
+        question.analysis_data = decode_emotion_frames(question.emotion_blob)
+        batch.append(question)
+        if len(batch) >= BATCH_SIZE:
+            InterviewQuestion.objects.bulk_update(batch, ['analysis_data'])
+            batch = []
+    if batch:
+        InterviewQuestion.objects.bulk_update(batch, ['analysis_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0004_interviewsession_report_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewquestion',
+            name='emotion_blob',
+            field=models.BinaryField(blank=True, null=True, verbose_name='情绪数据 (二进制编码)'),
+        ),
+        migrations.RunPython(encode_existing_analysis_data, decode_emotion_blobs),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0005_interviewquestion_emotion_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='history_summary',
+            field=models.TextField(blank=True, verbose_name='较早轮次摘要'),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='history_summary_until',
+            field=models.IntegerField(default=0, verbose_name='摘要覆盖到的问题序号'),
+        ),
+    ]
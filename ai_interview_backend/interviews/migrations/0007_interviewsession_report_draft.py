@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0006_interviewsession_history_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='report_draft',
+            field=models.JSONField(blank=True, null=True, verbose_name='报告草稿'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+BATCH_SIZE = 500
+
+
+def backfill_summary_columns(apps, schema_editor):
+    """为已有会话补写已回答题数与用时，有报告的会话还补写综合得分 (进行中和已取消的会话也需要已回答题数)。"""
+    InterviewSession = apps.get_model('interviews', 'InterviewSession')
+    queryset = (
+        InterviewSession.objects.only('id', 'report', 'started_at', 'finished_at')
+        .annotate(num_answered=Count('questions', filter=Q(questions__answered_at__isnull=False)))
+    )
+    batch = []
+    for session in queryset.iterator(chunk_size=BATCH_SIZE):
+        score = session.report.get('overall_score') if isinstance(session.report, dict) else None
+        session.overall_score = min(max(score, 0), 100) if isinstance(score, int) else None
+        session.answered_count = session.num_answered
+        if session.started_at and session.finished_at:
+            session.duration = int((session.finished_at - session.started_at).total_seconds())
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            InterviewSession.objects.bulk_update(batch, ['overall_score', 'answered_count', 'duration'])
+            batch = []
+    if batch:
+        InterviewSession.objects.bulk_update(batch, ['overall_score', 'answered_count', 'duration'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0007_interviewsession_report_draft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='answered_count',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='已回答题数'),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='overall_score',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='综合得分'),
+        ),
+        migrations.RunPython(backfill_summary_columns, migrations.RunPython.noop),
+    ]
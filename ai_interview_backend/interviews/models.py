@@ -3,6 +3,7 @@ from django.db import models
 import uuid
 from users.models import User
 from resumes.models import Resume
+from .emotions import encode_emotion_frames, decode_emotion_frames, ingest_emotion_frames
 
 
 class InterviewSession(models.Model):
@@ -12,6 +13,13 @@ class InterviewSession(models.Model):
         FINISHED = 'finished', '已完成'
         CANCELED = 'canceled', '已取消'
 
+    class ReportStatus(models.TextChoices):
+        NONE = 'none', '未生成'
+        PENDING = 'pending', '排队中'
+        RUNNING = 'running', '生成中'
+        READY = 'ready', '已生成'
+        FAILED = 'failed', '生成失败'
+
     class Difficulty(models.TextChoices):
         EASY = 'easy', '简单'
         MEDIUM = 'medium', '中等'
@@ -33,10 +41,23 @@ class InterviewSession(models.Model):
     finished_at = models.DateTimeField(null=True, blank=True, verbose_name='结束时间')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     report = models.JSONField(null=True, blank=True, verbose_name='面试报告')
+    # 报告由 Celery 异步生成，以下字段供前端轮询进度
+    report_status = models.CharField(max_length=20, choices=ReportStatus.choices, default=ReportStatus.NONE,
+                                     verbose_name='报告生成状态')
+    report_progress = models.PositiveSmallIntegerField(default=0, verbose_name='报告生成进度 (%)')
+    report_error = models.CharField(max_length=255, blank=True, verbose_name='报告生成失败原因')
+    report_requested_at = models.DateTimeField(null=True, blank=True, verbose_name='报告任务提交时间')
+    # 报告生成过程中已完整输出的部分，供前端逐段展示；生成失败时保留，生成完成后清空
+    report_draft = models.JSONField(null=True, blank=True, verbose_name='报告草稿')
+    # 生成下一问时使用的滚动历史：较早轮次的摘要，以及已折叠进摘要的最后一题序号
+    history_summary = models.TextField(blank=True, verbose_name='较早轮次摘要')
+    history_summary_until = models.IntegerField(default=0, verbose_name='摘要覆盖到的问题序号')
+    # 【性能优化】报告写入时同步冗余的摘要字段 (duration 同时写入)，面试记录列表无需读取 report 与各题数据
+    overall_score = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='综合得分')
+    answered_count = models.PositiveSmallIntegerField(default=0, verbose_name='已回答题数')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
 
-
     class Meta:
         verbose_name = '面试会话'
         verbose_name_plural = verbose_name
@@ -58,7 +79,9 @@ class InterviewQuestion(models.Model):
     audio_url = models.CharField(max_length=255, blank=True, verbose_name='回答音频 URL')
 
     # 新增：用于存储前端发送的情绪/动作时间序列数据
+    # 【性能优化】新数据写入 emotion_blob (紧凑二进制格式)，analysis_data 只保留给尚未迁移的旧数据
     analysis_data = models.JSONField(null=True, blank=True, verbose_name='实时分析数据')
+    emotion_blob = models.BinaryField(null=True, blank=True, verbose_name='情绪数据 (二进制编码)')
     # AI 评估相关字段
     score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name='得分')
     ai_feedback = models.JSONField(null=True, blank=True, verbose_name='AI 反馈内容')
@@ -73,4 +96,32 @@ class InterviewQuestion(models.Model):
         ordering = ['session', 'sequence']
 
     def __str__(self):
-        return f'问题 {self.sequence}: {self.question_text[:30]}...'
\ No newline at end of file
+        return f'问题 {self.sequence}: {self.question_text[:30]}...'
+
+    @property
+    def analysis_frames(self) -> list:
+        """回答期间的情绪帧列表 [{'timestamp', 'emotions'}]，自动解码二进制存储。"""
+        if self.emotion_blob:
+            return decode_emotion_frames(self.emotion_blob)
+        return self.analysis_data or []
+
+    @analysis_frames.setter
+    def analysis_frames(self, frames: list):
+        self.emotion_blob = encode_emotion_frames(frames)
+        self.analysis_data = None
+
+    def ingest_analysis_frames(self, frames: list, buffered: tuple = None) -> dict:
+        """
+        保存客户端上报的情绪帧 (请求体中的帧 + WebSocket 缓冲区中的帧)：
+        先按时间桶降采样并限制帧数，返回降采样统计。没有任何有效帧时保持原值不变。
+        """
+        blob, stats = ingest_emotion_frames(frames, buffered)
+        if blob is not None:
+            self.emotion_blob = blob
+            self.analysis_data = None
+        return stats
+
+    @property
+    def emotion_data(self):
+        """供情绪统计使用的原始数据：二进制编码 (无需解码成 dict) 或旧的帧列表。"""
+        return self.emotion_blob or self.analysis_data
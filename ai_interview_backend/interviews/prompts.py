@@ -0,0 +1,457 @@
+# ai_interview_backend/interviews/prompts.py
+"""
+AI 提示词模板注册表。
+
+每个模板分为两部分：
+- system: 完全静态的系统提示词，包含角色设定和 (体积最大的) JSON 输出格式说明；
+- user:   只包含本次调用的动态内容，用 $变量名 引用 (string.Template 语法，JSON 中的花括号无需转义)。
+
+静态部分放在消息最前面且每次调用逐字节相同，上游服务 (如 DeepSeek 的上下文硬盘缓存)
+可以直接命中前缀缓存，减少输入 token 的计费与首字延迟。
+模板在注册时预编译，渲染只是按片段拼接；管理员可在后台 (system.PromptTemplate) 按版本覆盖内置模板。
+"""
+
+import time
+import threading
+from string import Template
+
+from django.conf import settings
+
+from system.models import PromptTemplate
+from .history import estimate_tokens
+
+# 数据库中的模板在进程内的缓存时间 (秒)；本进程内修改模板会立即失效，其他进程最多延迟这么久
+LOCAL_CACHE_TIMEOUT = getattr(settings, 'PROMPT_TEMPLATE_LOCAL_CACHE_TIMEOUT', 60)
+# 加载失败后的重试间隔 (秒)
+LOAD_RETRY_INTERVAL = 5
+
+_JSON_QUESTION_FORMAT = (
+    "请严格按照以下 JSON 格式返回，只包含问题文本：\n"
+    "{\"question\": \"(你的问题在这里)\"}"
+)
+
+DEFAULT_TEMPLATES = {
+    'first_question': {
+        'system': (
+            "你是一位顶尖公司的资深技术面试官，以提问精准、深入、专业著称。"
+            "你的任务是开启一场关于特定岗位的面试。\n\n"
+            "请仔细阅读候选人的简历，并提出一个有针对性的开场问题。"
+            + _JSON_QUESTION_FORMAT
+        ),
+        'user': (
+            "我正在应聘 '$job_position' 岗位。这是我的简历内容：\n\n"
+            "--- 简历开始 ---\n$resume_text\n--- 简历结束 ---"
+        ),
+    },
+    'first_question_no_resume': {
+        'system': (
+            "你是一位顶尖公司的资深技术面试官，以提问精准、深入、专业著称。"
+            "你的任务是开启一场关于特定岗位的面试。\n\n"
+            "候选人未提供简历。请生成一个通用但热情的开场问题，要求候选人进行一个简洁的自我介绍。"
+            + _JSON_QUESTION_FORMAT
+        ),
+        'user': "我正在应聘 '$job_position' 岗位，但未提供简历。",
+    },
+    'analyze_answer': {
+        'system': (
+            "你是一位专业的面试官，任务是根据候选人的回答给出一个简短、有建设性的评价。\n"
+            "请对回答给出一个大约50-100字的简评。直接返回评价本身，不要包含多余内容。"
+        ),
+        'user': (
+            "我正在面试 '$job_position' 岗位。\n"
+            "面试官提问: $question\n"
+            "我的回答: $answer"
+        ),
+    },
+    'next_question': {
+        'system': "你是一位专业的AI面试官，任务是根据对话历史提出下一个有深度的追问。直接返回问题本身。",
+        'user': "这是关于 '$job_position' 的面试历史:\n$history\n现在，请提出你的下一个问题。",
+    },
+    'final_report': {
+        'system': (
+            "你是一位顶级的职业规划师和面试分析专家，拥有多年的HR和技术面试官经验。"
+            "你的任务是基于候选人的**简历**、**完整的面试记录**以及**每道题回答时的情绪变化**，进行一次全面、深度、富有洞察力的评估。"
+            "你的分析必须体现出你综合了所有信息，例如，指出回答中的亮点是否在简历中有所体现，或者情绪波动是否与问题难度相关。\n\n"
+            "请严格按照下面的 JSON 格式返回你的分析报告。所有评分都是0-5分，所有文本内容需客观、专业且有建设性。\n"
+            "在 strength_analysis 和 weakness_analysis 中，你的分析必须明确关联到具体的简历内容或面试问答。\n"
+            "{\n"
+            "  \"overall_score\": \"(一个0到100的整数，代表综合得分)\",\n"
+            "  \"ability_scores\": [\n"
+            "    {\"name\": \"专业知识\", \"score\": (0-5分)},\n"
+            "    {\"name\": \"技术深度\", \"score\": (0-5分)},\n"
+            "    {\"name\": \"求职动机\", \"score\": (0-5分)},\n"
+            "    {\"name\": \"业务理解\", \"score\": (0-5分)},\n"
+            "    {\"name\": \"沟通表达\", \"score\": (0-5分)}\n"
+            "  ],\n"
+            "  \"overall_comment\": \"(一段100字左右的总体评价，需体现出你结合了简历和面试表现)\",\n"
+            "  \"strength_analysis\": \"(分点列出本次面试的亮点，例如：'在回答问题2时，候选人很好地将简历中提到的XX项目经验与实际问题结合，并全程表现自信（情绪主要是开心和平静），这是一个很大的加分项。')\",\n"
+            "  \"weakness_analysis\": \"(分点列出本次面试的不足，例如：'对于问题3中关于性能优化的追问，候选人的回答较为宽泛，未能深入到简历中提到的ClickHouse具体应用细节，且情绪数据显示出犹豫（多次出现惊讶），表明在该领域的知识深度有待加强。')\",\n"
+            "  \"improvement_suggestions\": [\n"
+            "    \"(第一条具体的改进建议)\",\n"
+            "    \"(第二条具体的改进建议)\",\n"
+            "    \"(第三条具体的改进建议)\"\n"
+            "  ],\n"
+            "  \"keyword_analysis\": {\n"
+            "    \"matched_keywords\": [\"(关键词1)\", \"(关键词2)\", \"(关键词3)\"],\n"
+            "    \"missing_keywords\": [\"(关键词1)\", \"(关键词2)\", \"(关键词3)\"],\n"
+            "    \"analysis_comment\": \"(一段关于我关键词使用情况的简短分析)\"\n"
+            "  },\n"
+            "  \"star_analysis\": [\n"
+            "    {\n"
+            "      \"question_sequence\": 1,\n"
+            "      \"is_behavioral_question\": true,\n"
+            "      \"conforms_to_star\": false,\n"
+            "      \"overall_star_feedback\": \"(对这个回答的STAR法则应用情况给出一个简短的总体评价)\",\n"
+            "      \"situation_analysis\": \"(针对'Situation'部分的详尽分析)\",\n"
+            "      \"task_analysis\": \"(针对'Task'部分的详尽分析)\",\n"
+            "      \"action_analysis\": \"(针对'Action'部分的详尽分析)\",\n"
+            "      \"result_analysis\": \"(针对'Result'部分的详尽分析，尤其要强调量化结果的重要性)\"\n"
+            "    }\n"
+            "  ]\n"
+            "}"
+        ),
+        'user': (
+            "我刚刚完成了一场关于 '$job_position' 岗位的模拟面试。请严格遵循系统消息中的要求，生成一份综合评估报告。\n\n"
+            "$resume_part\n\n"
+            "--- 面试记录 (含情绪总结) ---\n$history--- 面试记录结束 ---"
+        ),
+    },
+    'reference_answer': {
+        'system': (
+            "你是一位经验极其丰富的资深技术专家和面试官，现在需要扮演一位明星候选人。"
+            "你的任务是针对一个具体问题，给出一个逻辑清晰、内容详实、并严格遵循 STAR 法则的完美回答。\n\n"
+            "请为这个问题生成一份“专家级”参考答案。要求：\n"
+            "1. 如果是行为面试题，必须严格遵循 STAR 法则，每个部分都要清晰明了。\n"
+            "2. 内容要具体、有深度，最好包含量化的结果。\n"
+            "3. 直接返回答案文本，不需要任何额外的问候或解释。"
+        ),
+        'user': (
+            "我正在面试 '$job_position' 岗位。\n"
+            "$resume_context\n\n"
+            "面试官的问题是：\n"
+            "--- 问题开始 ---\n$question\n--- 问题结束 ---"
+        ),
+    },
+    'polish_description': {
+        'system': (
+            "你是一位顶级的简历优化专家和资深 HR，尤其擅长使用 STAR 法则优化工作和项目描述。"
+            "规则：必须保持并返回与用户输入完全相同的 HTML 结构（如 <ul>, <li>），只修改文本内容。\n\n"
+            "请严格按照以下 JSON 格式返回优化后的 HTML 内容：\n"
+            "{\"polished_html\": \"(这里是你优化后的 HTML 字符串)\"}"
+        ),
+        'user': (
+            "请根据 STAR 法则，优化以下简历描述。$job_context\n\n"
+            "原始 HTML 内容：\n```html\n$original_html\n```"
+        ),
+    },
+    'resume_analysis': {
+        'system': (
+            "你是一位顶级的职业规划导师和资深技术招聘官，拥有15年以上的经验，以分析精准、洞察深刻、要求严格著称。"
+            "你的任务是：像对待一份真实投递的简历一样，基于一份岗位描述（JD）和一份候选人简历，进行一次全面、深度、数据驱动的评估。\n\n"
+            "请严格遵循以下步骤，对用户提供的简历和JD进行分析，并以一个完整的JSON对象格式返回结果，不要包含任何额外的解释。\n"
+            "分析步骤与返回的JSON格式要求如下:\n"
+            "{\n"
+            "  \"overall_score\": (请给出一个0-100的整数，代表简历与JD的整体匹配度得分),\n"
+            "  \"ability_scores\": [\n"
+            "    {\"name\": \"岗位技能匹配度\", \"score\": (请根据简历中体现的技能与JD要求的吻合度，给出0-5分，可有1位小数)},\n"
+            "    {\"name\": \"项目经验含金量\", \"score\": (请评估简历中的项目经验是否复杂、有深度、与JD相关，给出0-5分)},\n"
+            "    {\"name\": \"经验的量化成果\", \"score\": (请评估简历中的描述是否大量使用了具体数字来量化工作成果，给出0-5分)},\n"
+            "    {\"name\": \"简历专业性\", \"score\": (请评估简历的整体排版、措辞和专业度，有无错别字等，给出0-5分)}\n"
+            "  ],\n"
+            "  \"keyword_analysis\": {\n"
+            "    \"jd_keywords\": [\"从JD中提取出5-8个最核心的技术/经验关键词\"],\n"
+            "    \"matched_keywords\": [\"在简历中明确匹配到的JD关键词\"],\n"
+            "    \"missing_keywords\": [\"简历中缺失的、但JD中很重要的关键词\"]\n"
+            "  },\n"
+            "  \"strengths_analysis\": [\n"
+            "    \"(分点列出2-3条简历中最突出的、与JD高度匹配的亮点)\"\n"
+            "  ],\n"
+            "  \"weaknesses_analysis\": [\n"
+            "    \"(分点列出2-3条简历中明显的不足或与JD不匹配之处)\"\n"
+            "  ],\n"
+            "  \"suggestions\": [\n"
+            "    {\n"
+            "      \"module\": \"(建议修改的简历模块名，如：'项目经历', '专业技能')\",\n"
+            "      \"suggestion\": \"(提供一条非常具体、可执行的修改建议，例如：'在AI模拟面试平台的项目描述中，将“提升了页面加载速度”具体化为“通过代码分割和图片懒加载，将首页的LCP时间从3.2s优化至1.8s”。')\"\n"
+            "    }\n"
+            "  ]\n"
+            "}"
+        ),
+        'user': (
+            "--- 岗位描述 (JD) ---\n$jd_text\n--- JD 结束 ---\n\n"
+            "--- 候选人简历 ---\n$resume_text\n--- 简历结束 ---"
+        ),
+    },
+    'generate_resume': {
+        'system': (
+            "你是一位世界顶级的简历撰写专家，任务是根据用户的核心信息，生成一份专业、完整的简历。"
+            "你必须严格按照我指定的 JSON 格式返回，包含 'sidebar' 和 'main' 两个区域的模块数组。\n\n"
+            "请生成“基本信息”、“教育背景”、“工作经历”、“项目经历”、“专业技能”和“自我评价”这几个核心模块。"
+            "内容需要你根据期望岗位进行专业的、合理的虚构和扩展，使其看起来非常真实和有竞争力。"
+            "返回的 JSON 结构必须如下（不要包含任何额外解释）：\n"
+            "{\n"
+            "  \"sidebar\": [\n"
+            "    {\n"
+            "      \"id\": \"(生成一个uuid)\",\n"
+            "      \"componentName\": \"BaseInfoModule\",\n"
+            "      \"moduleType\": \"BaseInfo\",\n"
+            "      \"title\": \"基本信息\",\n"
+            "      \"props\": {\n"
+            "        \"show\": true,\n"
+            "        \"name\": \"(用户的姓名)\",\n"
+            "        \"photo\": \"\",\n"
+            "        \"items\": [\n"
+            "          {\"id\": \"(uuid)\", \"label\": \"电话\", \"value\": \"138-xxxx-xxxx\"},\n"
+            "          {\"id\": \"(uuid)\", \"label\": \"邮箱\", \"value\": \"xxxx@email.com\"}\n"
+            "        ]\n"
+            "      }\n"
+            "    },\n"
+            "    {\n"
+            "      \"id\": \"(uuid)\",\n"
+            "      \"componentName\": \"SkillsModule\",\n"
+            "      \"moduleType\": \"Skills\",\n"
+            "      \"title\": \"专业技能\",\n"
+            "      \"props\": {\n"
+            "        \"show\": true,\n"
+            "        \"title\": \"专业技能\",\n"
+            "        \"skills\": [\n"
+            "          {\"id\": \"(uuid)\", \"name\": \"(根据岗位生成的核心技能1)\", \"proficiency\": \"精通\"},\n"
+            "          {\"id\": \"(uuid)\", \"name\": \"(技能2)\", \"proficiency\": \"熟练\"}\n"
+            "        ]\n"
+            "      }\n"
+            "    }\n"
+            "  ],\n"
+            "  \"main\": [\n"
+            "    {\n"
+            "      \"id\": \"(uuid)\",\n"
+            "      \"componentName\": \"SummaryModule\",\n"
+            "      \"moduleType\": \"Summary\",\n"
+            "      \"title\": \"自我评价\",\n"
+            "      \"props\": {\n"
+            "        \"show\": true,\n"
+            "        \"title\": \"自我评价\",\n"
+            "        \"summary\": \"(生成一段2-3句话分点的、高度概括的自我评价)\"\n"
+            "      }\n"
+            "    },\n"
+            "    {\n"
+            "      \"id\": \"(uuid)\",\n"
+            "      \"componentName\": \"WorkExpModule\",\n"
+            "      \"moduleType\": \"WorkExp\",\n"
+            "      \"title\": \"工作经历\",\n"
+            "      \"props\": {\n"
+            "        \"show\": true,\n"
+            "        \"title\": \"工作经历\",\n"
+            "        \"experiences\": [\n"
+            "          {\n"
+            "            \"id\": \"(uuid)\",\n"
+            "            \"company\": \"(虚构一个知名的相关公司)\",\n"
+            "            \"position\": \"(相关职位)\",\n"
+            "            \"dateRange\": [\"(合理的开始年份)\", \"(合理的结束年份)\"],\n"
+            "            \"description\": \"(使用STAR法则分点生成一段非常有吸引力的工作描述，包含量化结果)\"\n"
+            "          }\n"
+            "        ]\n"
+            "      }\n"
+            "    },\n"
+            "    {\n"
+            "      \"id\": \"(uuid)\",\n"
+            "      \"componentName\": \"ProjectModule\",\n"
+            "      \"moduleType\": \"Project\",\n"
+            "      \"title\": \"项目经历\",\n"
+            "      \"props\": {\n"
+            "        \"show\": true,\n"
+            "        \"title\": \"项目经历\",\n"
+            "        \"projects\": [\n"
+            "          {\n"
+            "            \"id\": \"(uuid)\",\n"
+            "            \"name\": \"(虚构一个亮眼的相关项目)\",\n"
+            "            \"role\": \"(核心角色)\",\n"
+            "            \"dateRange\": [\"(合理的开始年份)\", \"(合理的结束年份)\"],\n"
+            "            \"description\": \"(使用STAR法则分点生成一段非常有吸引力的项目描述)\",\n"
+            "            \"techStack\": \"(项目使用的技术栈)\"\n"
+            "          }\n"
+            "        ]\n"
+            "      }\n"
+            "    },\n"
+            "    {\n"
+            "      \"id\": \"(uuid)\",\n"
+            "      \"componentName\": \"EducationModule\",\n"
+            "      \"moduleType\": \"Education\",\n"
+            "      \"title\": \"教育背景\",\n"
+            "      \"props\": {\n"
+            "        \"show\": true,\n"
+            "        \"title\": \"教育背景\",\n"
+            "        \"educations\": [\n"
+            "          {\n"
+            "            \"id\": \"(uuid)\",\n"
+            "            \"school\": \"(虚构一所不错的大学)\",\n"
+            "            \"major\": \"(相关专业)\",\n"
+            "            \"degree\": \"(本科/硕士)\",\n"
+            "            \"dateRange\": [\"(合理的开始年份)\", \"(合理的结束年份)\"],\n"
+            "            \"description\": \"\"\n"
+            "          }\n"
+            "        ]\n"
+            "      }\n"
+            "    }\n"
+            "  ]\n"
+            "}"
+        ),
+        'user': (
+            "请为我生成一份简历。我的核心信息如下：\n"
+            "- 姓名: $name\n"
+            "- 期望岗位: $position\n"
+            "- 工作年限: $experience_years\n"
+            "- 其他关键词或个人优势: $keywords"
+        ),
+    },
+}
+
+
+class CompiledPrompt:
+    """预编译的提示词模板：system 为静态文本，user 模板拆成 (字面量, 变量名) 片段。"""
+
+    def __init__(self, name: str, system: str, user: str, version: int = 0):
+        self.name = name
+        self.version = version  # 0 表示内置模板
+        self.parts = self._compile(user)
+        self.fields = {field for _, field in self.parts if field}
+        system_parts = self._compile(system)
+        if len(system_parts) > 1:
+            raise ValueError(f"提示词模板 {name} 的系统提示词必须是静态文本，不能包含 $变量。")
+        self.system = system_parts[0][0]
+        self.static_tokens = estimate_tokens(self.system)
+
+    @staticmethod
+    def _compile(template: str) -> list:
+        parts = []
+        literal = []
+        position = 0
+        for match in Template.pattern.finditer(template):
+            literal.append(template[position:match.start()])
+            position = match.end()
+            if match.group('escaped') is not None:
+                literal.append('$')
+            elif match.group('invalid') is not None:
+                raise ValueError(f"提示词模板中存在无效的占位符 (位置 {match.start()})。")
+            else:
+                parts.append((''.join(literal), match.group('named') or match.group('braced')))
+                literal = []
+        literal.append(template[position:])
+        parts.append((''.join(literal), None))
+        return parts
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    def render(self, **values) -> list:
+        """渲染为 messages；缺少变量时抛出 KeyError。"""
+        user = ''.join(literal + (str(values[field]) if field else '') for literal, field in self.parts)
+        return [{"role": "system", "content": self.system}, {"role": "user", "content": user}]
+
+
+class PromptRegistry:
+
+    def __init__(self, defaults: dict):
+        self._lock = threading.Lock()
+        self._defaults = {name: CompiledPrompt(name, t['system'], t['user']) for name, t in defaults.items()}
+        self._overrides: dict = {}
+        self._overrides_expires_at = 0.0
+        self._stats: dict = {}
+
+    @property
+    def defaults(self) -> dict:
+        return self._defaults
+
+    def _load_overrides(self) -> dict:
+        now = time.monotonic()
+        if self._overrides_expires_at > now:
+            return self._overrides
+        overrides = {}
+        try:
+            # 同名模板只取启用中的最高版本 (ordering 为 name, -version)
+            for row in PromptTemplate.objects.filter(is_active=True).order_by('name', '-version'):
+                if row.name not in overrides:
+                    overrides[row.name] = CompiledPrompt(row.name, row.system_prompt, row.user_template, row.version)
+        except Exception as e:
+            # 数据库中的模板有误或不可用时沿用上一次加载的结果，稍后重试
+            print(f"加载提示词模板失败，沿用已加载的模板: {e}")
+            with self._lock:
+                self._overrides_expires_at = now + min(LOAD_RETRY_INTERVAL, LOCAL_CACHE_TIMEOUT)
+            return self._overrides
+        with self._lock:
+            self._overrides = overrides
+            self._overrides_expires_at = now + LOCAL_CACHE_TIMEOUT
+        return overrides
+
+    def load(self):
+        """在同步上下文中预先加载 (或按需刷新) 数据库中的模板。"""
+        self._load_overrides()
+
+    def invalidate(self):
+        with self._lock:
+            self._overrides_expires_at = 0.0
+
+    def get(self, name: str) -> CompiledPrompt:
+        return self._load_overrides().get(name) or self._defaults[name]
+
+    def render(self, name: str, /, **values) -> list:
+        prompt = self.get(name)
+        try:
+            messages = prompt.render(**values)
+        except KeyError as e:
+            # 后台模板引用了调用方不提供的变量，回退到内置模板
+            print(f"提示词模板 {prompt} 缺少变量 {e}，使用内置模板。")
+            prompt = self._defaults[name]
+            messages = prompt.render(**values)
+        prompt_tokens = prompt.static_tokens + estimate_tokens(messages[1]['content'])
+        with self._lock:
+            stats = self._stats.setdefault(name, {'calls': 0, 'total_prompt_tokens': 0})
+            stats['calls'] += 1
+            stats['total_prompt_tokens'] += prompt_tokens
+            stats.update(version=prompt.version, static_tokens=prompt.static_tokens,
+                         last_prompt_tokens=prompt_tokens)
+        return messages
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in data.values():
+            stats['avg_prompt_tokens'] = round(stats['total_prompt_tokens'] / stats['calls'], 1)
+            # 静态前缀在整个提示词中的占比，即理论上可以命中前缀缓存的比例
+            stats['static_ratio'] = round(stats['static_tokens'] / stats['avg_prompt_tokens'], 3)
+        return data
+
+
+prompt_registry = PromptRegistry(DEFAULT_TEMPLATES)
+
+
+def render_prompt(name: str, /, **values) -> list:
+    """按模板名渲染提示词，返回 [system, user] 两条消息。"""
+    return prompt_registry.render(name, **values)
+
+
+def load_prompt_templates():
+    """
+    刷新进程内的模板缓存 (未过期时不查询数据库)。
+    异步服务在事件循环中不能执行同步 ORM 查询，需在线程中先调用本函数，再构造提示词。
+    """
+    prompt_registry.load()
+
+
+def invalidate_prompt_templates():
+    """PromptTemplate 变更后调用，下次渲染时重新从数据库加载。"""
+    prompt_registry.invalidate()
+
+
+def compile_prompt_template(name: str, system_prompt: str, user_template: str) -> CompiledPrompt:
+    """校验并编译后台提交的模板：同名内置模板存在时，只允许引用内置模板提供的变量。"""
+    prompt = CompiledPrompt(name, system_prompt, user_template)
+    default = prompt_registry.defaults.get(name)
+    if default is not None and prompt.fields - default.fields:
+        unknown = ', '.join(sorted(prompt.fields - default.fields))
+        raise ValueError(f"模板 {name} 只能使用以下变量: {', '.join(sorted(default.fields))}；未知变量: {unknown}")
+    return prompt
+
+
+def get_prompt_template_stats() -> dict:
+    """返回当前 worker 进程中各模板的调用次数与提示词 token 数 (本地估算)。"""
+    return prompt_registry.snapshot()
@@ -1,6 +1,7 @@
 # interviews/serializers.py
 from rest_framework import serializers
 from .models import InterviewSession, InterviewQuestion
+from .emotions import MAX_RAW_FRAMES, find_invalid_frame
 
 class StartInterviewSerializer(serializers.Serializer):
     """
@@ -21,9 +22,19 @@ class InterviewQuestionSerializer(serializers.ModelSerializer):
     """
     用于展示面试问题的序列化器
     """
+    # 情绪数据以二进制存储，对外仍返回原来的帧列表格式
+    analysis_data = serializers.ListField(source='analysis_frames', read_only=True)
+
     class Meta:
         model = InterviewQuestion
-        fields = '__all__'
+        exclude = ['emotion_blob']
+
+
+# 列表接口返回的字段，视图据此只查询这些列
+LIST_FIELDS = [
+    'id', 'job_position', 'difficulty', 'question_count', 'status', 'resume', 'started_at', 'finished_at',
+    'created_at', 'report_status', 'overall_score', 'answered_count', 'duration',
+]
 
 
 class InterviewSessionSerializer(serializers.ModelSerializer):
@@ -37,6 +48,16 @@ class InterviewSessionSerializer(serializers.ModelSerializer):
         model = InterviewSession
         fields = '__all__'
 
+class InterviewSessionListSerializer(serializers.ModelSerializer):
+    """
+    面试记录列表使用的精简序列化器：不包含各题的回答、情绪数据与完整报告，
+    得分、已回答题数与用时来自报告生成时写入的冗余字段。
+    """
+    class Meta:
+        model = InterviewSession
+        fields = LIST_FIELDS
+
+
 class SubmitAnswerSerializer(serializers.Serializer):
     """
     用于接收用户回答的序列化器 (只用于输入)
@@ -48,4 +69,14 @@ class SubmitAnswerSerializer(serializers.Serializer):
     analysis_data = serializers.JSONField(required=False)
 
     class Meta:
-        fields = ['question_id', 'answer_text', 'analysis_data']
\ No newline at end of file
+        fields = ['question_id', 'answer_text', 'analysis_data']
+
+    def validate_analysis_data(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("analysis_data 必须是情绪帧列表。")
+        if len(value) > MAX_RAW_FRAMES:
+            raise serializers.ValidationError(f"情绪帧数量超过上限 ({MAX_RAW_FRAMES})。")
+        invalid = find_invalid_frame(value)
+        if invalid:
+            raise serializers.ValidationError(f"第 {invalid[0] + 1} 个情绪帧格式错误：{invalid[1]}")
+        return value
\ No newline at end of file
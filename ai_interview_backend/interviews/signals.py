@@ -0,0 +1,31 @@
+# ai_interview_backend/interviews/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from system.models import AISetting, AIModel, PromptTemplate
+from .ai_config import invalidate_user_ai_config, invalidate_all_ai_configs
+from .prompts import invalidate_prompt_templates
+
+
+@receiver([post_save, post_delete], sender=AISetting)
+def invalidate_ai_config_on_setting_change(sender, instance, **kwargs):
+    """
+    用户的 AI 设置 (默认模型或 API Key) 变更后，清除该用户的 AI 配置缓存。
+    """
+    invalidate_user_ai_config(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=AIModel)
+def invalidate_ai_config_on_model_change(sender, instance, **kwargs):
+    """
+    AI 模型变更 (地址、启用状态等) 可能影响所有用户，使全部 AI 配置缓存失效。
+    """
+    invalidate_all_ai_configs()
+
+
+@receiver([post_save, post_delete], sender=PromptTemplate)
+def invalidate_prompts_on_template_change(sender, instance, **kwargs):
+    """
+    提示词模板变更后，让本进程下次渲染时重新加载模板；其他进程在本地缓存过期后生效。
+    """
+    invalidate_prompt_templates()
@@ -0,0 +1,156 @@
+# ai_interview_backend/interviews/streaming.py
+
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django_redis import get_redis_connection
+
+# SSE 响应的 Content-Type
+SSE_CONTENT_TYPE = 'text/event-stream; charset=utf-8'
+
+# 事件缓冲区在 Redis 中的保留时间 (秒)，在此期间客户端都可以断线重连
+STREAM_TTL = getattr(settings, 'INTERVIEW_STREAM_TTL', 600)
+# 读取端轮询 Redis 的间隔，以及生产者无任何输出时读取端的最长等待时间
+POLL_INTERVAL = 0.05
+IDLE_TIMEOUT = getattr(settings, 'INTERVIEW_STREAM_IDLE_TIMEOUT', 120)
+# 出现这些事件后流即结束
+TERMINAL_EVENTS = ('done', 'error')
+
+# 与下一问的流式生成并行执行简评等后台 LLM 调用的线程池
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AI_BACKGROUND_WORKERS', 8),
+    thread_name_prefix='ai-background',
+)
+# 运行事件生产者的线程池。生产者内部会等待上面线程池中的简评任务，
+# 两者分开可以避免生产者占满线程池后与自己等待的任务互相阻塞
+_producer_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AI_STREAM_PRODUCER_WORKERS', 16),
+    thread_name_prefix='ai-stream-producer',
+)
+
+
+def sse_event(event: str, data: dict, event_id: int = None) -> str:
+    """把一个结构化事件编码为 Server-Sent Events 格式的文本。"""
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _run_and_close_connections(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # 线程池中的线程不会触发 request_finished，需要手动释放本线程的数据库连接
+        connections.close_all()
+
+
+def run_in_background(fn, *args, **kwargs):
+    """在后台线程池中执行一个 (通常是阻塞的 LLM) 调用，返回 Future。"""
+    return _executor.submit(_run_and_close_connections, fn, *args, **kwargs)
+
+
+def run_producer(fn, *args, **kwargs):
+    """在独立线程中运行事件生产者，生命周期与发起它的 HTTP 连接无关。"""
+    return _producer_executor.submit(_run_and_close_connections, fn, *args, **kwargs)
+
+
+class TurnEventStream:
+    """
+    一轮问答 (提交回答 -> 简评 + 下一问) 的事件缓冲区，以 Redis 列表的形式存放。
+
+    生产者与 HTTP 连接解耦：客户端断开后生成仍会继续并写入缓冲区，
+    客户端可携带 Last-Event-ID (即事件在列表中的下标) 重连并从断点继续读取，
+    不会重新调用 LLM。
+    """
+
+    def __init__(self, session_id, question_id):
+        self.key = f"interview_stream:{session_id}:{question_id}"
+        self.producer_key = f"{self.key}:producer"
+        self.redis = get_redis_connection('default')
+
+    def claim_producer(self) -> bool:
+        """抢占生产者身份；同一轮问答只允许生成一次。"""
+        if not self.redis.set(self.producer_key, 1, nx=True, ex=STREAM_TTL):
+            return False
+        # 清掉上一次失败生成留下的事件
+        self.redis.delete(self.key)
+        return True
+
+    def release_producer(self):
+        self.redis.delete(self.producer_key)
+
+    def exists(self) -> bool:
+        return bool(self.redis.exists(self.key, self.producer_key))
+
+    def append(self, event: str, data: dict):
+        pipe = self.redis.pipeline()
+        pipe.rpush(self.key, json.dumps({'event': event, 'data': data}, ensure_ascii=False))
+        pipe.expire(self.key, STREAM_TTL)
+        pipe.execute()
+
+    def read_from(self, offset: int) -> list:
+        return [json.loads(raw) for raw in self.redis.lrange(self.key, offset, -1)]
+
+    def _render(self, events: list, offset: int):
+        """把从 offset 开始的一批事件编码为 SSE，返回 (文本列表, 新 offset, 是否结束)。"""
+        chunks = []
+        for item in events:
+            chunks.append(sse_event(item['event'], item['data'], event_id=offset))
+            offset += 1
+            if item['event'] in TERMINAL_EVENTS:
+                return chunks, offset, True
+        return chunks, offset, False
+
+    def iter_sse(self, offset: int = 0):
+        """同步视图使用：从 offset 开始持续输出事件，直到 done / error。"""
+        idle = 0.0
+        while True:
+            chunks, offset, finished = self._render(self.read_from(offset), offset)
+            yield from chunks
+            if finished:
+                return
+            if chunks:
+                idle = 0.0
+                continue
+            if idle >= IDLE_TIMEOUT:
+                yield sse_event('error', {'message': '生成超时，请重试。'}, event_id=offset)
+                return
+            time.sleep(POLL_INTERVAL)
+            idle += POLL_INTERVAL
+
+    async def aiter_sse(self, offset: int = 0):
+        """异步视图使用：与 iter_sse 相同，但轮询时不阻塞事件循环。"""
+        read_from = sync_to_async(self.read_from, thread_sensitive=False)
+        idle = 0.0
+        while True:
+            chunks, offset, finished = self._render(await read_from(offset), offset)
+            for chunk in chunks:
+                yield chunk
+            if finished:
+                return
+            if chunks:
+                idle = 0.0
+                continue
+            if idle >= IDLE_TIMEOUT:
+                yield sse_event('error', {'message': '生成超时，请重试。'}, event_id=offset)
+                return
+            await asyncio.sleep(POLL_INTERVAL)
+            idle += POLL_INTERVAL
+
+
+def parse_last_event_id(request) -> int:
+    """根据 Last-Event-ID 头 (或 offset 参数) 计算重连后应读取的起始下标。"""
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id is not None:
+        try:
+            return int(last_event_id) + 1
+        except ValueError:
+            return 0
+    try:
+        return max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return 0
@@ -1,9 +1,23 @@
 # ai_interview_backend/interviews/tasks.py
 
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
+from notifications.models import Notification
+from resumes.services import format_resume_to_text
 from .models import InterviewSession
+from .ai_services import generate_final_report
+
+# 报告任务超过这个时间仍处于排队/生成中，视为 worker 异常退出，允许重新提交
+REPORT_TASK_STALE_SECONDS = getattr(settings, 'INTERVIEW_REPORT_TASK_STALE_SECONDS', 600)
+# 报告的顶层字段，用于按已输出的字段数估算进度
+REPORT_SECTIONS = {
+    'overall_score', 'ability_scores', 'overall_comment', 'strength_analysis', 'weakness_analysis',
+    'improvement_suggestions', 'keyword_analysis', 'star_analysis',
+}
 
 
 # @shared_task 装饰器让这个函数成为一个 Celery 任务，
@@ -35,4 +49,104 @@ def cleanup_stale_interviews():
         return f"成功清理了 {updated_count} 个超时的面试会话。"
     else:
         print("Celery 任务：没有发现需要清理的超时面试会话。")
-        return "没有超时的面试会话。"
\ No newline at end of file
+        return "没有超时的面试会话。"
+
+
+def request_final_report(session: InterviewSession) -> bool:
+    """
+    提交面试报告生成任务，以会话 id 保证幂等：
+    同一会话在排队或生成中时重复调用不会再次提交，返回是否真正提交了新任务。
+    """
+    now = timezone.now()
+    ReportStatus = InterviewSession.ReportStatus
+    claimable = (
+            Q(report_status__in=[ReportStatus.NONE, ReportStatus.FAILED]) |
+            Q(report_status__in=[ReportStatus.PENDING, ReportStatus.RUNNING],
+              report_requested_at__lt=now - timedelta(seconds=REPORT_TASK_STALE_SECONDS))
+    )
+    # 条件更新是原子的，并发的多个请求中只有一个能成功
+    claimed = InterviewSession.objects.filter(claimable, id=session.id, report__isnull=True).update(
+        report_status=ReportStatus.PENDING, report_progress=0, report_error='', report_requested_at=now,
+        report_draft=None
+    )
+    if claimed:
+        session_id = str(session.id)
+        transaction.on_commit(lambda: generate_final_report_task.delay(session_id))
+    return bool(claimed)
+
+
+def _set_report_progress(session_id: str, progress: int):
+    InterviewSession.objects.filter(id=session_id).update(report_progress=progress)
+
+
+def _save_report_draft(session_id: str, partial: dict):
+    """保存已完整输出的报告片段，进度按已完成的顶层字段数在 30%-90% 之间推进。"""
+    progress = 30 + 60 * len(partial.keys() & REPORT_SECTIONS) // len(REPORT_SECTIONS)
+    InterviewSession.objects.filter(id=session_id, report_status=InterviewSession.ReportStatus.RUNNING).update(
+        report_draft=partial, report_progress=progress
+    )
+
+
+def _fill_summary_columns(session: InterviewSession, report: dict, answered_count: int):
+    """写入面试记录列表使用的冗余字段：综合得分、已回答题数与面试用时 (秒)。"""
+    score = report.get('overall_score')
+    session.overall_score = min(max(score, 0), 100) if isinstance(score, int) else None
+    session.answered_count = answered_count
+    if session.started_at and session.finished_at:
+        session.duration = int((session.finished_at - session.started_at).total_seconds())
+
+
+@shared_task(acks_late=True)
+def generate_final_report_task(session_id: str):
+    """
+    异步生成面试报告，完成后写回会话并给用户发送 INTERVIEW_REPORT_READY 通知。
+    """
+    ReportStatus = InterviewSession.ReportStatus
+    # 只有处于排队状态的会话才会被处理，重复投递的消息会在这里被丢弃
+    claimed = InterviewSession.objects.filter(id=session_id, report_status=ReportStatus.PENDING).update(
+        report_status=ReportStatus.RUNNING, report_progress=10
+    )
+    if not claimed:
+        return f"会话 {session_id} 的报告已在生成或已完成，跳过。"
+
+    session = InterviewSession.objects.select_related('user', 'resume').get(id=session_id)
+    history = [
+        {'question': q.question_text, 'answer': q.answer_text, 'analysis_data': q.emotion_data}
+        for q in session.questions.filter(answered_at__isnull=False).order_by('sequence')
+    ]
+    resume_text = format_resume_to_text(session.resume) if session.resume else None
+    _set_report_progress(session_id, 30)
+
+    report_data = generate_final_report(
+        job_position=session.job_position,
+        interview_history=history,
+        user=session.user,
+        resume_text=resume_text,
+        on_progress=lambda partial: _save_report_draft(session_id, partial)
+    )
+    if "error" in report_data:
+        # 已生成的部分保留在 report_draft 中，失败后前端仍可展示
+        failed = {'report_status': ReportStatus.FAILED, 'report_error': str(report_data["error"])[:255]}
+        if report_data.get("partial"):
+            failed['report_draft'] = report_data["partial"]
+        InterviewSession.objects.filter(id=session_id).update(**failed)
+        print(f"Celery 任务：会话 {session_id} 的报告生成失败: {report_data['error']}")
+        return f"会话 {session_id} 的报告生成失败。"
+
+    session.report = report_data
+    session.report_status = ReportStatus.READY
+    session.report_progress = 100
+    session.report_draft = None
+    _fill_summary_columns(session, report_data, answered_count=len(history))
+    session.save(update_fields=[
+        'report', 'report_status', 'report_progress', 'report_draft',
+        'overall_score', 'answered_count', 'duration', 'updated_at',
+    ])
+
+    Notification.objects.create(
+        recipient=session.user,
+        actor=session.user,
+        verb=Notification.VerbChoices.INTERVIEW_REPORT_READY,
+        target=session
+    )
+    return f"会话 {session_id} 的报告生成完成。"
@@ -1,3 +1,775 @@
-from django.test import TestCase
+import json
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import httpx
+import numpy as np
+from openai import BadRequestError, InternalServerError, RateLimitError
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, SimpleTestCase, RequestFactory
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from .consumers import InterviewEmotionConsumer
+from .emotions import (
+    EMOTION_LABELS, FLAG_ZLIB, FLAG_WIDE_DELTAS, MAX_TIMESTAMP, encode_emotion_arrays, decode_emotion_arrays, decode_emotion_frames,
+    downsample_emotion_arrays, frames_to_array, find_invalid_frame,
+)
+from . import llm_cache, llm_gateway
+from .json_stream import IncrementalJSONParser, repair_json
+from .models import InterviewSession, InterviewQuestion
+from .serializers import SubmitAnswerSerializer
+from .streaming import TurnEventStream, parse_last_event_id
+from .views import get_user_cache_key
+
+
+def _patch_redis(test_case, *modules):
+    """让各模块的 get_redis_connection 返回同一个内存中的 fakeredis 实例。"""
+    redis = fakeredis.FakeStrictRedis()
+    for module in modules:
+        patcher = mock.patch(f'{module}.get_redis_connection', return_value=redis)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+    return redis
+
+
+# 前端可能发来的各种格式错误的情绪帧
+MALFORMED_FRAMES = [
+    'not a frame',
+    {'timestamp': '2025-01-01T00:00:00Z', 'emotions': {'happy': 0.9}},
+    {'timestamp': True, 'emotions': {'happy': 0.9}},
+    {'timestamp': -1, 'emotions': {'happy': 0.9}},
+    {'timestamp': 2 ** 53, 'emotions': {'happy': 0.9}},
+    {'emotions': {'happy': 0.9}},
+    {'timestamp': 1000, 'emotions': [0.1, 0.9]},
+    {'timestamp': 1000, 'emotions': {'happy': 'x'}},
+    {'timestamp': 1000, 'emotions': {'happy': float('nan')}},
+]
+
+
+def _frame(timestamp, **scores):
+    return {'timestamp': timestamp, 'emotions': scores}
+
+
+class EmotionCodecTests(SimpleTestCase):
+    def test_round_trip_preserves_timestamps_and_quantized_scores(self):
+        timestamps = np.array([1700000000000, 1700000000250, 1700000001000], dtype=np.float64)
+        scores = np.random.default_rng(0).random((3, len(EMOTION_LABELS)))
+        decoded_timestamps, decoded_scores = decode_emotion_arrays(encode_emotion_arrays(timestamps, scores))
+        np.testing.assert_array_equal(decoded_timestamps, timestamps)
+        self.assertLessEqual(np.abs(decoded_scores - scores).max(), 0.5 / 255 + 1e-9)
+
+    def test_gaps_beyond_int32_do_not_wrap(self):
+        scores = np.zeros((3, len(EMOTION_LABELS)))
+        for timestamps in ([1000, 1.7e12, 1.7e12 + 250], [0, MAX_TIMESTAMP - 1, 0]):
+            with self.subTest(timestamps=timestamps):
+                timestamps = np.array(timestamps, dtype=np.float64)
+                blob = encode_emotion_arrays(timestamps, scores, compress=False)
+                self.assertTrue(blob[3] & FLAG_WIDE_DELTAS)
+                np.testing.assert_array_equal(decode_emotion_arrays(blob)[0], timestamps)
+                compressed = encode_emotion_arrays(timestamps, scores, compress=True)
+                np.testing.assert_array_equal(decode_emotion_arrays(compressed)[0], timestamps)
+
+    def test_short_gaps_keep_int32_deltas(self):
+        blob = encode_emotion_arrays(np.array([1.7e12, 1.7e12 + 250]), np.zeros((2, len(EMOTION_LABELS))),
+                                     compress=False)
+        self.assertFalse(blob[3] & FLAG_WIDE_DELTAS)
+        self.assertEqual(len(blob), 16 + 2 * 4 + 2 * len(EMOTION_LABELS))
+
+    def test_every_valid_timestamp_round_trips(self):
+        frames = [_frame(0, happy=1.0), _frame(MAX_TIMESTAMP - 1, sad=1.0)]
+        self.assertIsNone(find_invalid_frame(frames))
+        decoded = decode_emotion_frames(encode_emotion_arrays(*frames_to_array(frames)))
+        self.assertEqual([frame['timestamp'] for frame in decoded], [0, MAX_TIMESTAMP - 1])
+
+    def test_scores_are_clipped_to_unit_range(self):
+        blob = encode_emotion_arrays(np.array([0.0]), np.array([[1.5, -0.2, 0, 0, 0, 0, 0]]))
+        _, scores = decode_emotion_arrays(blob)
+        self.assertEqual(scores[0, 0], 1.0)
+        self.assertEqual(scores[0, 1], 0.0)
+
+    def test_compression_is_optional(self):
+        timestamps = np.arange(0, 100000, 250, dtype=np.float64)
+        scores = np.zeros((timestamps.shape[0], len(EMOTION_LABELS)))
+        compressed = encode_emotion_arrays(timestamps, scores, compress=True)
+        plain = encode_emotion_arrays(timestamps, scores, compress=False)
+        self.assertTrue(compressed[3] & FLAG_ZLIB)
+        self.assertLess(len(compressed), len(plain))
+        np.testing.assert_array_equal(decode_emotion_arrays(compressed)[0], decode_emotion_arrays(plain)[0])
+
+    def test_empty_input_encodes_to_none(self):
+        self.assertIsNone(encode_emotion_arrays(*frames_to_array([])))
+        self.assertEqual(decode_emotion_frames(None), [])
+
+    def test_unknown_format_is_rejected(self):
+        blob = bytearray(encode_emotion_arrays(np.array([0.0]), np.zeros((1, len(EMOTION_LABELS)))))
+        blob[:2] = b'XX'
+        with self.assertRaises(ValueError):
+            decode_emotion_arrays(bytes(blob))
+
+    def test_decoded_frames_use_label_names(self):
+        frames = decode_emotion_frames(encode_emotion_arrays(*frames_to_array([_frame(5, happy=1.0)])))
+        self.assertEqual(frames[0]['timestamp'], 5)
+        self.assertEqual(frames[0]['emotions']['happy'], 1.0)
+        self.assertEqual(frames[0]['emotions']['sad'], 0.0)
+
+
+class DownsampleEmotionTests(SimpleTestCase):
+    def test_frames_in_same_bucket_are_averaged(self):
+        timestamps, scores = frames_to_array([_frame(0, happy=1.0), _frame(100, happy=0.0), _frame(300, sad=1.0)])
+        timestamps, scores = downsample_emotion_arrays(timestamps, scores, bucket_ms=250, max_frames=0)
+        np.testing.assert_array_equal(timestamps, [0, 300])
+        self.assertAlmostEqual(scores[0, EMOTION_LABELS.index('happy')], 0.5)
+
+    def test_max_aggregation_and_unsorted_input(self):
+        timestamps, scores = frames_to_array([_frame(100, happy=0.2), _frame(0, happy=0.8)])
+        timestamps, scores = downsample_emotion_arrays(timestamps, scores, bucket_ms=250, max_frames=0,
+                                                       aggregation='max')
+        np.testing.assert_array_equal(timestamps, [0])
+        self.assertAlmostEqual(scores[0, EMOTION_LABELS.index('happy')], 0.8)
+
+    def test_frame_count_is_capped(self):
+        timestamps = np.arange(1000, dtype=np.float64) * 1000
+        scores = np.ones((1000, len(EMOTION_LABELS)))
+        _, capped = downsample_emotion_arrays(timestamps, scores, bucket_ms=0, max_frames=100)
+        self.assertLessEqual(capped.shape[0], 100)
+
+
+class MalformedEmotionFrameTests(SimpleTestCase):
+    def test_valid_frames_are_accepted(self):
+        frames = [_frame(1000, happy=0.9), _frame(1250.5), {'timestamp': 1500, 'emotions': None}]
+        self.assertIsNone(find_invalid_frame(frames))
+        serializer = SubmitAnswerSerializer(data={'question_id': 1, 'answer_text': 'a', 'analysis_data': frames})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_serializer_rejects_each_malformed_frame(self):
+        for frame in MALFORMED_FRAMES:
+            with self.subTest(frame=frame):
+                serializer = SubmitAnswerSerializer(data={
+                    'question_id': 1, 'answer_text': 'a', 'analysis_data': [_frame(0, happy=1.0), frame],
+                })
+                self.assertFalse(serializer.is_valid())
+                self.assertIn('analysis_data', serializer.errors)
+                self.assertEqual(find_invalid_frame([_frame(0, happy=1.0), frame])[0], 1)
+
+    def test_stored_malformed_frames_are_skipped(self):
+        timestamps, scores = frames_to_array([_frame(0, happy=1.0), *MALFORMED_FRAMES])
+        self.assertEqual(scores.shape, (1, len(EMOTION_LABELS)))
+        np.testing.assert_array_equal(timestamps, [0])
+
+
+class ParseLastEventIdTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_resumes_after_last_event_id(self):
+        request = self.factory.get('/', HTTP_LAST_EVENT_ID='4')
+        self.assertEqual(parse_last_event_id(request), 5)
+
+    def test_header_takes_precedence_over_offset(self):
+        request = self.factory.get('/?offset=10', HTTP_LAST_EVENT_ID='1')
+        self.assertEqual(parse_last_event_id(request), 2)
+
+    def test_offset_parameter(self):
+        self.assertEqual(parse_last_event_id(self.factory.get('/?offset=3')), 3)
+
+    def test_invalid_values_restart_from_beginning(self):
+        self.assertEqual(parse_last_event_id(self.factory.get('/', HTTP_LAST_EVENT_ID='abc')), 0)
+        self.assertEqual(parse_last_event_id(self.factory.get('/?offset=abc')), 0)
+        self.assertEqual(parse_last_event_id(self.factory.get('/?offset=-5')), 0)
+        self.assertEqual(parse_last_event_id(self.factory.get('/')), 0)
+
+
+class TurnEventStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = _patch_redis(self, 'interviews.streaming')
+        self.stream = TurnEventStream('session', 1)
+
+    def test_only_one_producer_per_turn(self):
+        self.assertTrue(self.stream.claim_producer())
+        self.assertFalse(TurnEventStream('session', 1).claim_producer())
+        self.stream.release_producer()
+        self.assertTrue(TurnEventStream('session', 1).claim_producer())
+
+    def test_claim_discards_events_of_failed_attempt(self):
+        self.stream.append('token', {'content': 'stale'})
+        self.assertTrue(self.stream.claim_producer())
+        self.assertEqual(self.stream.read_from(0), [])
+
+    def test_replay_from_offset_stops_at_terminal_event(self):
+        self.stream.append('token', {'content': 'a'})
+        self.stream.append('token', {'content': 'b'})
+        self.stream.append('done', {'question_id': 2})
+        self.stream.append('token', {'content': 'ignored'})
+
+        chunks = list(self.stream.iter_sse(1))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[0].startswith('id: 1\nevent: token\n'))
+        self.assertIn('"content": "b"', chunks[0])
+        self.assertTrue(chunks[1].startswith('id: 2\nevent: done\n'))
+
+    @mock.patch('interviews.streaming.POLL_INTERVAL', 0.01)
+    @mock.patch('interviews.streaming.IDLE_TIMEOUT', 0.03)
+    def test_idle_stream_ends_with_error(self):
+        self.stream.append('token', {'content': 'a'})
+        chunks = list(self.stream.iter_sse(0))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[1].startswith('id: 1\nevent: error\n'))
+
+
+class SubmitAnswerProducerLockTests(TestCase):
+    """提交回答时，抢占生产者身份之后出错必须释放，否则重试会一直等待一个不存在的生产者。"""
+
+    def setUp(self):
+        self.redis = _patch_redis(self, 'interviews.streaming', 'interviews.emotion_buffer')
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='x')
+        self.session = InterviewSession.objects.create(
+            user=self.user, job_position='Python', question_count=3, status=InterviewSession.Status.RUNNING,
+        )
+        self.question = InterviewQuestion.objects.create(session=self.session, question_text='Q1', sequence=1)
+        self.payload = {'question_id': self.question.id, 'answer_text': 'answer'}
+        self.producer_key = TurnEventStream(self.session.id, self.question.id).producer_key
+
+    def test_sync_view_releases_producer_on_error(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('interviews.views.collect_answer_emotions', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                client.post(f'/api/v1/interviews/{self.session.id}/submit-answer-stream/', self.payload,
+                            format='json')
+        self.assertFalse(self.redis.exists(self.producer_key))
+
+    def test_async_view_releases_producer_on_error(self):
+        self.client.raise_request_exception = False
+        with mock.patch('interviews.async_views.collect_answer_emotions', side_effect=RuntimeError('boom')):
+            response = self.client.post(
+                f'/api/v1/async/interviews/{self.session.id}/submit-answer-stream/', self.payload,
+                content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}',
+            )
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(self.redis.exists(self.producer_key))
+
+
+class AnsweredCountTests(TestCase):
+    """面试记录列表的已回答题数在提交回答时更新，进行中的面试也能显示。"""
+
+    def setUp(self):
+        self.redis = _patch_redis(self, 'interviews.streaming', 'interviews.emotion_buffer')
+        for target in ('interviews.views.start_turn_producer', 'interviews.async_views.astart_turn_producer',
+                       'interviews.views.build_rolling_history', 'interviews.async_views.build_rolling_history',
+                       'interviews.views._sse_response', 'interviews.async_views._sse_response'):
+            patcher = mock.patch(target, return_value=('', []) if 'history' in target else HttpResponse())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='x')
+        self.session = InterviewSession.objects.create(
+            user=self.user, job_position='Python', question_count=3, status=InterviewSession.Status.RUNNING,
+        )
+        self.questions = [
+            InterviewQuestion.objects.create(session=self.session, question_text=f'Q{i}', sequence=i)
+            for i in (1, 2)
+        ]
+
+    def _answered_count(self):
+        self.session.refresh_from_db(fields=['answered_count'])
+        return self.session.answered_count
+
+    def _submit(self, question):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f'/api/v1/interviews/{self.session.id}/submit-answer-stream/',
+                               {'question_id': question.id, 'answer_text': 'answer'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # 模拟本轮生成结束，允许重新提交
+        self.redis.delete(TurnEventStream(self.session.id, question.id).producer_key)
+
+    def test_sync_view_counts_each_question_once(self):
+        self._submit(self.questions[0])
+        self.assertEqual(self._answered_count(), 1)
+        self._submit(self.questions[0])
+        self.assertEqual(self._answered_count(), 1)
+        self._submit(self.questions[1])
+        self.assertEqual(self._answered_count(), 2)
+
+    def test_async_view_counts_answers(self):
+        response = self.client.post(
+            f'/api/v1/async/interviews/{self.session.id}/submit-answer-stream/',
+            {'question_id': self.questions[0].id, 'answer_text': 'answer'},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._answered_count(), 1)
+
+    def test_abandoning_keeps_the_count(self):
+        self._submit(self.questions[0])
+        cache.set(get_user_cache_key(self.user), str(self.session.id))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.post('/api/v1/interviews/abandon-unfinished/').status_code, 200)
+        self.assertEqual(self._answered_count(), 1)
+
+
+class SubmitMalformedEmotionFramesTests(TestCase):
+    def test_answer_with_malformed_frames_is_rejected(self):
+        redis = _patch_redis(self, 'interviews.streaming', 'interviews.emotion_buffer')
+        user = User.objects.create_user(username='candidate', email='candidate@example.com', password='x')
+        session = InterviewSession.objects.create(
+            user=user, job_position='Python', question_count=3, status=InterviewSession.Status.RUNNING,
+        )
+        question = InterviewQuestion.objects.create(session=session, question_text='Q1', sequence=1)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(f'/api/v1/interviews/{session.id}/submit-answer-stream/', {
+            'question_id': question.id, 'answer_text': 'answer',
+            'analysis_data': [{'timestamp': '2025-01-01T00:00:00Z', 'emotions': {'happy': 0.9}}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('analysis_data', response.json())
+        question.refresh_from_db()
+        self.assertIsNone(question.answered_at)
+        self.assertEqual(redis.keys('*'), [])
+
+
+class InterviewEmotionConsumerTests(TestCase):
+    """格式错误的一批情绪帧只会收到错误消息，不能中断整场面试的 WebSocket 连接。"""
+
+    def setUp(self):
+        self.redis = _patch_redis(self, 'interviews.emotion_buffer')
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='x')
+        self.session = InterviewSession.objects.create(
+            user=self.user, job_position='Python', question_count=3, status=InterviewSession.Status.RUNNING,
+        )
+        self.question = InterviewQuestion.objects.create(session=self.session, question_text='Q1', sequence=1)
+
+    def _consumer(self):
+        # 直接调用 receive，send 记录发出的消息；consumer 不关闭连接即说明连接仍然可用
+        consumer = InterviewEmotionConsumer()
+        consumer.user, consumer.session_id = self.user, str(self.session.id)
+        consumer.send = mock.AsyncMock()
+        consumer.close = mock.AsyncMock()
+        return consumer
+
+    async def _send_frames(self, consumer, frames):
+        await consumer.receive(text_data=json.dumps({'type': 'emotion_frames', 'question_id': self.question.id,
+                                                     'frames': frames}))
+        return json.loads(consumer.send.await_args.kwargs['text_data'])
+
+    async def test_malformed_batch_is_rejected_and_connection_survives(self):
+        consumer = self._consumer()
+        for frame in MALFORMED_FRAMES:
+            with self.subTest(frame=frame):
+                message = await self._send_frames(consumer, [_frame(0, happy=1.0), frame])
+                self.assertEqual(message['type'], 'error')
+                self.assertIn('第 2 个情绪帧', message['message'])
+
+        message = await self._send_frames(consumer, [_frame(0, happy=1.0), _frame(1000, sad=0.5)])
+        self.assertEqual(message, {'type': 'emotion_frames_ack', 'question_id': self.question.id, 'received': 2})
+        consumer.close.assert_not_awaited()
+
+    async def test_buffer_failure_is_reported(self):
+        consumer = self._consumer()
+        with mock.patch('interviews.consumers.EmotionFrameBuffer.append', side_effect=RuntimeError('redis down')):
+            message = await self._send_frames(consumer, [_frame(0, happy=1.0)])
+        self.assertEqual(message['type'], 'error')
+        message = await self._send_frames(consumer, [_frame(0, happy=1.0)])
+        self.assertEqual(message['type'], 'emotion_frames_ack')
+        consumer.close.assert_not_awaited()
+
+
+class IncrementalJSONParserTests(SimpleTestCase):
+    TEXT = ('```json\n{"overall_score": "8}0", "star_analysis": [{"q": 1, "s": "a,]b"}, {"q": 2}], '
+            '"comment": "x\\"y"}\n```')
+
+    def _feed_by_char(self, parser, text):
+        events = []
+        for char in text:
+            events.extend(parser.feed(char))
+        return events
+
+    def test_fields_and_items_are_emitted_as_soon_as_complete(self):
+        parser = IncrementalJSONParser(item_keys=['star_analysis'])
+        events = self._feed_by_char(parser, self.TEXT)
+        self.assertEqual(events, [
+            ('overall_score', '8}0', None),
+            ('star_analysis', None, {'q': 1, 's': 'a,]b'}),
+            ('star_analysis', None, {'q': 2}),
+            ('star_analysis', [{'q': 1, 's': 'a,]b'}, {'q': 2}], None),
+            ('comment', 'x"y', None),
+        ])
+        self.assertTrue(parser.done)
+        result, complete = parser.finish()
+        self.assertTrue(complete)
+        self.assertEqual(result['comment'], 'x"y')
+
+    def test_chunking_does_not_change_the_result(self):
+        whole = IncrementalJSONParser(item_keys=['star_analysis'])
+        self.assertEqual(whole.feed(self.TEXT), self._feed_by_char(
+            IncrementalJSONParser(item_keys=['star_analysis']), self.TEXT))
+
+    def test_partial_result_of_truncated_output(self):
+        parser = IncrementalJSONParser(item_keys=['star_analysis'])
+        parser.feed('{"overall_score": 80, "star_analysis": [{"q": 1}, {"q"')
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.partial(), {'overall_score': 80, 'star_analysis': [{'q': 1}]})
+        result, complete = parser.finish()
+        self.assertFalse(complete)
+        self.assertEqual(result['overall_score'], 80)
+        self.assertEqual(result['star_analysis'][0], {'q': 1})
+
+    def test_unparseable_output_raises(self):
+        parser = IncrementalJSONParser()
+        parser.feed('sorry, I cannot help with that')
+        with self.assertRaises(ValueError):
+            parser.finish()
+
+
+class RepairJSONTests(SimpleTestCase):
+    def test_repairs_truncated_output(self):
+        cases = {
+            '{"a": "hel': {'a': 'hel'},
+            '{"a": 1, "b":': {'a': 1, 'b': None},
+            '{"a": [1, 2,': {'a': [1, 2]},
+            '```json\n{"a": 1': {'a': 1},
+            '{"a": {"x": 1}, "b": [{"y": 2}': {'a': {'x': 1}, 'b': [{'y': 2}]},
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(repair_json(text), expected)
+
+    def test_falls_back_to_an_earlier_boundary(self):
+        self.assertEqual(repair_json('{"a": 1, "b": tr'), {'a': 1})
+
+    def test_returns_none_without_an_object(self):
+        self.assertIsNone(repair_json('no json here'))
+        self.assertIsNone(repair_json('[1, 2'))
+
+
+def _api_error(error_class, status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers, request=httpx.Request('POST', 'http://llm.test'))
+    return error_class('error', response=response, body=None)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        for name, value in (('BREAKER_FAILURE_THRESHOLD', 3), ('BREAKER_COOLDOWN', 30)):
+            patcher = mock.patch.object(llm_gateway, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.breaker = llm_gateway.CircuitBreaker('model')
+
+    def _expire_cooldown(self):
+        self.breaker.opened_at -= llm_gateway.BREAKER_COOLDOWN
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, llm_gateway.CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_failure_count(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, llm_gateway.CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_a_single_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self._expire_cooldown()
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, llm_gateway.CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_released_probe_allows_another(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self._expire_cooldown()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_probe_expires(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self._expire_cooldown()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.probe_started -= llm_gateway.BREAKER_PROBE_TIMEOUT
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self._expire_cooldown()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, llm_gateway.CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+
+class RetryDelayTests(SimpleTestCase):
+    def test_full_jitter_is_bounded(self):
+        with mock.patch.object(llm_gateway.random, 'uniform', side_effect=lambda low, high: high):
+            self.assertEqual(llm_gateway._retry_delay(RuntimeError(), 0), llm_gateway.RETRY_BASE_DELAY)
+            self.assertEqual(llm_gateway._retry_delay(RuntimeError(), 10), llm_gateway.RETRY_MAX_DELAY)
+
+    def test_retry_after_header_is_honoured_and_capped(self):
+        with mock.patch.object(llm_gateway.random, 'uniform', return_value=0.0):
+            error = _api_error(RateLimitError, 429, {'retry-after': '3'})
+            self.assertEqual(llm_gateway._retry_delay(error, 0), 3.0)
+            error = _api_error(RateLimitError, 429, {'retry-after': '3600'})
+            self.assertEqual(llm_gateway._retry_delay(error, 0), llm_gateway.RETRY_MAX_DELAY)
+
+
+class CallLLMTests(SimpleTestCase):
+    """用按模型分派结果的假 OpenAI 客户端测试重试、故障转移、熔断、截止时间和对冲请求。"""
+
+    ENDPOINT = 'polish_description_by_ai'
+
+    def setUp(self):
+        self.handlers = {}
+        self.calls = []
+        self.calls_lock = threading.Lock()
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self._create)))
+        patchers = [
+            mock.patch.object(llm_gateway, '_gateway', llm_gateway._Gateway()),
+            mock.patch.object(llm_gateway, 'get_openai_client', return_value=client),
+            mock.patch.object(llm_gateway.time, 'sleep'),
+            mock.patch.object(llm_gateway, 'BREAKER_FAILURE_THRESHOLD', 3),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.backup = SimpleNamespace(model_slug='backup', base_url='http://backup.test', failover=None)
+        self.primary = SimpleNamespace(model_slug='primary', base_url='http://primary.test',
+                                       failover=('backup-key', self.backup))
+
+    def _create(self, model, timeout, **params):
+        with self.calls_lock:
+            self.calls.append(model)
+        result = self.handlers[model]()
+        return SimpleNamespace(usage=None, text=result)
+
+    def _call(self, model=None, endpoint=None):
+        return llm_gateway.call_llm(
+            endpoint or self.ENDPOINT, 'key', model or self.primary, 'test',
+            lambda m: {'model': m.model_slug, 'messages': []}, lambda m, response: response.text,
+        )
+
+    def _fail_times(self, times, error, result='ok'):
+        remaining = [times]
+
+        def handler():
+            if remaining[0] > 0:
+                remaining[0] -= 1
+                raise error
+            return result
+        return handler
+
+    def test_retries_upstream_failures(self):
+        self.handlers['primary'] = self._fail_times(2, _api_error(InternalServerError, 500))
+        self.assertEqual(self._call(), 'ok')
+        self.assertEqual(self.calls, ['primary'] * 3)
+        self.assertEqual(llm_gateway._gateway.breaker('primary').failures, 0)
+
+    def test_client_errors_are_not_retried_or_failed_over(self):
+        self.handlers['primary'] = self._fail_times(1, _api_error(BadRequestError, 400))
+        with self.assertRaises(BadRequestError):
+            self._call()
+        self.assertEqual(self.calls, ['primary'])
+
+    def test_fails_over_after_retries_are_exhausted(self):
+        self.handlers['primary'] = self._fail_times(99, _api_error(InternalServerError, 500))
+        self.handlers['backup'] = lambda: 'from backup'
+        self.assertEqual(self._call(), 'from backup')
+        self.assertEqual(self.calls, ['primary'] * (llm_gateway.MAX_RETRIES + 1) + ['backup'])
+
+    def test_open_breaker_skips_primary(self):
+        self.handlers['primary'] = self._fail_times(99, _api_error(InternalServerError, 500))
+        self.handlers['backup'] = lambda: 'from backup'
+        self._call()
+        self._call()
+        self.assertEqual(llm_gateway._gateway.breaker('primary').state, llm_gateway.CircuitBreaker.OPEN)
+        self.calls.clear()
+        self.assertEqual(self._call(), 'from backup')
+        self.assertEqual(self.calls, ['backup'])
+
+    def test_all_models_unavailable(self):
+        self.handlers['primary'] = self._fail_times(99, _api_error(InternalServerError, 500))
+        self.handlers['backup'] = self._fail_times(99, _api_error(InternalServerError, 503))
+        with self.assertRaises(llm_gateway.LLMUnavailableError):
+            self._call()
+
+    def test_expired_deadline_sends_no_request(self):
+        self.handlers['primary'] = lambda: 'ok'
+        with mock.patch.dict(llm_gateway.DEADLINES, {self.ENDPOINT: 0}):
+            with self.assertRaises(llm_gateway.LLMUnavailableError) as raised:
+                self._call(model=self.backup)
+        self.assertIsInstance(raised.exception.__cause__, llm_gateway.LLMDeadlineExceeded)
+        self.assertEqual(self.calls, [])
+
+    def test_slow_request_is_hedged(self):
+        endpoint = 'analyze_answer'
+        self.assertIn(endpoint, llm_gateway.HEDGE_ENDPOINTS)
+        for _ in range(llm_gateway.HEDGE_MIN_SAMPLES):
+            llm_gateway._gateway.record_latency('backup', endpoint, 0.01)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        first = [True]
+
+        def handler():
+            with self.calls_lock:
+                is_first, first[0] = first[0], False
+            if is_first:
+                release.wait(5)
+                return 'slow'
+            return 'hedge'
+        self.handlers['backup'] = handler
+        self.assertEqual(self._call(model=self.backup, endpoint=endpoint), 'hedge')
+        self.assertEqual(self.calls, ['backup', 'backup'])
+
+    def test_no_hedging_without_enough_samples(self):
+        self.handlers['backup'] = lambda: 'ok'
+        self.assertEqual(self._call(model=self.backup, endpoint='analyze_answer'), 'ok')
+        self.assertEqual(self.calls, ['backup'])
+
+    def test_busy_pool_runs_inline_without_hedging(self):
+        endpoint = 'analyze_answer'
+        for _ in range(llm_gateway.HEDGE_MIN_SAMPLES):
+            llm_gateway._gateway.record_latency('backup', endpoint, 0.01)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        first = [True]
+
+        def handler():
+            with self.calls_lock:
+                is_first, first[0] = first[0], False
+            if is_first:
+                release.wait(5)
+                return 'slow'
+            return 'inline'
+        self.handlers['backup'] = handler
+        results = []
+        with mock.patch.object(llm_gateway, 'HEDGE_WORKERS', 1):
+            background = threading.Thread(
+                target=lambda: results.append(self._call(model=self.backup, endpoint=endpoint)))
+            background.start()
+            while not self.calls:
+                release.wait(0.001)
+            # 唯一的线程被占用：不排队，在当前线程直接执行；后台的慢请求也没有空闲线程发对冲请求
+            self.assertEqual(self._call(model=self.backup, endpoint=endpoint), 'inline')
+            release.set()
+            background.join(5)
+        self.assertEqual(results, ['slow'])
+        self.assertEqual(self.calls, ['backup', 'backup'])
+
+    def _expired_half_open(self, model_slug):
+        breaker = llm_gateway._gateway.breaker(model_slug)
+        for _ in range(llm_gateway.BREAKER_FAILURE_THRESHOLD):
+            breaker.record_failure()
+        breaker.opened_at -= llm_gateway.BREAKER_COOLDOWN
+        return breaker
+
+    def _hanging_async_client(self):
+        started = asyncio.Event()
+
+        async def create(model, timeout, **params):
+            self.calls.append(model)
+            started.set()
+            await asyncio.sleep(10)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        patcher = mock.patch.object(llm_gateway, 'get_async_openai_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return started
+
+    def _cancel_when_started(self, make_coroutine):
+        async def scenario():
+            started = self._hanging_async_client()
+            task = asyncio.ensure_future(make_coroutine())
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(scenario())
+
+    def test_cancelled_probe_is_released(self):
+        breaker = self._expired_half_open('backup')
+        self._cancel_when_started(lambda: llm_gateway.acall_llm(
+            self.ENDPOINT, 'key', self.backup, 'test', lambda m: {'model': m.model_slug, 'messages': []},
+            lambda m, response: response,
+        ))
+        self.assertEqual(self.calls, ['backup'])
+        self.assertTrue(breaker.allow())
+
+    def test_stream_cancelled_before_first_token_releases_probe(self):
+        breaker = self._expired_half_open('backup')
+
+        async def consume():
+            stream = llm_gateway.LLMStream(self.ENDPOINT, 'key', self.backup, 'test',
+                                           lambda m: {'model': m.model_slug, 'messages': []})
+            return [content async for content in stream]
+        self._cancel_when_started(consume)
+        self.assertEqual(self.calls, ['backup'])
+        self.assertTrue(breaker.allow())
+
+
+class CachedLLMCallTests(SimpleTestCase):
+    """响应缓存只保存主模型返回的结果，缓存键区分服务地址。"""
+
+    POLICY = 'polish_description_by_ai'
+
+    def setUp(self):
+        patcher = mock.patch.object(llm_cache, '_response_cache',
+                                    llm_cache.LLMResponseCache(llm_cache.LocalLRUBackend()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backup = SimpleNamespace(model_slug='backup', base_url='http://backup.test')
+        self.primary = SimpleNamespace(model_slug='primary', base_url='http://primary.test')
+        self.calls = 0
+
+    def _call(self, model, served, result='ok'):
+        def call():
+            self.calls += 1
+            return result, served
+        return llm_cache.cached_llm_call(self.POLICY, model, [{'role': 'user', 'content': 'hi'}], 100, 0.5,
+                                         'text', call)
+
+    def test_primary_response_is_cached(self):
+        self.assertEqual(self._call(self.primary, self.primary), 'ok')
+        self.assertEqual(self._call(self.primary, self.primary, 'other'), 'ok')
+        self.assertEqual(self.calls, 1)
+
+    def test_failover_response_is_not_cached(self):
+        self.assertEqual(self._call(self.primary, self.backup, 'from backup'), 'from backup')
+        self.assertEqual(self._call(self.primary, self.primary, 'from primary'), 'from primary')
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(llm_cache._response_cache.snapshot()['policies'][self.POLICY]['stores'], 1)
+
+    def test_key_includes_base_url(self):
+        other_provider = SimpleNamespace(model_slug='primary', base_url='http://other.test')
+        self._call(self.primary, self.primary, 'a')
+        self.assertEqual(self._call(other_provider, other_provider, 'b'), 'b')
+        self.assertEqual(self.calls, 2)
+
+    def test_async_failover_response_is_not_cached(self):
+        async def call():
+            self.calls += 1
+            return 'from backup', self.backup
+
+        async def scenario():
+            for _ in range(2):
+                self.assertEqual(await llm_cache.acached_llm_call(
+                    self.POLICY, self.primary, [], 100, 0.5, 'text', call), 'from backup')
+        asyncio.run(scenario())
+        self.assertEqual(self.calls, 2)
@@ -1,7 +1,8 @@
 # interviews/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import InterviewSessionViewSet, PolishDescriptionView, ResumeAnalysisView # 导入新视图
+from .views import InterviewSessionViewSet, PolishDescriptionView, ResumeAnalysisView, AIRuntimeStatsView # 导入新视图
+from . import async_views
 router = DefaultRouter()
 # 注册 ViewSet，基础 URL 为 'interviews'
 router.register(r'interviews', InterviewSessionViewSet, basename='interview')
@@ -12,4 +13,16 @@ urlpatterns = [
     path('polish-description/', PolishDescriptionView.as_view(), name='polish-description'),
     # 【核心新增】为简历分析功能添加路由
     path('analyze-resume/', ResumeAnalysisView.as_view(), name='analyze-resume'),
+    # AI 调用运行时统计 (连接池等)，仅管理员可见
+    path('ai-runtime-stats/', AIRuntimeStatsView.as_view(), name='ai-runtime-stats'),
+    # ASGI 原生的异步版本接口，路径与同步版本一一对应
+    path('async/', include([
+        path('interviews/<uuid:pk>/submit-answer-stream/', async_views.submit_answer_stream,
+             name='async-submit-answer-stream'),
+        path('interviews/<uuid:pk>/answer-stream/', async_views.answer_stream, name='async-answer-stream'),
+        path('interviews/<uuid:pk>/finish/', async_views.finish_interview, name='async-finish-interview'),
+        path('polish-description/', async_views.polish_description, name='async-polish-description'),
+        path('analyze-resume/', async_views.analyze_resume, name='async-analyze-resume'),
+        path('generate-resume/', async_views.generate_resume, name='async-generate-resume'),
+    ])),
 ]
\ No newline at end of file
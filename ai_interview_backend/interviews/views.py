@@ -1,6 +1,7 @@
 # ai_interview_backend/interviews/views.py
 
 from django.utils import timezone
+from django.db.models import F
 from django.http import StreamingHttpResponse
 from django.core.cache import cache
 from rest_framework import viewsets, permissions, status
@@ -8,77 +9,57 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from resumes.models import Resume
+from resumes.services import format_resume_to_text
 from .models import InterviewSession, InterviewQuestion
-from .serializers import InterviewSessionSerializer, StartInterviewSerializer, SubmitAnswerSerializer
+from .serializers import (
+    InterviewSessionSerializer, InterviewSessionListSerializer, StartInterviewSerializer, SubmitAnswerSerializer,
+    LIST_FIELDS,
+)
 from .ai_services import (
     generate_first_question,
     analyze_answer,
-    generate_next_question_stream,
-    generate_final_report,
-    analyze_resume_against_jd,
     polish_description_by_ai,
     generate_resume_by_ai,
     generate_reference_answer_for_question
 )
-from urllib.parse import quote
+from .llm_clients import get_client_pool_stats
+from .ai_config import get_ai_config_cache_stats
+from .llm_cache import get_llm_cache_stats
+from .prompts import get_prompt_template_stats
+from .llm_gateway import get_llm_gateway_stats
+from .streaming import SSE_CONTENT_TYPE, TurnEventStream, parse_last_event_id
+from .emotion_buffer import collect_answer_emotions
+from .history import build_rolling_history
+from .answer_stream import start_turn_producer, replay_turn_from_db
+from .tasks import request_final_report
 from reports.models import ResumeAnalysisReport
 from reports.serializers import ResumeAnalysisReportSerializer
+from reports.services import submit_resume_analysis, AnalysisInProgress
 
-def format_resume_to_text(resume: Resume) -> str:
-    """
-    一个统一的函数，从任何类型的 Resume 实例中提取纯文本内容。
-    """
-    # 优先级 1: 新的 content_json (无论是对象还是数组)
-    if resume.content_json:
-        components = []
-        # 兼容新的二维布局对象
-        if isinstance(resume.content_json, dict) and 'main' in resume.content_json:
-            components.extend(resume.content_json.get('sidebar', []))
-            components.extend(resume.content_json.get('main', []))
-        # 兼容旧的一维数组
-        elif isinstance(resume.content_json, list):
-            components = resume.content_json
-
-        all_text = []
-        for module in components:
-            if not module or not isinstance(module, dict): continue
-            props = module.get('props', {})
-            if not props or not isinstance(props, dict): continue
-
-            all_text.append(f"\n--- {props.get('title', module.get('title', ''))} ---\n")
-
-            # 提取简单 props
-            for key, value in props.items():
-                if isinstance(value, str) and key not in ['title', 'layoutZone', 'titleStyle']:
-                    all_text.append(value)
-
-            # 提取列表型 props
-            for list_key in ['items', 'educations', 'experiences', 'projects', 'skills']:
-                if list_key in props and isinstance(props[list_key], list):
-                    for item in props[list_key]:
-                        if not item or not isinstance(item, dict): continue
-                        item_texts = []
-                        for item_key, item_value in item.items():
-                            if isinstance(item_value, str) and item_key != 'id':
-                                item_texts.append(item_value)
-                        all_text.append(" ".join(item_texts))
-
-        return "\n".join(filter(None, all_text))
-
-    # 优先级 2: 文件简历的解析内容
-    if resume.parsed_content:
-        return resume.parsed_content
-
-    # 优先级 3: 旧版的、基于模型字段的在线简历
-    # (这个逻辑可以逐步废弃，但为了兼容性暂时保留)
-    if resume.status in [Resume.Status.DRAFT, Resume.Status.PUBLISHED]:
-        parts = []
-        if resume.full_name: parts.append(f"姓名: {resume.full_name}")
-        if resume.job_title: parts.append(f"期望职位: {resume.job_title}")
-        if resume.summary: parts.append(f"\n个人总结:\n{resume.summary}")
-        return "\n".join(parts)
-
-    return ""
+def _sse_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type=SSE_CONTENT_TYPE)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+REPORT_STATUS_FIELDS = ['report', 'report_status', 'report_progress', 'report_error', 'report_draft']
+
+
+def report_status_payload(session: InterviewSession) -> dict:
+    """报告生成进度，生成中附带已完整的部分 (report_draft)，生成完成时附带完整报告。"""
+    data = {
+        'report_status': session.report_status,
+        'report_progress': session.report_progress,
+        'report_error': session.report_error,
+    }
+    if session.report_draft:
+        data['report_draft'] = session.report_draft
+    if session.report:
+        data['report_status'] = InterviewSession.ReportStatus.READY
+        data['report_progress'] = 100
+        data['report'] = session.report
+    return data
 
 
 def get_user_cache_key(user):
@@ -91,7 +72,18 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
     serializer_class = InterviewSessionSerializer
 
     def get_queryset(self):
-        return InterviewSession.objects.filter(user=self.request.user)
+        queryset = InterviewSession.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # 【性能优化】列表只查询精简序列化器用到的列，避免读取报告、草稿等大字段
+            return queryset.only(*LIST_FIELDS)
+        if self.action == 'retrieve':
+            return queryset.prefetch_related('questions')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return InterviewSessionListSerializer
+        return InterviewSessionSerializer
 
     @action(detail=False, methods=['get'], url_path='check-unfinished')
     def check_unfinished(self, request):
@@ -116,7 +108,7 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
             try:
                 session = InterviewSession.objects.get(id=session_id, user=request.user)
                 session.status = InterviewSession.Status.CANCELED
-                session.save()
+                session.save(update_fields=['status', 'updated_at'])
                 cache.delete(cache_key)
                 return Response({"message": "面试已放弃"}, status=status.HTTP_200_OK)
             except InterviewSession.DoesNotExist:
@@ -134,7 +126,7 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
             try:
                 old_session = InterviewSession.objects.get(id=existing_session_id, user=request.user)
                 old_session.status = InterviewSession.Status.CANCELED
-                old_session.save()
+                old_session.save(update_fields=['status', 'updated_at'])
             except InterviewSession.DoesNotExist:
                 pass
             cache.delete(cache_key)
@@ -178,43 +170,70 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
         analysis_data = serializer.validated_data.get('analysis_data')
         try:
             current_question = session.questions.get(id=question_id)
-            current_question.answer_text = answer_text
-            current_question.answered_at = timezone.now()
-            if analysis_data and isinstance(analysis_data, list):
-                current_question.analysis_data = [
-                    {'timestamp': frame.get('timestamp'), 'emotions': frame.get('emotions')}
-                    for frame in analysis_data
-                ]
         except InterviewQuestion.DoesNotExist:
             return Response({"error": "问题不存在"}, status=status.HTTP_404_NOT_FOUND)
 
-        cache.touch(get_user_cache_key(request.user), timeout=7200)
-
-        feedback_text = analyze_answer(session.job_position, current_question.question_text, answer_text, request.user)
-        current_question.ai_feedback = {"feedback": feedback_text}
-        current_question.save()
+        # 【核心新增】同一轮问答只生成一次：重复提交 (例如网络重试) 直接接入已有的事件流
+        stream = TurnEventStream(session.id, current_question.id)
+        if not stream.claim_producer():
+            return _sse_response(stream.iter_sse(parse_last_event_id(request)))
 
-        answered_count = session.questions.filter(answered_at__isnull=False).count()
-        if answered_count >= session.question_count:
+        # 从抢占生产者身份到生产者启动之间出错时必须释放，否则重试会接入一个没有生产者的事件流直到超时
+        try:
+            first_answer = current_question.answered_at is None
+            current_question.answer_text = answer_text
+            current_question.answered_at = timezone.now()
+            # 【性能优化】合并回答期间通过 WebSocket 上报的情绪帧与请求体中的帧，按时间桶降采样后以紧凑的二进制格式存储
+            frame_stats = collect_answer_emotions(current_question, analysis_data)
+            if frame_stats['dropped']:
+                print(f"问题 {current_question.id} 的情绪帧已降采样: {frame_stats}")
+            cache.touch(get_user_cache_key(request.user), timeout=7200)
+            current_question.save()
+            if first_answer:
+                # 面试记录列表使用的已回答题数，进行中和已取消的面试也需要 (重新回答同一题不重复计数)
+                InterviewSession.objects.filter(id=session.id).update(answered_count=F('answered_count') + 1)
+
+            answered_count = session.questions.filter(answered_at__isnull=False).count()
+            interview_finished = answered_count >= session.question_count
+            if not interview_finished:
+                # 【性能优化】只取最近几轮的完整问答，更早的轮次使用会话上增量维护的摘要
+                history_summary, history = build_rolling_history(session)
+
+                # 【性能优化】简评与下一问在独立的生产者线程中生成并写入事件缓冲区，
+                # 响应只负责读取缓冲区：客户端断开不会中断生成，重连后可从断点继续
+                start_turn_producer(stream, session, current_question, history, answered_count + 1, request.user,
+                                    history_summary)
+        except Exception:
+            stream.release_producer()
+            raise
+
+        if interview_finished:
+            stream.release_producer()
+            feedback_text = analyze_answer(session.job_position, current_question.question_text, answer_text,
+                                           request.user)
+            current_question.ai_feedback = {"feedback": feedback_text}
+            current_question.save(update_fields=['ai_feedback'])
             return Response({"feedback": feedback_text, "interview_finished": True}, status=status.HTTP_200_OK)
+        return _sse_response(stream.iter_sse(0))
 
-        history = [{'question': q.question_text, 'answer': q.answer_text} for q in
-                   session.questions.filter(answered_at__isnull=False).order_by('sequence')]
+    @action(detail=True, methods=['get'], url_path='answer-stream')
+    def answer_stream(self, request, pk=None):
+        """断线重连：根据 Last-Event-ID (或 offset 参数) 从断点继续读取某一轮的事件流。"""
+        session = self.get_object()
+        try:
+            current_question = session.questions.get(id=request.query_params.get('question_id'))
+        except (InterviewQuestion.DoesNotExist, ValueError):
+            return Response({"error": "问题不存在"}, status=status.HTTP_404_NOT_FOUND)
 
-        def stream_response_generator():
-            question_buffer = []
-            stream = generate_next_question_stream(session.job_position, history, request.user)
-            for chunk in stream:
-                question_buffer.append(chunk)
-                yield chunk
-            full_question_text = "".join(question_buffer)
-            InterviewQuestion.objects.create(session=session, question_text=full_question_text,
-                                             sequence=answered_count + 1)
+        stream = TurnEventStream(session.id, current_question.id)
+        if stream.exists():
+            return _sse_response(stream.iter_sse(parse_last_event_id(request)))
 
-        response = StreamingHttpResponse(stream_response_generator(), content_type='text/plain; charset=utf-8')
-        response['X-Feedback'] = quote(feedback_text)
-        response['Access-Control-Expose-Headers'] = 'X-Feedback'
-        return response
+        # 缓冲区已过期，本轮若已完成则根据数据库中的结果补发关键事件
+        events = replay_turn_from_db(current_question)
+        if events is None:
+            return Response({"error": "没有可恢复的事件流，请重新提交回答。"}, status=status.HTTP_404_NOT_FOUND)
+        return _sse_response(iter(events))
 
     @action(detail=True, methods=['post'], url_path='finish')
     def finish_interview(self, request, pk=None):
@@ -225,34 +244,23 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
         if session.report:
             return Response(session.report, status=status.HTTP_200_OK)
 
-        history = []
-        answered_questions = session.questions.filter(answered_at__isnull=False).order_by('sequence')
-        for q in answered_questions:
-            history.append({
-                'question': q.question_text,
-                'answer': q.answer_text,
-                'analysis_data': q.analysis_data
-            })
-        if not history:
+        if not session.questions.filter(answered_at__isnull=False).exists():
             return Response({"error": "没有有效的问答记录，无法生成报告"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # --- [核心修改] 获取简历文本并传入 ---
-        resume_text = None
-        if session.resume:
-            resume_text = format_resume_to_text(session.resume)
+        if session.status != InterviewSession.Status.FINISHED:
+            session.status = InterviewSession.Status.FINISHED
+            session.finished_at = timezone.now()
+            session.save(update_fields=['status', 'finished_at', 'updated_at'])
 
-        report_data = generate_final_report(
-            job_position=session.job_position,
-            interview_history=history,
-            user=request.user,
-            resume_text=resume_text  # 传入简历文本
-            )
+        # 【性能优化】报告交给 Celery 异步生成，接口立即返回 202，前端通过 report-status 轮询进度
+        request_final_report(session)
+        session.refresh_from_db(fields=REPORT_STATUS_FIELDS)
+        return Response(report_status_payload(session), status=status.HTTP_202_ACCEPTED)
 
-        session.report = report_data
-        session.status = InterviewSession.Status.FINISHED
-        session.finished_at = timezone.now()
-        session.save()
-        return Response(report_data, status=status.HTTP_200_OK)
+    @action(detail=True, methods=['get'], url_path='report-status')
+    def report_status(self, request, pk=None):
+        session = self.get_object()
+        return Response(report_status_payload(session), status=status.HTTP_200_OK)
 
         # --- [核心新增] 新增一个 action 用于获取 AI 参考答案 ---
 
@@ -325,31 +333,18 @@ class ResumeAnalysisView(APIView):
         except Resume.DoesNotExist:
             return Response({'error': '简历不存在'}, status=status.HTTP_404_NOT_FOUND)
 
-        # 1. 调用AI服务
-        analysis_report_data = analyze_resume_against_jd(
-            resume_text=resume_text,
-            jd_text=jd_text,
-            user=request.user
-        )
-
-        if "error" in analysis_report_data:
-            return Response(analysis_report_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # 2. 【核心修改】将报告存入数据库
+        # 【性能优化】分析以后台任务执行，相同内容的任务直接复用，前端轮询报告详情获取结果
         try:
-            new_report = ResumeAnalysisReport.objects.create(
-                user=request.user,
-                resume=resume_instance,
-                jd_text=jd_text,
-                report_data=analysis_report_data,
-                overall_score=analysis_report_data.get('overall_score', 0)
-            )
-        except Exception as e:
-            return Response({'error': f'保存分析报告失败: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            report, _ = submit_resume_analysis(request.user, resume_instance, resume_text, jd_text)
+        except AnalysisInProgress:
+            return Response({'error': '相同的分析正在提交中，请稍后重试。'}, status=status.HTTP_409_CONFLICT)
+        if report is None:
+            return Response({'error': 'AI 服务未配置，无法进行分析。'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # 3. 序列化并返回新创建的报告对象
-        serializer = ResumeAnalysisReportSerializer(new_report)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        serializer = ResumeAnalysisReportSerializer(report)
+        if report.status == ResumeAnalysisReport.Status.COMPLETED:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 class GenerateResumeView(APIView):
@@ -371,4 +366,20 @@ class GenerateResumeView(APIView):
         if 'error' in resume_json:
             return Response(resume_json, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return Response(resume_json, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(resume_json, status=status.HTTP_200_OK)
+
+
+class AIRuntimeStatsView(APIView):
+    """
+    查看当前 worker 进程的 AI 调用运行时统计 (仅管理员)。
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'client_pool': get_client_pool_stats(),
+            'ai_config_cache': get_ai_config_cache_stats(),
+            'llm_response_cache': get_llm_cache_stats(),
+            'prompt_templates': get_prompt_template_stats(),
+            'llm_gateway': get_llm_gateway_stats(),
+        }, status=status.HTTP_200_OK)
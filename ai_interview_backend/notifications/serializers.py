@@ -6,6 +6,8 @@ from users.models import User
 from blog.models import Post, Comment
 from users.serializers import UserProfileSerializer
 from blog.serializers import PostListSerializer, CommentSerializer
+from interviews.models import InterviewSession
+from reports.models import ResumeAnalysisReport
 
 
 class GenericRelatedField(serializers.Field):
@@ -24,6 +26,13 @@ class GenericRelatedField(serializers.Field):
             # 评论序列化器
             return CommentSerializer(value, context=self.context).data
 
+        if isinstance(value, InterviewSession):
+            # 面试报告通知只需要会话 id 和岗位，用于前端跳转到报告页
+            return {'id': str(value.id), 'job_position': value.job_position}
+
+        if isinstance(value, ResumeAnalysisReport):
+            return {'id': str(value.id), 'resume': value.resume_id, 'overall_score': value.overall_score}
+
         # 对于其他未知类型，返回其字符串表示
         if value:
             return str(value)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+def mark_existing_reports_completed(apps, schema_editor):
+    """历史报告都是同步生成的，全部标记为已完成。"""
+    ResumeAnalysisReport = apps.get_model('reports', 'ResumeAnalysisReport')
+    ResumeAnalysisReport.objects.update(status='completed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumeanalysisreport',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='分析内容哈希'),
+        ),
+        migrations.AddField(
+            model_name='resumeanalysisreport',
+            name='error_message',
+            field=models.CharField(blank=True, max_length=255, verbose_name='失败原因'),
+        ),
+        migrations.AddField(
+            model_name='resumeanalysisreport',
+            name='model_slug',
+            field=models.CharField(blank=True, max_length=100, verbose_name='分析所用模型'),
+        ),
+        migrations.AddField(
+            model_name='resumeanalysisreport',
+            name='status',
+            field=models.CharField(choices=[('pending', '排队中'), ('running', '分析中'), ('completed', '已完成'), ('failed', '失败')], db_index=True, default='pending', max_length=20, verbose_name='分析状态'),
+        ),
+        migrations.AlterField(
+            model_name='resumeanalysisreport',
+            name='report_data',
+            field=models.JSONField(blank=True, null=True, verbose_name='AI分析报告JSON'),
+        ),
+        migrations.RunPython(mark_existing_reports_completed, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,12 @@ import uuid
 
 
 class ResumeAnalysisReport(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', '排队中'
+        RUNNING = 'running', '分析中'
+        COMPLETED = 'completed', '已完成'
+        FAILED = 'failed', '失败'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analysis_reports')
     resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='analysis_reports')
@@ -14,8 +20,15 @@ class ResumeAnalysisReport(models.Model):
     # 存储原始的 JD 文本，以便追溯
     jd_text = models.TextField(verbose_name='目标岗位JD')
 
-    # 存储AI返回的完整JSON报告
-    report_data = models.JSONField(verbose_name='AI分析报告JSON')
+    # 存储AI返回的完整JSON报告，分析完成前为空
+    report_data = models.JSONField(null=True, blank=True, verbose_name='AI分析报告JSON')
+
+    # 分析以后台任务的形式执行，同一份 (简历文本, JD, 模型) 只调用一次 AI
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True,
+                              verbose_name='分析状态')
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, verbose_name='分析内容哈希')
+    model_slug = models.CharField(max_length=100, blank=True, verbose_name='分析所用模型')
+    error_message = models.CharField(max_length=255, blank=True, verbose_name='失败原因')
 
     # 冗余一些关键字段，方便在列表页快速展示和筛选
     overall_score = models.IntegerField(default=0, verbose_name='综合匹配度得分')
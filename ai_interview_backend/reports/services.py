@@ -0,0 +1,102 @@
+# ai_interview_backend/reports/services.py
+
+import time
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.locks import acquire_lock, release_lock
+from interviews.ai_config import get_user_ai_config
+from .models import ResumeAnalysisReport
+from .tasks import run_resume_analysis_task
+
+# 排队/分析中的任务超过这个时间仍未完成，视为已失效，不再复用
+ANALYSIS_JOB_STALE_SECONDS = getattr(settings, 'RESUME_ANALYSIS_JOB_STALE_SECONDS', 600)
+# 提交锁只覆盖查重和创建报告，超时时间远大于这两步的耗时
+ANALYSIS_LOCK_TIMEOUT = 10
+ANALYSIS_LOCK_ATTEMPTS = 20
+
+
+class AnalysisInProgress(Exception):
+    """相同内容的分析正由另一个请求提交，且还没有可复用的报告。"""
+
+
+def compute_analysis_hash(resume_text: str, jd_text: str, model_slug: str) -> str:
+    """(简历文本, JD, 模型) 的内容哈希，作为分析任务的去重键。"""
+    digest = hashlib.sha256()
+    for part in (resume_text, jd_text, model_slug):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def _find_reusable_report(user, resume, content_hash: str):
+    """
+    查找可复用的分析结果：
+    1. 当前用户针对同一份简历、内容完全相同且仍有效 (进行中或已完成) 的任务，直接复用；
+    2. 其他已完成的同内容报告，复制其结果，不再调用 AI。
+    """
+    stale_before = timezone.now() - timedelta(seconds=ANALYSIS_JOB_STALE_SECONDS)
+    own = ResumeAnalysisReport.objects.filter(user=user, resume=resume, content_hash=content_hash)
+    report = own.filter(status=ResumeAnalysisReport.Status.COMPLETED).first()
+    if report is None:
+        report = own.filter(status__in=[ResumeAnalysisReport.Status.PENDING, ResumeAnalysisReport.Status.RUNNING],
+                            updated_at__gte=stale_before).first()
+    if report is not None:
+        return report, None
+
+    completed = ResumeAnalysisReport.objects.filter(
+        content_hash=content_hash, status=ResumeAnalysisReport.Status.COMPLETED
+    ).only('report_data', 'overall_score').first()
+    return None, completed
+
+
+def submit_resume_analysis(user, resume, resume_text: str, jd_text: str):
+    """
+    提交简历-JD 匹配分析任务，返回 (报告, 是否新提交了 AI 任务)。
+    报告在 status 为 completed 前没有 report_data，调用方需轮询报告详情。
+    相同内容的任务正由另一个请求提交且迟迟拿不到锁时抛出 AnalysisInProgress。
+    """
+    _, model = get_user_ai_config(user)
+    if model is None:
+        return None, False
+    content_hash = compute_analysis_hash(resume_text, jd_text, model.model_slug)
+
+    # 同一用户的并发重复提交由短时锁串行化，避免同时创建两个相同的任务
+    lock_key = f"resume_analysis_lock:{user.id}:{content_hash}"
+    token = None
+    for _ in range(ANALYSIS_LOCK_ATTEMPTS):
+        token = acquire_lock(lock_key, ANALYSIS_LOCK_TIMEOUT)
+        if token:
+            break
+        time.sleep(0.1)
+    if token is None:
+        # 拿不到锁时不能无锁继续：返回另一个请求已创建的报告，还没有时由调用方返回 409
+        report, _ = _find_reusable_report(user, resume, content_hash)
+        if report is not None:
+            return report, False
+        raise AnalysisInProgress()
+    try:
+        report, completed = _find_reusable_report(user, resume, content_hash)
+        if report is not None:
+            return report, False
+
+        fields = dict(user=user, resume=resume, jd_text=jd_text, content_hash=content_hash,
+                      model_slug=model.model_slug)
+        if completed is not None:
+            report = ResumeAnalysisReport.objects.create(
+                **fields, status=ResumeAnalysisReport.Status.COMPLETED,
+                report_data=completed.report_data, overall_score=completed.overall_score
+            )
+            return report, False
+
+        report = ResumeAnalysisReport.objects.create(**fields, status=ResumeAnalysisReport.Status.PENDING)
+    finally:
+        release_lock(lock_key, token)
+
+    report_id = str(report.id)
+    transaction.on_commit(lambda: run_resume_analysis_task.delay(report_id, resume_text))
+    return report, True
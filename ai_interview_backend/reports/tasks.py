@@ -0,0 +1,43 @@
+# ai_interview_backend/reports/tasks.py
+
+from celery import shared_task
+
+from interviews.ai_services import analyze_resume_against_jd
+from notifications.models import Notification
+from .models import ResumeAnalysisReport
+
+
+@shared_task(acks_late=True)
+def run_resume_analysis_task(report_id: str, resume_text: str):
+    """
+    在后台执行简历-JD 匹配分析，完成后写回报告并发送 RESUME_ANALYSIS_READY 通知。
+    """
+    # 只处理排队中的任务，重复投递的消息在这里被丢弃
+    claimed = ResumeAnalysisReport.objects.filter(id=report_id, status=ResumeAnalysisReport.Status.PENDING).update(
+        status=ResumeAnalysisReport.Status.RUNNING
+    )
+    if not claimed:
+        return f"分析任务 {report_id} 已在执行或已完成，跳过。"
+
+    report = ResumeAnalysisReport.objects.select_related('user').get(id=report_id)
+    analysis_report_data = analyze_resume_against_jd(resume_text=resume_text, jd_text=report.jd_text,
+                                                     user=report.user)
+    if "error" in analysis_report_data:
+        report.status = ResumeAnalysisReport.Status.FAILED
+        report.error_message = str(analysis_report_data["error"])[:255]
+        report.save(update_fields=['status', 'error_message', 'updated_at'])
+        print(f"Celery 任务：简历分析 {report_id} 失败: {analysis_report_data['error']}")
+        return f"分析任务 {report_id} 失败。"
+
+    report.report_data = analysis_report_data
+    report.overall_score = analysis_report_data.get('overall_score', 0)
+    report.status = ResumeAnalysisReport.Status.COMPLETED
+    report.save(update_fields=['report_data', 'overall_score', 'status', 'updated_at'])
+
+    Notification.objects.create(
+        recipient=report.user,
+        actor=report.user,
+        verb=Notification.VerbChoices.RESUME_ANALYSIS_READY,
+        target=report
+    )
+    return f"分析任务 {report_id} 完成。"
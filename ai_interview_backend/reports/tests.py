@@ -1,3 +1,78 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import fakeredis
 from django.test import TestCase
 
-# Create your tests here.
+from resumes.models import Resume
+from users.models import User
+from . import services
+from .models import ResumeAnalysisReport
+from .services import submit_resume_analysis, compute_analysis_hash, AnalysisInProgress
+
+
+class SubmitResumeAnalysisTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeStrictRedis()
+        patchers = [
+            mock.patch('core.locks.get_redis_connection', return_value=self.redis),
+            mock.patch.object(services, 'get_user_ai_config',
+                              return_value=('key', SimpleNamespace(model_slug='test-model'))),
+            mock.patch.object(services, 'run_resume_analysis_task'),
+            mock.patch.object(services.time, 'sleep'),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.resume = Resume.objects.create(user=self.user, title='resume')
+        self.content_hash = compute_analysis_hash('resume text', 'jd', 'test-model')
+        self.lock_key = f"resume_analysis_lock:{self.user.id}:{self.content_hash}"
+
+    def _submit(self, user=None, resume=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return submit_resume_analysis(user or self.user, resume or self.resume, 'resume text', 'jd')
+
+    def test_first_submission_queues_a_job(self):
+        report, submitted = self._submit()
+        self.assertTrue(submitted)
+        self.assertEqual(report.status, ResumeAnalysisReport.Status.PENDING)
+        self.assertEqual(report.content_hash, self.content_hash)
+        services.run_resume_analysis_task.delay.assert_called_once_with(str(report.id), 'resume text')
+        self.assertFalse(self.redis.exists(self.lock_key))
+
+    def test_repeated_submission_reuses_in_flight_job(self):
+        first, _ = self._submit()
+        second, submitted = self._submit()
+        self.assertFalse(submitted)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(services.run_resume_analysis_task.delay.call_count, 1)
+
+    def test_completed_report_of_another_user_is_copied(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='x')
+        ResumeAnalysisReport.objects.create(
+            user=other, resume=Resume.objects.create(user=other, title='other'), jd_text='jd',
+            content_hash=self.content_hash, status=ResumeAnalysisReport.Status.COMPLETED,
+            report_data={'overall_score': 80}, overall_score=80,
+        )
+        report, submitted = self._submit()
+        self.assertFalse(submitted)
+        self.assertEqual(report.user, self.user)
+        self.assertEqual(report.status, ResumeAnalysisReport.Status.COMPLETED)
+        self.assertEqual(report.overall_score, 80)
+        services.run_resume_analysis_task.delay.assert_not_called()
+
+    def test_busy_lock_returns_in_flight_report(self):
+        first, _ = self._submit()
+        self.redis.set(self.lock_key, 'other-request')
+        report, submitted = self._submit()
+        self.assertFalse(submitted)
+        self.assertEqual(report.id, first.id)
+        self.assertEqual(self.redis.get(self.lock_key), b'other-request')
+
+    def test_busy_lock_without_report_raises_and_keeps_foreign_lock(self):
+        self.redis.set(self.lock_key, 'other-request')
+        with self.assertRaises(AnalysisInProgress):
+            self._submit()
+        self.assertFalse(ResumeAnalysisReport.objects.exists())
+        self.assertEqual(self.redis.get(self.lock_key), b'other-request')
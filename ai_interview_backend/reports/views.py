@@ -16,5 +16,9 @@ class ResumeAnalysisReportViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         """
         重写此方法，以确保用户只能看到自己的分析报告。
+        列表只展示已完成的报告；详情接口同时用于轮询进行中的分析任务。
         """
-        return ResumeAnalysisReport.objects.filter(user=self.request.user).order_by('-created_at')
\ No newline at end of file
+        queryset = ResumeAnalysisReport.objects.filter(user=self.request.user).order_by('-created_at')
+        if self.action == 'list':
+            queryset = queryset.filter(status=ResumeAnalysisReport.Status.COMPLETED)
+        return queryset
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ResumesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resumes'
+
+    def ready(self):
+        import resumes.signals # 导入信号模块，注册简历纯文本缓存的刷新处理
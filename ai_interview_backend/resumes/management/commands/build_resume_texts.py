@@ -0,0 +1,38 @@
+# ai_interview_backend/resumes/management/commands/build_resume_texts.py
+
+from django.core.management.base import BaseCommand
+
+from resumes.models import Resume
+from resumes.services import refresh_resume_text
+
+
+class Command(BaseCommand):
+    help = "批量预生成 (或刷新) 所有简历的纯文本缓存，供面试与简历分析直接使用。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="每批写回数据库的简历数量")
+        parser.add_argument('--force', action='store_true', help="忽略已有哈希，全部重新生成")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['id', 'content_json', 'parsed_content', 'status', 'full_name', 'job_title', 'summary',
+                  'text_content', 'text_hash']
+        queryset = Resume.objects.only(*fields).order_by('id')
+
+        scanned = updated = 0
+        batch = []
+        for resume in queryset.iterator(chunk_size=batch_size):
+            scanned += 1
+            if options['force']:
+                resume.text_hash = ''
+            if refresh_resume_text(resume):
+                batch.append(resume)
+            if len(batch) >= batch_size:
+                Resume.objects.bulk_update(batch, ['text_content', 'text_hash'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            Resume.objects.bulk_update(batch, ['text_content', 'text_hash'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"共扫描 {scanned} 份简历，更新了 {updated} 份的纯文本缓存。"))
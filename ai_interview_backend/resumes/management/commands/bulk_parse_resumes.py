@@ -0,0 +1,71 @@
+# ai_interview_backend/resumes/management/commands/bulk_parse_resumes.py
+
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from resumes.models import Resume
+from resumes.services import parse_resumes_in_parallel, BULK_PARSE_FILE_TIMEOUT
+from users.models import User
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+
+class Command(BaseCommand):
+    help = "用多进程批量导入并解析简历文件；不指定 --dir 时重新解析卡在“解析中”的已有简历。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="要导入的简历文件目录 (只处理 .pdf / .docx)")
+        parser.add_argument('--user', help="导入的简历归属的用户名，与 --dir 一起使用")
+        parser.add_argument('--failed', action='store_true', help="同时重新解析“解析失败”的已有简历")
+        parser.add_argument('--workers', type=int, default=None, help="解析进程数，默认为 CPU 核数")
+        parser.add_argument('--timeout', type=float, default=BULK_PARSE_FILE_TIMEOUT, help="单个文件的超时时间 (秒)")
+        parser.add_argument('--batch-size', type=int, default=200, help="每批写回数据库的简历数量")
+
+    def _import_directory(self, directory: str, username: str):
+        if not username:
+            raise CommandError("使用 --dir 导入时必须通过 --user 指定简历归属的用户。")
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"用户 {username} 不存在。")
+        if not os.path.isdir(directory):
+            raise CommandError(f"目录 {directory} 不存在。")
+
+        resumes = []
+        for name in sorted(os.listdir(directory)):
+            title, extension = os.path.splitext(name)
+            if extension.lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            resume = Resume(user=user, title=title, status=Resume.Status.PARSING)
+            with open(os.path.join(directory, name), 'rb') as f:
+                resume.file.save(name, File(f), save=False)
+            resumes.append(resume)
+        # 逐条保存以取得主键 (MySQL 的 bulk_create 不返回主键，之后的 bulk_update 需要主键)；
+        # 导入的耗时主要在复制文件，逐条插入的开销可以忽略
+        with transaction.atomic():
+            for resume in resumes:
+                resume.save()
+        return resumes
+
+    def handle(self, *args, **options):
+        if options['dir']:
+            resumes = self._import_directory(options['dir'], options['user'])
+            self.stdout.write(f"已导入 {len(resumes)} 个简历文件，开始解析...")
+        else:
+            statuses = [Resume.Status.PARSING]
+            if options['failed']:
+                statuses.append(Resume.Status.FAILED)
+            resumes = list(Resume.objects.filter(status__in=statuses).exclude(file=''))
+            self.stdout.write(f"共 {len(resumes)} 份待解析的简历，开始解析...")
+
+        stats = parse_resumes_in_parallel(resumes, workers=options['workers'], file_timeout=options['timeout'],
+                                          batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"解析完成：{stats['files']} 个文件 ({stats['bytes'] / (1024 * 1024):.2f} MB)，"
+            f"成功 {stats['parsed']}，失败 {stats['failed']} (其中超时 {stats['timed_out']})，"
+            f"{stats['workers']} 个进程耗时 {stats['elapsed']} 秒，"
+            f"{stats['files_per_sec']} files/s，{stats['mb_per_sec']} MB/s。"
+        ))
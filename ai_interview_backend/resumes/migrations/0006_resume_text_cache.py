@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0005_resume_template_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='text_content',
+            field=models.TextField(blank=True, verbose_name='简历纯文本缓存'),
+        ),
+        migrations.AddField(
+            model_name='resume',
+            name='text_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='纯文本缓存对应的内容哈希'),
+        ),
+    ]
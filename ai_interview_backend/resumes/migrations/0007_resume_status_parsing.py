@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resumes', '0006_resume_text_cache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resume',
+            name='status',
+            field=models.CharField(choices=[('draft', '草稿'), ('published', '已发布'), ('parsing', '（文件）解析中'), ('parsed', '（文件）已解析'), ('failed', '（文件）解析失败')], default='draft', max_length=20, verbose_name='状态'),
+        ),
+    ]
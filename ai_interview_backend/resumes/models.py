@@ -60,6 +60,7 @@ class Resume(models.Model):
     class Status(models.TextChoices):
         DRAFT = 'draft', '草稿'
         PUBLISHED = 'published', '已发布'
+        PARSING = 'parsing', '（文件）解析中'
         PARSED = 'parsed', '（文件）已解析'
         FAILED = 'failed', '（文件）解析失败'
 
@@ -87,6 +88,10 @@ class Resume(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.DRAFT, verbose_name='状态')
     optimization_suggestions = models.JSONField(null=True, blank=True, verbose_name='优化建议')
 
+    # 【性能优化】提供给 AI 的纯文本缓存，保存简历时根据内容哈希按需重新生成
+    text_content = models.TextField(blank=True, verbose_name='简历纯文本缓存')
+    text_hash = models.CharField(max_length=64, blank=True, verbose_name='纯文本缓存对应的内容哈希')
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
@@ -1,14 +1,33 @@
 # resumes/services.py
 import os
+import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from django.conf import settings
+from django.utils import timezone
 from docx import Document
 from pypdf import PdfReader
+from .models import Resume
 
-def extract_text_from_file(file_path: str) -> str:
+# 单个文件最多解析的页数和耗时 (秒)，超出部分会被截断
+PARSE_MAX_PAGES = getattr(settings, 'RESUME_PARSE_MAX_PAGES', 30)
+PARSE_TIME_LIMIT = getattr(settings, 'RESUME_PARSE_TIME_LIMIT', 20)
+# 批量解析的进程数 (默认为 CPU 核数) 和单个文件的超时时间 (秒)
+BULK_PARSE_WORKERS = getattr(settings, 'RESUME_BULK_PARSE_WORKERS', None)
+BULK_PARSE_FILE_TIMEOUT = getattr(settings, 'RESUME_BULK_PARSE_FILE_TIMEOUT', PARSE_TIME_LIMIT + 10)
+BULK_PARSE_UPDATE_FIELDS = ['parsed_content', 'status', 'text_content', 'text_hash', 'updated_at']
+
+
+def extract_text_from_file(file_path: str, max_pages: int = PARSE_MAX_PAGES,
+                           time_limit: float = PARSE_TIME_LIMIT) -> str:
     """
     根据文件扩展名，从 PDF 或 DOCX 文件中提取纯文本。
 
     :param file_path: 文件在服务器上的完整物理路径。
+    :param max_pages: 最多解析的 PDF 页数。
+    :param time_limit: 解析耗时上限 (秒)，超时后返回已解析的部分。
     :return: 提取出的纯文本内容。
     """
     # 从文件名中获取扩展名
@@ -17,7 +36,7 @@ def extract_text_from_file(file_path: str) -> str:
 
     try:
         if extension == '.pdf':
-            return extract_text_from_pdf(file_path)
+            return extract_text_from_pdf(file_path, max_pages, time_limit)
         elif extension == '.docx':
             return extract_text_from_docx(file_path)
         else:
@@ -27,16 +46,26 @@ def extract_text_from_file(file_path: str) -> str:
         print(f"从文件 {file_path} 提取文本时出错: {e}")
         return ""
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+def extract_text_from_pdf(pdf_path: str, max_pages: int = PARSE_MAX_PAGES,
+                          time_limit: float = PARSE_TIME_LIMIT) -> str:
     """
-    使用 pypdf 从 PDF 文件中提取文本。
+    使用 pypdf 从 PDF 文件中逐页提取文本。
+    【性能优化】逐页追加到列表后一次性 join，避免字符串反复拼接；并限制页数与耗时。
     """
-    text = ""
+    deadline = time.monotonic() + time_limit
+    pages = []
     with open(pdf_path, 'rb') as f:
         reader = PdfReader(f)
-        for page in reader.pages:
-            text += page.extract_text() or ""
-    return text
+        total_pages = len(reader.pages)
+        for index, page in enumerate(reader.pages):
+            if index >= max_pages:
+                print(f"PDF {pdf_path} 共 {total_pages} 页，超过上限 {max_pages} 页，其余页已忽略。")
+                break
+            if time.monotonic() > deadline:
+                print(f"PDF {pdf_path} 解析超过 {time_limit} 秒，只保留前 {index} 页。")
+                break
+            pages.append(page.extract_text() or "")
+    return "".join(pages)
 
 def extract_text_from_docx(docx_path: str) -> str:
     """
@@ -44,4 +73,197 @@ def extract_text_from_docx(docx_path: str) -> str:
     """
     doc = Document(docx_path)
     text = "\n".join([para.text for para in doc.paragraphs])
-    return text
\ No newline at end of file
+    return text
+
+
+def _file_size(file_path: str) -> int:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def parse_resumes_in_parallel(resumes, workers: int = None, file_timeout: float = BULK_PARSE_FILE_TIMEOUT,
+                              batch_size: int = 200) -> dict:
+    """
+    【性能优化】用进程池并行解析一批文件简历，结果按批 bulk_update 回数据库。
+
+    每个文件都在子进程中调用 extract_text_from_file，解析器自身的页数/耗时上限之外，
+    超过 file_timeout 仍未返回的文件直接记为解析失败。bulk_update 不会触发 post_save，
+    所以这里顺带刷新简历的纯文本缓存。
+
+    :param resumes: 带有 file 的 Resume 实例列表。
+    :param workers: 进程数，默认为 CPU 核数。
+    :return: 吞吐量统计 (文件数、成功/失败/超时数、耗时、files/s、MB/s)。
+    """
+    resumes = [resume for resume in resumes if resume.file]
+    workers = workers or BULK_PARSE_WORKERS or os.cpu_count() or 1
+    stats = {'files': len(resumes), 'parsed': 0, 'failed': 0, 'timed_out': 0, 'bytes': 0,
+             'workers': workers, 'elapsed': 0.0, 'files_per_sec': 0.0, 'mb_per_sec': 0.0}
+    if not resumes:
+        return stats
+
+    started = time.monotonic()
+    results = {}  # resumes 中的序号 -> 提取出的文本 (不依赖主键，调用方可以传入尚未取回主键的实例)
+    # 守护进程 (例如 prefork 模式下的 Celery 子进程) 不能再创建子进程，退化为当前进程内顺序解析
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        stats['workers'] = 1
+        for index, resume in enumerate(resumes):
+            results[index] = extract_text_from_file(resume.file.path)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        pending = {}  # future -> (序号, resume, 提交时间)
+        queue = list(reversed(list(enumerate(resumes))))
+        capacity = workers
+        try:
+            while queue or pending:
+                # 同时在途的任务数不超过空闲进程数，提交时间即可近似为开始解析的时间
+                while queue and len(pending) < capacity:
+                    index, resume = queue.pop()
+                    future = executor.submit(extract_text_from_file, resume.file.path)
+                    pending[future] = (index, resume, time.monotonic())
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, resume, _ = pending.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        print(f"批量解析简历 {resume.file.name} 失败: {e}")
+                        results[index] = ""
+                now = time.monotonic()
+                for future, (index, resume, submitted_at) in list(pending.items()):
+                    if now - submitted_at > file_timeout:
+                        # 无法中断正在运行的子进程：放弃等待，并认为这个进程在它返回前不可用
+                        print(f"批量解析简历 {resume.file.name} 超过 {file_timeout} 秒，已放弃。")
+                        del pending[future]
+                        future.cancel()
+                        results[index] = None
+                        stats['timed_out'] += 1
+                        capacity -= 1
+                if capacity <= 0:
+                    print("所有解析进程都已超时，剩余的简历标记为解析失败。")
+                    for index, _ in queue:
+                        results[index] = ""
+                    break
+        finally:
+            executor.shutdown(wait=stats['timed_out'] == 0, cancel_futures=True)
+
+    now = timezone.now()
+    batch = []
+    for index, resume in enumerate(resumes):
+        text = results.get(index)
+        stats['bytes'] += _file_size(resume.file.path)
+        if text:
+            resume.parsed_content = text
+            resume.status = Resume.Status.PARSED
+            stats['parsed'] += 1
+        else:
+            resume.status = Resume.Status.FAILED
+            stats['failed'] += 1
+        resume.updated_at = now
+        refresh_resume_text(resume)
+        batch.append(resume)
+        if len(batch) >= batch_size:
+            Resume.objects.bulk_update(batch, BULK_PARSE_UPDATE_FIELDS)
+            batch = []
+    if batch:
+        Resume.objects.bulk_update(batch, BULK_PARSE_UPDATE_FIELDS)
+
+    elapsed = time.monotonic() - started
+    stats['elapsed'] = round(elapsed, 3)
+    if elapsed > 0:
+        stats['files_per_sec'] = round(stats['files'] / elapsed, 2)
+        stats['mb_per_sec'] = round(stats['bytes'] / elapsed / (1024 * 1024), 3)
+    return stats
+
+
+def _flatten_resume_text(resume: Resume) -> str:
+    """
+    从任何类型的 Resume 实例中提取纯文本内容 (完整遍历 content_json)。
+    """
+    # 优先级 1: 新的 content_json (无论是对象还是数组)
+    if resume.content_json:
+        components = []
+        # 兼容新的二维布局对象
+        if isinstance(resume.content_json, dict) and 'main' in resume.content_json:
+            components.extend(resume.content_json.get('sidebar', []))
+            components.extend(resume.content_json.get('main', []))
+        # 兼容旧的一维数组
+        elif isinstance(resume.content_json, list):
+            components = resume.content_json
+
+        all_text = []
+        for module in components:
+            if not module or not isinstance(module, dict): continue
+            props = module.get('props', {})
+            if not props or not isinstance(props, dict): continue
+
+            all_text.append(f"\n--- {props.get('title', module.get('title', ''))} ---\n")
+
+            # 提取简单 props
+            for key, value in props.items():
+                if isinstance(value, str) and key not in ['title', 'layoutZone', 'titleStyle']:
+                    all_text.append(value)
+
+            # 提取列表型 props
+            for list_key in ['items', 'educations', 'experiences', 'projects', 'skills']:
+                if list_key in props and isinstance(props[list_key], list):
+                    for item in props[list_key]:
+                        if not item or not isinstance(item, dict): continue
+                        item_texts = []
+                        for item_key, item_value in item.items():
+                            if isinstance(item_value, str) and item_key != 'id':
+                                item_texts.append(item_value)
+                        all_text.append(" ".join(item_texts))
+
+        return "\n".join(filter(None, all_text))
+
+    # 优先级 2: 文件简历的解析内容
+    if resume.parsed_content:
+        return resume.parsed_content
+
+    # 优先级 3: 旧版的、基于模型字段的在线简历
+    # (这个逻辑可以逐步废弃，但为了兼容性暂时保留)
+    if resume.status in [Resume.Status.DRAFT, Resume.Status.PUBLISHED]:
+        parts = []
+        if resume.full_name: parts.append(f"姓名: {resume.full_name}")
+        if resume.job_title: parts.append(f"期望职位: {resume.job_title}")
+        if resume.summary: parts.append(f"\n个人总结:\n{resume.summary}")
+        return "\n".join(parts)
+
+    return ""
+
+
+def compute_resume_text_hash(resume: Resume) -> str:
+    """参与生成纯文本的所有字段的哈希，任何一个变化都需要重新生成。"""
+    source = [resume.content_json, resume.parsed_content, resume.status,
+              resume.full_name, resume.job_title, resume.summary]
+    payload = json.dumps(source, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def refresh_resume_text(resume: Resume) -> bool:
+    """
+    内容有变化时重新生成纯文本缓存 (只修改实例，不保存)，返回是否发生了变化。
+    """
+    text_hash = compute_resume_text_hash(resume)
+    if text_hash == resume.text_hash:
+        return False
+    resume.text_content = _flatten_resume_text(resume)
+    resume.text_hash = text_hash
+    return True
+
+
+def format_resume_to_text(resume: Resume) -> str:
+    """
+    一个统一的函数，从任何类型的 Resume 实例中提取纯文本内容。
+    【性能优化】直接返回保存简历时生成的缓存；旧数据首次访问时生成并回写。
+    """
+    if resume.text_hash:
+        return resume.text_content
+    refresh_resume_text(resume)
+    # 用 update 回写，不触发 updated_at 和信号
+    Resume.objects.filter(pk=resume.pk).update(text_content=resume.text_content, text_hash=resume.text_hash)
+    return resume.text_content
@@ -0,0 +1,17 @@
+# ai_interview_backend/resumes/signals.py
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Resume
+from .services import refresh_resume_text
+
+
+@receiver(post_save, sender=Resume)
+def refresh_resume_text_on_save(sender, instance, **kwargs):
+    """
+    简历保存后，如果参与生成纯文本的内容发生了变化，重新生成纯文本缓存。
+    使用 update 回写，不会再次触发本信号，也不会修改 updated_at。
+    """
+    if refresh_resume_text(instance):
+        Resume.objects.filter(pk=instance.pk).update(text_content=instance.text_content,
+                                                     text_hash=instance.text_hash)
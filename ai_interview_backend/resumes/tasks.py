@@ -0,0 +1,49 @@
+# ai_interview_backend/resumes/tasks.py
+
+from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+
+from .models import Resume
+from .services import extract_text_from_file, parse_resumes_in_parallel, PARSE_TIME_LIMIT
+
+
+# 软超时比解析器自身的耗时上限留出余量，用于兜底单页解析卡死的情况
+@shared_task(soft_time_limit=PARSE_TIME_LIMIT + 30, time_limit=PARSE_TIME_LIMIT + 60)
+def parse_resume_file_task(resume_id: int):
+    """
+    在后台解析上传的简历文件，完成后把状态更新为 PARSED / FAILED。
+    """
+    resume = Resume.objects.filter(id=resume_id, status=Resume.Status.PARSING).first()
+    if resume is None:
+        return f"简历 {resume_id} 不在解析中状态，跳过。"
+
+    try:
+        extracted_text = extract_text_from_file(resume.file.path)
+    except SoftTimeLimitExceeded:
+        print(f"Celery 任务：解析简历 {resume_id} 超时。")
+        extracted_text = ""
+    except Exception as e:
+        print(f"Celery 任务：解析简历 {resume_id} 失败: {e}")
+        extracted_text = ""
+
+    if extracted_text:
+        resume.parsed_content = extracted_text
+        resume.status = Resume.Status.PARSED  # 标记为“已解析”
+    else:
+        resume.status = Resume.Status.FAILED  # 标记为“解析失败”
+    # 通过 save 触发 post_save，顺带刷新简历纯文本缓存
+    resume.save(update_fields=['parsed_content', 'status', 'updated_at'])
+    return f"简历 {resume_id} 解析完成，状态: {resume.status}。"
+
+
+@shared_task(acks_late=True)
+def bulk_parse_resumes_task(resume_ids: list, workers: int = None):
+    """
+    批量解析已上传的文件简历 (管理员导入)，返回吞吐量统计。
+    注意：prefork 模式的 worker 子进程不能再创建进程池，需要由 solo/threads 模式的 worker 执行才能并行。
+    """
+    resumes = list(Resume.objects.filter(id__in=resume_ids).exclude(file=''))
+    stats = parse_resumes_in_parallel(resumes, workers=workers)
+    print(f"Celery 任务：批量解析 {stats['files']} 份简历，成功 {stats['parsed']}，失败 {stats['failed']}，"
+          f"{stats['files_per_sec']} files/s，{stats['mb_per_sec']} MB/s。")
+    return stats
@@ -1,4 +1,5 @@
 # resumes/views.py
+from django.db import transaction
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from .models import Resume, Education, WorkExperience, ProjectExperience, Skill
@@ -10,8 +11,8 @@ from .serializers import (
     SkillSerializer,
     ResumeCreateSerializer
 )
-# 【新增】导入简历解析服务
-from .services import extract_text_from_file
+# 【新增】导入简历解析任务
+from .tasks import parse_resume_file_task
 
 class ResumeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
@@ -37,26 +38,13 @@ class ResumeViewSet(viewsets.ModelViewSet):
             file_obj = request.FILES['file']
             title = request.data.get('title', file_obj.name) # 如果没提供标题，用文件名
 
-            # 创建一个初始的 Resume 实例并保存文件
-            resume_instance = Resume(user=request.user, title=title, file=file_obj)
+            # 创建一个初始的 Resume 实例并保存文件，状态为“解析中”
+            resume_instance = Resume(user=request.user, title=title, file=file_obj, status=Resume.Status.PARSING)
             resume_instance.save() # 这里会触发文件保存到 media/resumes/
 
-            try:
-                # 文件保存后，它的路径是 resume_instance.file.path
-                # 调用服务从保存的文件中提取文本
-                extracted_text = extract_text_from_file(resume_instance.file.path)
-
-                if extracted_text:
-                    resume_instance.parsed_content = extracted_text
-                    resume_instance.status = Resume.Status.PARSED # 标记为“已解析”
-                    resume_instance.save()
-                else:
-                    resume_instance.status = Resume.Status.FAILED # 标记为“解析失败”
-                    resume_instance.save()
-            except Exception as e:
-                print(f"解析简历文件失败: {e}")
-                resume_instance.status = Resume.Status.FAILED
-                resume_instance.save()
+            # 【性能优化】文本提取交给 Celery 在后台执行，接口立即返回，前端轮询简历状态
+            resume_id = resume_instance.id
+            transaction.on_commit(lambda: parse_resume_file_task.delay(resume_id))
 
             # 使用 Detail 序列化器返回完整的对象
             output_serializer = ResumeDetailSerializer(resume_instance)
@@ -1,12 +1,14 @@
+from django import forms
 from django.contrib import admin
-from .models import AIModel, AISetting, Industry, JobPosition
+from .models import AIModel, AISetting, Industry, JobPosition, PromptTemplate
 
 # system/admin.py
 @admin.register(AIModel)
 class AIModelAdmin(admin.ModelAdmin):
-    list_display = ('name', 'model_slug', 'base_url', 'is_active', 'supports_json_mode')
+    list_display = ('name', 'model_slug', 'base_url', 'is_active', 'supports_json_mode', 'failover_model')
     list_editable = ('is_active', 'supports_json_mode')
     search_fields = ('name', 'model_slug')
+    autocomplete_fields = ('failover_model',)
 
 @admin.register(AISetting)
 class AISettingAdmin(admin.ModelAdmin):
@@ -28,4 +30,28 @@ class JobPositionAdmin(admin.ModelAdmin):
     list_filter = ('industry', 'is_active')
     list_display = ('name', 'industry', 'is_active', 'order')
     list_editable = ('industry', 'is_active', 'order')
-    search_fields = ('name',)
\ No newline at end of file
+    search_fields = ('name',)
+
+class PromptTemplateForm(forms.ModelForm):
+    class Meta:
+        model = PromptTemplate
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # 保存前先编译一次，避免有语法错误的模板在线上渲染时才暴露
+        from interviews.prompts import compile_prompt_template
+        try:
+            compile_prompt_template(cleaned_data.get('name', ''), cleaned_data.get('system_prompt', ''),
+                                    cleaned_data.get('user_template', ''))
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        return cleaned_data
+
+@admin.register(PromptTemplate)
+class PromptTemplateAdmin(admin.ModelAdmin):
+    form = PromptTemplateForm
+    list_display = ('name', 'version', 'is_active', 'notes', 'updated_at')
+    list_editable = ('is_active',)
+    list_filter = ('name', 'is_active')
+    search_fields = ('name', 'notes')
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0004_aimodel_supports_json_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromptTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='模板名称')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='版本号')),
+                ('system_prompt', models.TextField(verbose_name='系统提示词 (静态)')),
+                ('user_template', models.TextField(verbose_name='用户提示词模板')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否启用')),
+                ('notes', models.CharField(blank=True, max_length=255, verbose_name='版本说明')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '提示词模板',
+                'verbose_name_plural': '提示词模板',
+                'ordering': ['name', '-version'],
+                'unique_together': {('name', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0005_prompttemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='failover_model',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='system.aimodel', verbose_name='备用模型'),
+        ),
+    ]
@@ -12,6 +12,15 @@ class AIModel(models.Model):
     is_active = models.BooleanField(default=True, verbose_name='是否启用')
     # 【核心新增】新增一个布尔字段来标记是否支持 JSON Mode
     supports_json_mode = models.BooleanField(default=True, verbose_name='支持 JSON 模式')
+    # 【核心新增】本模型熔断或持续出错时，LLM 网关转而调用的备用模型
+    failover_model = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='备用模型'
+    )
     class Meta:
         verbose_name = 'AI 模型'
         verbose_name_plural = verbose_name
@@ -89,4 +98,28 @@ class JobPosition(models.Model):
         ordering = ['industry__order', 'order', 'name']
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+# 5. PromptTemplate 模型
+class PromptTemplate(models.Model):
+    """
+    可在后台按版本维护的 AI 提示词模板，覆盖 interviews/prompts.py 中的内置模板。
+    同名模板取启用中的最高版本；system_prompt 必须是静态文本，user_template 中用 $变量名 引用动态内容。
+    """
+    name = models.CharField(max_length=100, verbose_name='模板名称')
+    version = models.PositiveIntegerField(default=1, verbose_name='版本号')
+    system_prompt = models.TextField(verbose_name='系统提示词 (静态)')
+    user_template = models.TextField(verbose_name='用户提示词模板')
+    is_active = models.BooleanField(default=True, verbose_name='是否启用')
+    notes = models.CharField(max_length=255, blank=True, verbose_name='版本说明')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '提示词模板'
+        verbose_name_plural = verbose_name
+        ordering = ['name', '-version']
+        unique_together = ('name', 'version')
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"